@@ -0,0 +1,140 @@
+"""Write one workbook per group of a DataFrame from a single template."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable, Hashable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pivoteer.core import Pivoteer
+from pivoteer.exceptions import InvalidDataError, XmlStructureError
+from pivoteer.part_store import PartStore
+from pivoteer.row_encoder import encode_frame
+from pivoteer.sanitizer import DEFAULT_SANITIZE_POLICY, SanitizePolicy
+from pivoteer.sheet_splicer import formatting_lost_by_splice, split_worksheet
+from pivoteer.template_source import LoadedTemplate
+from pivoteer.utils import parse_a1_range
+from pivoteer.xml_engine import ParserPolicy
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+
+
+def burst(
+    template: str | Path | PartStore,
+    table_name: str,
+    df: pd.DataFrame,
+    *,
+    by: Hashable | Sequence[Hashable],
+    output_pattern: str | Callable[[Hashable], str | Path],
+    columns: Sequence[Hashable] | Mapping[str, Hashable] | None = None,
+    match: str = "position",
+    max_workers: int | None = None,
+    parser_policy: ParserPolicy | None = None,
+    enable_pivot_field_sync: bool = False,
+    refresh_all_pivots: bool = False,
+    drop_pivot_records: bool = False,
+    compact: bool = False,
+    sanitize: SanitizePolicy | None = DEFAULT_SANITIZE_POLICY,
+    deterministic: bool = False,
+) -> dict[Hashable, Path]:
+    """Write the rows of each ``df.groupby(by)`` group to its own workbook.
+
+    The template is loaded once into a ``LoadedTemplate`` and the whole frame
+    is encoded once; each group takes its rows from the encoded frame and is
+    spliced into a fresh session. If splicing would drop the table's
+    formatting (row heights or styles, or cell styles that differ between data
+    rows), or the splicer cannot handle its worksheet, every group's rows are
+    written by the DOM engine instead, as ``engine="auto"`` would.
+    ``output_pattern`` is a format string with a ``{key}`` field and one field
+    per ``by`` column name, or a callable taking the group key. Workbooks are
+    saved concurrently on ``max_workers`` threads (compression releases the
+    GIL). Returns the output path of each group key, in group order.
+    ``columns``, ``match``, ``compact``, ``sanitize``, ``deterministic`` and
+    the pivot options work as for ``Pivoteer``.
+    """
+    by_many = isinstance(by, list | tuple)
+    keys = list(by) if by_many else [by]
+    absent = [key for key in keys if key not in df.columns]
+    if absent:
+        raise InvalidDataError(f"DataFrame has no columns named {absent}.")
+
+    # pandas reads a tuple as a single column label, so group by the list.
+    groups = df.groupby(keys if by_many else by, sort=True, dropna=False).indices
+    outputs = {key: Path(_output_path(output_pattern, key, keys)) for key in groups}
+    if len(set(outputs.values())) != len(outputs):
+        raise ValueError("output_pattern must give every group its own path.")
+    if not outputs:
+        return outputs
+
+    if not isinstance(template, LoadedTemplate):
+        template = LoadedTemplate(template, parser_policy=parser_policy)
+    lost = _formatting_lost_by_splice(template, table_name)
+    session = Pivoteer(
+        template,
+        engine="splice" if lost is None else "dom",
+        parser_policy=parser_policy,
+        enable_pivot_field_sync=enable_pivot_field_sync,
+        refresh_all_pivots=refresh_all_pivots,
+        drop_pivot_records=drop_pivot_records,
+        compact=compact,
+        sanitize=sanitize,
+        deterministic=deterministic,
+    )
+
+    if lost is None:
+        encoded = encode_frame(df, sanitize=sanitize)
+
+        def write_group(key: Hashable) -> Path:
+            pivoteer = session.new_session()
+            group = encoded.take(groups[key])
+            pivoteer.apply_encoded(table_name, group, columns=columns, match=match)
+            return pivoteer.save(outputs[key])
+
+    else:
+        LOGGER.info("Table '%s': bursting with the DOM engine; %s.", table_name, lost)
+
+        def write_group(key: Hashable) -> Path:
+            pivoteer = session.new_session()
+            group = df.take(groups[key])
+            pivoteer.apply_dataframe(table_name, group, columns=columns, match=match)
+            return pivoteer.save(outputs[key])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(outputs, pool.map(write_group, outputs), strict=True))
+
+
+def _formatting_lost_by_splice(template: LoadedTemplate, table_name: str) -> str | None:
+    """Say why splicing the template's table rows would change the output."""
+    table_ref = template.workbook_map.tables.get(table_name)
+    if table_ref is None:
+        return None
+    (start_row, start_col), (end_row, end_col) = parse_a1_range(table_ref.ref)
+    try:
+        segments = split_worksheet(
+            template.read(table_ref.worksheet_path),
+            start_row + 1,
+            end_row,
+            start_col,
+            end_col,
+        )
+        lost = formatting_lost_by_splice(segments.block)
+    except XmlStructureError as exc:
+        return str(exc).rstrip(".")
+    return None if lost is None else f"splicing would drop formatting: {lost}"
+
+
+def _output_path(
+    pattern: str | Callable[[Hashable], str | Path],
+    key: Hashable,
+    names: list[Hashable],
+) -> str | Path:
+    if callable(pattern):
+        return pattern(key)
+    parts = key if isinstance(key, tuple) else (key,)
+    fields = {str(name): part for name, part in zip(names, parts, strict=True)}
+    return pattern.format(key=key, **fields)
@@ -3,12 +3,20 @@
 from __future__ import annotations
 
 import logging
-import zipfile
+from collections.abc import Hashable, Mapping, Sequence
+from concurrent.futures import Executor
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
-
+from pivoteer.engine_selection import DEFAULT_MEMORY_BUDGET, EngineChoice
+from pivoteer.part_store import PartStore, ZipPartSink, file_digest
+from pivoteer.row_encoder import EncodedFrame
+from pivoteer.sanitizer import DEFAULT_SANITIZE_POLICY, SanitizePolicy, SanitizeReport
 from pivoteer.template_engine import TemplateEngine
+from pivoteer.xml_engine import ParserPolicy
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 LOGGER = logging.getLogger(__name__)
 
@@ -17,34 +25,168 @@ class Pivoteer:
     """Public entry point for applying DataFrames to Excel templates."""
 
     def __init__(
-        self, template_path: str | Path, *, enable_pivot_field_sync: bool = False
+        self,
+        template_path: str | Path | PartStore,
+        *,
+        enable_pivot_field_sync: bool = False,
+        engine: str = "dom",
+        parser_policy: ParserPolicy | None = None,
+        refresh_all_pivots: bool = False,
+        drop_pivot_records: bool = False,
+        workers: int | Executor | None = None,
+        compact: bool = False,
+        sanitize: SanitizePolicy | None = DEFAULT_SANITIZE_POLICY,
+        deterministic: bool = False,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
     ) -> None:
-        """Initialize with optional pivot cache field synchronization."""
-        self._template_engine = TemplateEngine(Path(template_path))
+        """Initialize with optional pivot cache field synchronization.
+
+        Each option is described under Configuration in
+        ``docs/modules/pivoteer-library.md``.
+        """
+        if not isinstance(template_path, PartStore):
+            template_path = Path(template_path)
+        self._template_source = template_path
+        self._engine = engine
+        self._parser_policy = parser_policy
+        self._workers = workers
+        self._compact = compact
+        self._sanitize = sanitize
+        self._deterministic = deterministic
+        self._memory_budget = memory_budget
+        self._template_engine = TemplateEngine(
+            template_path,
+            engine=engine,
+            parser_policy=parser_policy,
+            workers=workers,
+            compact=compact,
+            sanitize=sanitize,
+            memory_budget=memory_budget,
+        )
         self._enable_pivot_field_sync = enable_pivot_field_sync
+        self._refresh_all_pivots = refresh_all_pivots
+        self._drop_pivot_records = drop_pivot_records
+
+    def new_session(self) -> Pivoteer:
+        """Return a fresh instance on the same template with the same options.
+
+        Changes applied to this instance are not carried over. With a
+        ``LoadedTemplate`` the new session shares all template data and costs
+        only a few object allocations.
+        """
+        return Pivoteer(
+            self._template_source,
+            enable_pivot_field_sync=self._enable_pivot_field_sync,
+            engine=self._engine,
+            parser_policy=self._parser_policy,
+            refresh_all_pivots=self._refresh_all_pivots,
+            drop_pivot_records=self._drop_pivot_records,
+            workers=self._workers,
+            compact=self._compact,
+            sanitize=self._sanitize,
+            deterministic=self._deterministic,
+            memory_budget=self._memory_budget,
+        )
 
-    def apply_dataframe(self, table_name: str, df: pd.DataFrame) -> None:
-        """Apply a DataFrame to the specified table."""
-        self._template_engine.apply_dataframe(table_name, df)
+    @property
+    def engine_choices(self) -> dict[str, EngineChoice]:
+        """The path ``engine="auto"`` took for each table, with its reason."""
+        return self._template_engine.engine_choices
+
+    @property
+    def sanitize_reports(self) -> dict[str, SanitizeReport]:
+        """Cells changed by sanitizing, per table, for the data applied so far."""
+        return self._template_engine.sanitize_reports
+
+    def apply_dataframe(
+        self,
+        table_name: str,
+        df: pd.DataFrame,
+        *,
+        columns: Sequence[Hashable] | Mapping[str, Hashable] | None = None,
+        match: str = "position",
+    ) -> None:
+        """Apply a DataFrame to the specified table.
+
+        ``columns`` and ``match="name"`` select and order source columns without
+        copying the frame; see ``TemplateEngine.apply_dataframe``.
+        """
+        self._template_engine.apply_dataframe(
+            table_name, df, columns=columns, match=match
+        )
+
+    def apply_encoded(
+        self,
+        table_name: str,
+        encoded: EncodedFrame,
+        *,
+        columns: Sequence[Hashable] | Mapping[str, Hashable] | None = None,
+        match: str = "position",
+    ) -> None:
+        """Splice a frame from ``row_encoder.encode_frame`` into a table.
+
+        Encode once and apply to many templates to pay the encoding cost only
+        once; see ``TemplateEngine.apply_encoded``.
+        """
+        self._template_engine.apply_encoded(
+            table_name, encoded, columns=columns, match=match
+        )
+
+    def update_columns(
+        self,
+        table_name: str,
+        df: pd.DataFrame,
+        *,
+        columns: Mapping[str, Hashable] | None = None,
+    ) -> None:
+        """Replace only the named columns' cells in the table's current rows.
+
+        See ``TemplateEngine.update_columns``.
+        """
+        self._template_engine.update_columns(table_name, df, columns=columns)
 
     def save(self, output_path: str | Path) -> Path:
-        """Write the modified template to a new file."""
+        """Write the modified template to a new file.
+
+        Spliced worksheets are encoded and compressed chunk by chunk while
+        they are written, so peak memory does not grow with the sheet size.
+        Parts are written in the template's order.
+        """
         output_path = Path(output_path)
         if self._enable_pivot_field_sync:
             self._template_engine.sync_pivot_cache_fields()
-        self._template_engine.ensure_pivot_refresh_on_load()
-        modified_parts = self._template_engine.get_modified_parts()
-
-        with zipfile.ZipFile(self._template_engine.template_path, "r") as src:
-            with zipfile.ZipFile(
-                output_path, "w", compression=zipfile.ZIP_DEFLATED
-            ) as dest:
-                for info in src.infolist():
-                    filename = info.filename
-                    if filename in modified_parts:
-                        dest.writestr(info, modified_parts[filename])
-                    else:
-                        dest.writestr(info, src.read(filename))
+        refreshed = self._template_engine.ensure_pivot_refresh_on_load(
+            refresh_all=self._refresh_all_pivots
+        )
+        if self._drop_pivot_records:
+            self._template_engine.drop_pivot_cache_records(refreshed)
+        modified_parts = self._template_engine.get_modified_streams()
+        removed_parts = self._template_engine.get_removed_parts()
+
+        with (
+            self._template_engine.open_archive() as src,
+            ZipPartSink(output_path, deterministic=self._deterministic) as dest,
+        ):
+            for info in src.infolist():
+                filename = info.filename
+                if filename in removed_parts:
+                    continue
+                if filename in modified_parts:
+                    dest.write_stream(info, modified_parts[filename])
+                else:
+                    dest.write(info, src.read(filename))
 
         LOGGER.info("Saved output to %s", output_path)
         return output_path
+
+    def save_with_digest(
+        self, output_path: str | Path, *, algorithm: str = "sha256"
+    ) -> tuple[Path, str]:
+        """Save like ``save`` and return the output path and its content hash.
+
+        The hash covers the file's bytes (any ``hashlib`` algorithm). With
+        ``deterministic=True`` equal hashes mean equal reports, so renders can
+        be deduplicated or skipped downstream.
+        """
+        output_path = self.save(output_path)
+        return output_path, file_digest(output_path, algorithm)
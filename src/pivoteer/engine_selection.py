@@ -0,0 +1,120 @@
+"""Choose how ``engine="auto"`` writes a table from data size and a memory budget."""
+
+from __future__ import annotations
+
+from concurrent.futures import Executor
+from dataclasses import dataclass
+
+from pivoteer import row_encoder
+
+DEFAULT_MEMORY_BUDGET = 1024 * 1024 * 1024
+
+# Rough peak-memory costs. A written DOM cell costs about 1.1 KB of lxml nodes
+# and bookkeeping, and a parsed tree several times its XML size; the splice
+# engine keeps the frame's own columns and holds only the blocks being encoded
+# as Python objects and row bytes.
+_DOM_BYTES_PER_CELL = 1_200
+_DOM_BYTES_PER_PART_BYTE = 10
+_VALUE_BYTES_PER_CELL = 60
+_ROW_BYTES_PER_CELL = 40
+
+
+@dataclass(frozen=True)
+class EngineChoice:
+    """How ``engine="auto"`` wrote a table's rows, and why.
+
+    ``engine`` is ``"splice"`` or ``"dom"``; ``workers`` is the process count
+    or executor used to encode spliced rows, ``None`` for serial encoding.
+    ``estimated_bytes`` is the peak-memory estimate the choice was based on.
+    """
+
+    engine: str
+    workers: int | Executor | None
+    estimated_bytes: int
+    reason: str
+
+
+def estimate_dom_bytes(rows: int, columns: int, sheet_bytes: int) -> int:
+    """Estimate the peak memory of writing the rows into a parsed worksheet."""
+    return sheet_bytes * _DOM_BYTES_PER_PART_BYTE + rows * columns * _DOM_BYTES_PER_CELL
+
+
+def estimate_splice_bytes(
+    rows: int, columns: int, sheet_bytes: int, *, workers: int = 1
+) -> int:
+    """Estimate the peak memory of splicing the rows, encoded while saving.
+
+    The worksheet's bytes are held twice (the part and its segments), and a
+    parallel encoder keeps two blocks per worker in flight. The frame itself
+    belongs to the caller and is not counted.
+    """
+    blocks_in_flight = 2 * workers if workers > 1 else 1
+    block_cells = min(rows, row_encoder.DEFAULT_BLOCK_ROWS) * columns
+    return 2 * sheet_bytes + blocks_in_flight * block_cells * (
+        _VALUE_BYTES_PER_CELL + _ROW_BYTES_PER_CELL
+    )
+
+
+def choose_engine(
+    rows: int,
+    columns: int,
+    sheet_bytes: int,
+    *,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    workers: int | Executor | None = None,
+) -> EngineChoice:
+    """Pick the splice path, encoding in parallel only if the caller asked.
+
+    Splicing streams the rows into the output and is the faster engine at
+    every size, so it is always the first choice; ``dom_fallback`` covers
+    worksheets it cannot handle or whose formatting it would drop. Processes
+    are never started unasked: a process count is lowered until it fits the
+    budget, and an executor is used as given.
+    """
+    if isinstance(workers, int) and workers > 1:
+        count = workers
+        while (
+            count > 1
+            and estimate_splice_bytes(rows, columns, sheet_bytes, workers=count)
+            > memory_budget
+        ):
+            count -= 1
+        if count > 1:
+            return EngineChoice(
+                "splice",
+                count,
+                estimate_splice_bytes(rows, columns, sheet_bytes, workers=count),
+                f"{rows} rows: splice, encoded in {count} processes",
+            )
+    elif workers is not None and not isinstance(workers, int):
+        return EngineChoice(
+            "splice",
+            workers,
+            estimate_splice_bytes(rows, columns, sheet_bytes),
+            f"{rows} rows: splice, encoded by the given executor",
+        )
+
+    estimate = estimate_splice_bytes(rows, columns, sheet_bytes)
+    reason = f"{rows} rows: splice, encoded while saving"
+    if estimate > memory_budget:
+        reason += "; over the memory budget, but no path needs less"
+    return EngineChoice("splice", None, estimate, reason)
+
+
+def dom_fallback(
+    rows: int,
+    columns: int,
+    sheet_bytes: int,
+    *,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    reason: str = "worksheet layout cannot be spliced",
+) -> EngineChoice | None:
+    """Return the DOM choice for a worksheet that should not be spliced.
+
+    ``reason`` says why splicing was ruled out. Returns ``None`` when the DOM
+    engine's estimate exceeds the budget.
+    """
+    estimate = estimate_dom_bytes(rows, columns, sheet_bytes)
+    if estimate > memory_budget:
+        return None
+    return EngineChoice("dom", None, estimate, f"{reason}; DOM engine")
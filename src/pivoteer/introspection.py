@@ -0,0 +1,93 @@
+"""Read-only inspection of a template's tables and pivot dependencies."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from pathlib import Path
+
+from pivoteer.models import PivotCacheInfo, TableInfo, TemplateInfo, WorkbookMap
+from pivoteer.part_store import PartStore
+from pivoteer.utils import parse_a1_range
+from pivoteer.xml_engine import ParserPolicy, XmlEngine
+
+
+def inspect(
+    template: str | Path | PartStore, *, parser_policy: ParserPolicy | None = None
+) -> TemplateInfo:
+    """Describe a template's tables, their columns and dependent pivots.
+
+    Only the workbook, relationship, table and pivot definition parts are read;
+    worksheet XML is never parsed, so the cost does not grow with sheet data.
+    """
+    if not isinstance(template, PartStore):
+        template = Path(template)
+    workbook_map = XmlEngine(template, parser_policy=parser_policy).build_workbook_map()
+
+    tables: dict[str, TableInfo] = {}
+    for name, table_ref in workbook_map.tables.items():
+        cache_paths = tuple(dependent_pivot_caches(workbook_map, [name]))
+        pivot_tables = tuple(
+            pivot_path
+            for cache_path in cache_paths
+            for pivot_path in workbook_map.pivot_caches[cache_path].pivot_table_paths
+        )
+        tables[name] = TableInfo(
+            name=name,
+            sheet_name=table_ref.sheet_name,
+            ref=table_ref.ref,
+            columns=table_ref.columns,
+            pivot_cache_paths=cache_paths,
+            pivot_table_paths=pivot_tables,
+        )
+
+    return TemplateInfo(
+        template_path=workbook_map.template_path,
+        sheet_names=tuple(workbook_map.worksheets),
+        tables=tables,
+        pivot_caches=dict(workbook_map.pivot_caches),
+    )
+
+
+def dependent_pivot_caches(
+    workbook_map: WorkbookMap, table_names: Iterable[str]
+) -> list[str]:
+    """Return pivot cache paths sourced from any of the given tables.
+
+    Besides caches bound to the table by name, caches over a sheet range or
+    a defined name whose range overlaps the table's template range count as
+    dependent. Named sources that do not resolve to a range are refreshed to
+    be safe.
+    """
+    names = set(table_names)
+    paths: list[str] = []
+    for cache in workbook_map.pivot_caches.values():
+        if cache.source_type == "table":
+            dependent = cache.source_name in names
+        elif cache.source_type == "name" and cache.source_ref is None:
+            dependent = bool(names)
+        elif cache.source_type in ("range", "name"):
+            dependent = any(
+                _range_overlaps_table(workbook_map, cache, name) for name in names
+            )
+        else:
+            dependent = False
+        if dependent:
+            paths.append(cache.path)
+    return paths
+
+
+def _range_overlaps_table(
+    workbook_map: WorkbookMap, cache: PivotCacheInfo, table_name: str
+) -> bool:
+    table_ref = workbook_map.tables.get(table_name)
+    if table_ref is None or cache.source_sheet != table_ref.sheet_name:
+        return False
+    try:
+        (top, left), (bottom, right) = parse_a1_range(
+            (cache.source_ref or "").replace("$", "")
+        )
+    except ValueError:
+        # Unparseable ranges (e.g. whole columns) are refreshed to be safe.
+        return True
+    (t_top, t_left), (t_bottom, t_right) = parse_a1_range(table_ref.ref)
+    return top <= t_bottom and t_top <= bottom and left <= t_right and t_left <= right
@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections.abc import Hashable, Sequence
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from pivoteer.exceptions import InvalidDataError
+
 
 @dataclass(frozen=True)
 class TableRef:
@@ -15,6 +18,85 @@ class TableRef:
     table_path: str
     worksheet_path: str
     ref: str
+    columns: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """One ``tableColumn``: its header, calculated formula and data style."""
+
+    name: str
+    formula: str | None = None
+    data_dxf_id: str | None = None
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    """Column layout of a table, read once from its ``tableColumns``.
+
+    Calculated columns (``formula`` set) may be left out of a DataFrame, in
+    which case they are filled with the formula instead of values.
+    """
+
+    name: str
+    columns: tuple[ColumnSpec, ...]
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        return tuple(column.name for column in self.columns)
+
+    @property
+    def formulas(self) -> dict[int, str]:
+        """Calculated column formulas keyed by column offset."""
+        return {
+            offset: column.formula
+            for offset, column in enumerate(self.columns)
+            if column.formula is not None
+        }
+
+    def formulas_for_width(self, width: int) -> dict[int, str]:
+        """Return the formulas to fill for a DataFrame of ``width`` columns.
+
+        A frame covering every column writes its own values; one supplying
+        exactly the non-calculated columns gets the formulas filled in. Any
+        other width raises ``InvalidDataError``.
+        """
+        formulas = self.formulas
+        if width == len(self.columns):
+            return {}
+        if formulas and width == len(self.columns) - len(formulas):
+            return formulas
+        expected = str(len(self.columns))
+        if formulas:
+            expected += f" (or {len(self.columns) - len(formulas)} without calculated)"
+        raise InvalidDataError(
+            f"Table '{self.name}' has {expected} columns {list(self.names)}, "
+            f"but DataFrame has {width}."
+        )
+
+    def check_column_order(self, labels: Sequence[Hashable]) -> None:
+        """Reject a positionally matched frame whose headers are out of order.
+
+        Labels are ignored unless every one of them is a table header; then
+        they must be the headers the positions map to, all of them or the
+        non-calculated ones, in table order.
+        """
+        if not labels or not all(label in self.names for label in labels):
+            return
+        if len(labels) == len(self.columns):
+            expected = list(self.names)
+        else:
+            expected = [
+                column.name for column in self.columns if column.formula is None
+            ]
+            if len(labels) != len(expected):
+                return
+        if list(labels) != expected:
+            raise InvalidDataError(
+                f"Table '{self.name}' expects columns {expected} in this order, "
+                f"but DataFrame has {list(labels)}; pass match='name' to pair "
+                "them by header."
+            )
 
 
 @dataclass(frozen=True)
@@ -27,12 +109,65 @@ class WorksheetInfo:
     rel_id: str
 
 
+@dataclass(frozen=True)
+class PivotCacheInfo:
+    """Represents a pivot cache definition and what feeds and uses it.
+
+    ``source_type`` is ``"table"`` for a named Excel table, ``"name"`` for any
+    other defined name, ``"range"`` for a sheet range and ``"external"`` for
+    every non-worksheet source. A defined name over one sheet range gets its
+    ``source_sheet`` and ``source_ref`` from the workbook's ``definedNames``.
+    ``records_path`` and ``records_rel_id`` locate the cache's saved
+    ``pivotCacheRecords`` part, if any.
+    """
+
+    path: str
+    rel_id: str
+    source_type: str
+    source_name: str | None = None
+    source_sheet: str | None = None
+    source_ref: str | None = None
+    pivot_table_paths: tuple[str, ...] = ()
+    records_path: str | None = None
+    records_rel_id: str | None = None
+
+
 @dataclass(frozen=True)
 class WorkbookMap:
-    """Holds resolved workbook references used for XML updates."""
+    """Holds resolved workbook references used for XML updates.
+
+    ``table_pivot_caches`` maps each table name to the paths of the pivot caches
+    sourced from it, so updates touch only the dependent caches.
+    ``table_schemas`` holds each table's column layout.
+    """
 
     template_path: Path
     worksheets: dict[str, WorksheetInfo]
     tables: dict[str, TableRef]
     pivot_cache_definition_paths: dict[str, str]
     shared_strings_path: str | None = None
+    pivot_caches: dict[str, PivotCacheInfo] = field(default_factory=dict)
+    table_pivot_caches: dict[str, tuple[str, ...]] = field(default_factory=dict)
+    table_schemas: dict[str, TableSchema] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class TableInfo:
+    """Public description of a table and the pivot objects fed by it."""
+
+    name: str
+    sheet_name: str
+    ref: str
+    columns: tuple[str, ...]
+    pivot_cache_paths: tuple[str, ...] = ()
+    pivot_table_paths: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class TemplateInfo:
+    """Result of ``pivoteer.introspection.inspect`` for one template."""
+
+    template_path: Path
+    sheet_names: tuple[str, ...]
+    tables: dict[str, TableInfo]
+    pivot_caches: dict[str, PivotCacheInfo]
@@ -0,0 +1,347 @@
+"""Part stores: uniform read access to template parts and lazy output sinks."""
+
+from __future__ import annotations
+
+import abc
+import copy
+import hashlib
+import io
+import threading
+import time
+import zipfile
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import IO
+
+from pivoteer.exceptions import TemplateNotFoundError
+
+# Parts up to this size are buffered and written in one piece by
+# ``ZipPartSink.write_stream``; larger ones are streamed into the entry.
+STREAM_BUFFER_SIZE = 16 * 1024 * 1024
+
+# Timestamp of every entry written by a deterministic sink: the earliest one a
+# ZIP header can hold.
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+@dataclass
+class IOStats:
+    """Counts of parts and uncompressed bytes moved through a store or sink."""
+
+    parts_read: int = 0
+    bytes_read: int = 0
+    parts_written: int = 0
+    bytes_written: int = 0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def record_read(self, size: int, *, parts: int = 1) -> None:
+        with self._lock:
+            self.parts_read += parts
+            self.bytes_read += size
+
+    def record_write(self, size: int) -> None:
+        with self._lock:
+            self.parts_written += 1
+            self.bytes_written += size
+
+
+class PartStore(abc.ABC):
+    """Read-only access to the parts of a workbook package.
+
+    Stores mirror the read-only ``zipfile.ZipFile`` methods used by pivoteer
+    (``read``, ``open``, ``getinfo``, ``infolist``, ``namelist``) so that every
+    engine reads through one interface whatever the backend. Subclasses
+    provide ``_read``, may override ``_open`` and fill ``_infos``; reads are
+    counted in ``stats``, streamed ones by the bytes actually read.
+    """
+
+    def __init__(self, path: Path, infos: Iterable[zipfile.ZipInfo]) -> None:
+        self._path = path
+        self._infos = tuple(infos)
+        self._info_map = MappingProxyType({info.filename: info for info in self._infos})
+        self.stats = IOStats()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def infolist(self) -> list[zipfile.ZipInfo]:
+        return list(self._infos)
+
+    def namelist(self) -> list[str]:
+        return [info.filename for info in self._infos]
+
+    def getinfo(self, name: str) -> zipfile.ZipInfo:
+        try:
+            return self._info_map[name]
+        except KeyError:
+            raise KeyError(f"There is no item named {name!r} in the archive") from None
+
+    def read(self, name: str) -> bytes:
+        """Return the uncompressed bytes of a part."""
+        data = self._read(self.getinfo(name))
+        self.stats.record_read(len(data))
+        return data
+
+    def open(self, name: str) -> IO[bytes]:
+        """Return a stream over the uncompressed bytes of a part."""
+        stream = self._open(self.getinfo(name))
+        self.stats.record_read(0)
+        return _CountingReader(stream, self.stats)
+
+    def close(self) -> None:  # noqa: B027 - stores without resources keep it
+        """Release resources held by the store."""
+
+    def __enter__(self) -> PartStore:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @abc.abstractmethod
+    def _read(self, info: zipfile.ZipInfo) -> bytes:
+        """Return the uncompressed bytes of the part described by ``info``."""
+
+    def _open(self, info: zipfile.ZipInfo) -> IO[bytes]:
+        return io.BytesIO(self._read(info))
+
+
+class _CountingReader(io.BufferedIOBase):
+    """Stream over a part that adds the bytes handed out to ``stats``."""
+
+    def __init__(self, stream: IO[bytes], stats: IOStats) -> None:
+        super().__init__()
+        self._stream = stream
+        self._stats = stats
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int | None = -1) -> bytes:
+        data = self._stream.read(-1 if size is None else size)
+        self._stats.record_read(len(data), parts=0)
+        return data
+
+    def read1(self, size: int = -1) -> bytes:
+        return self.read(size)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stream.close()
+        super().close()
+
+
+class ZipPartStore(PartStore):
+    """Parts read from a ``.xlsx`` file through ``zipfile``."""
+
+    def __init__(self, template_path: str | Path) -> None:
+        path = Path(template_path)
+        if not path.exists():
+            raise TemplateNotFoundError(f"Template not found: {path}")
+        self._archive = zipfile.ZipFile(path, "r")
+        super().__init__(path, self._archive.infolist())
+
+    def close(self) -> None:
+        self._archive.close()
+
+    def _read(self, info: zipfile.ZipInfo) -> bytes:
+        return self._archive.read(info)
+
+    def _open(self, info: zipfile.ZipInfo) -> IO[bytes]:
+        return self._archive.open(info)
+
+
+class BytesPartStore(PartStore):
+    """Parts held in memory, e.g. a template downloaded without touching disk."""
+
+    def __init__(
+        self,
+        parts: Mapping[str, bytes],
+        infos: Iterable[zipfile.ZipInfo] | None = None,
+        *,
+        path: str | Path = "<memory>",
+    ) -> None:
+        if infos is None:
+            infos = [_part_info(name, len(data)) for name, data in parts.items()]
+        self._parts = MappingProxyType(dict(parts))
+        super().__init__(Path(path), infos)
+
+    @classmethod
+    def from_zip_bytes(
+        cls, data: bytes, *, path: str | Path = "<memory>"
+    ) -> BytesPartStore:
+        """Unpack a whole ``.xlsx`` held in memory."""
+        with zipfile.ZipFile(io.BytesIO(data), "r") as archive:
+            infos = archive.infolist()
+            parts = {info.filename: archive.read(info) for info in infos}
+        return cls(parts, infos, path=path)
+
+    def _read(self, info: zipfile.ZipInfo) -> bytes:
+        return self._parts[info.filename]
+
+
+class DirectoryPartStore(PartStore):
+    """Parts read from an unpacked template directory."""
+
+    def __init__(self, root: str | Path) -> None:
+        root = Path(root)
+        if not root.is_dir():
+            raise TemplateNotFoundError(f"Template directory not found: {root}")
+        files = sorted(
+            (candidate for candidate in root.rglob("*") if candidate.is_file()),
+            key=lambda candidate: _content_types_first(candidate.relative_to(root)),
+        )
+        infos = [
+            zipfile.ZipInfo.from_file(candidate, candidate.relative_to(root).as_posix())
+            for candidate in files
+        ]
+        for info in infos:
+            info.compress_type = zipfile.ZIP_DEFLATED
+        super().__init__(root, infos)
+
+    def _read(self, info: zipfile.ZipInfo) -> bytes:
+        return (self._path / info.filename).read_bytes()
+
+    def _open(self, info: zipfile.ZipInfo) -> IO[bytes]:
+        return open(self._path / info.filename, "rb")
+
+
+class ZipPartSink:
+    """ZIP output that is created only when the first part is written.
+
+    If the ``with`` block fails, the partially written file is removed, so an
+    aborted save never leaves a truncated workbook behind. A ``deterministic``
+    sink writes every entry with ``FIXED_DATE_TIME`` and the same fixed
+    metadata, dropping the timestamps, permissions and extra fields of the
+    source entries, so equal parts written in equal order give equal bytes.
+    """
+
+    def __init__(
+        self,
+        output_path: str | Path,
+        *,
+        compression: int = zipfile.ZIP_DEFLATED,
+        deterministic: bool = False,
+    ) -> None:
+        self._path = Path(output_path)
+        self._compression = compression
+        self._deterministic = deterministic
+        self._archive: zipfile.ZipFile | None = None
+        self.stats = IOStats()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def write(self, info: zipfile.ZipInfo | str, data: bytes) -> None:
+        """Add a part, keeping the metadata of ``info`` when one is given.
+
+        ``info`` is copied first: ``writestr`` fills in sizes and offsets, and
+        the source's entries may be shared by concurrent saves.
+        """
+        archive = self._open_archive()
+        archive.writestr(self._entry_info(info), data)
+        self.stats.record_write(len(data))
+
+    def write_stream(
+        self,
+        info: zipfile.ZipInfo | str,
+        chunks: Iterable[bytes],
+        *,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+    ) -> None:
+        """Add a part from byte chunks without joining them into one buffer.
+
+        Chunks are collected until ``buffer_size`` bytes; a part that fits is
+        written exactly like ``write``. Larger parts are fed into the open ZIP
+        entry chunk by chunk, with ZIP64 sizes since the final size is not
+        known up front.
+        """
+        iterator = iter(chunks)
+        buffered: list[bytes] = []
+        size = 0
+        for chunk in iterator:
+            buffered.append(chunk)
+            size += len(chunk)
+            if size > buffer_size:
+                break
+        else:
+            self.write(info, b"".join(buffered))
+            return
+
+        archive = self._open_archive()
+        with archive.open(self._entry_info(info), "w", force_zip64=True) as entry:
+            for chunk in buffered:
+                entry.write(chunk)
+            buffered.clear()
+            for chunk in iterator:
+                entry.write(chunk)
+                size += len(chunk)
+        self.stats.record_write(size)
+
+    def close(self) -> None:
+        self._open_archive().close()
+
+    def discard(self) -> None:
+        """Close and delete whatever was written so far."""
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+            self._path.unlink(missing_ok=True)
+
+    def _entry_info(self, info: zipfile.ZipInfo | str) -> zipfile.ZipInfo:
+        """Return the header to write ``info`` under, never ``info`` itself."""
+        if isinstance(info, zipfile.ZipInfo):
+            if not self._deterministic:
+                return copy.copy(info)
+            name, compression = info.filename, info.compress_type
+        else:
+            name, compression = info, self._compression
+        date_time = FIXED_DATE_TIME if self._deterministic else time.localtime()[:6]
+        entry = zipfile.ZipInfo(name, date_time=date_time)
+        entry.compress_type = compression
+        if self._deterministic:
+            entry.create_system = 3
+        entry.external_attr = 0o600 << 16
+        return entry
+
+    def _open_archive(self) -> zipfile.ZipFile:
+        if self._archive is None:
+            self._archive = zipfile.ZipFile(
+                self._path, "w", compression=self._compression
+            )
+        return self._archive
+
+    def __enter__(self) -> ZipPartSink:
+        return self
+
+    def __exit__(self, exc_type: object, *exc_info: object) -> None:
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+def file_digest(path: str | Path, algorithm: str = "sha256") -> str:
+    """Return the hex digest of a file's bytes, read in 1 MiB chunks."""
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _part_info(name: str, size: int) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.file_size = size
+    return info
+
+
+def _content_types_first(relative: Path) -> tuple[bool, str]:
+    name = relative.as_posix()
+    return (name != "[Content_Types].xml", name)
@@ -8,40 +8,50 @@ from lxml import etree
 
 from pivoteer.exceptions import PivotCacheError, TableNotFoundError
 from pivoteer.models import WorkbookMap
+from pivoteer.part_store import PartStore, ZipPartStore
 from pivoteer.xml_engine import read_xml_part
 
 _NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
 
 
 def sync_cache_fields(
-    workbook_map: WorkbookMap, table_name: str
+    workbook_map: WorkbookMap,
+    table_name: str,
+    *,
+    parser: etree.XMLParser | None = None,
+    archive: zipfile.ZipFile | PartStore | None = None,
 ) -> dict[str, etree._ElementTree]:
     """Sync pivot cache field names with the specified table's columns.
 
     Returns a mapping of modified pivot cache definition paths to XML trees.
+    ``parser`` overrides the default XML parser, e.g. one with ``huge_tree``;
+    ``archive`` reuses an already open template instead of reopening the file.
     """
     table_ref = workbook_map.tables.get(table_name)
     if not table_ref:
         raise TableNotFoundError(f"Table not found: {table_name}")
 
-    cache_paths = list(workbook_map.pivot_cache_definition_paths.values())
+    cache_paths = workbook_map.table_pivot_caches.get(table_name, ())
     if not cache_paths:
         return {}
 
-    with zipfile.ZipFile(workbook_map.template_path, "r") as archive:
-        table_tree = read_xml_part(archive, table_ref.table_path)
-        table_columns = _extract_table_columns(table_tree)
+    if archive is None:
+        with ZipPartStore(workbook_map.template_path) as opened:
+            return sync_cache_fields(
+                workbook_map, table_name, parser=parser, archive=opened
+            )
 
-        updated_parts: dict[str, etree._ElementTree] = {}
-        for cache_path in cache_paths:
-            cache_tree = read_xml_part(archive, cache_path)
-            if _cache_source_table_name(cache_tree) != table_name:
-                continue
-            updated = _append_missing_cache_fields(cache_tree, table_columns)
-            if updated:
-                updated_parts[cache_path] = cache_tree
+    table_tree = read_xml_part(archive, table_ref.table_path, parser)
+    table_columns = _extract_table_columns(table_tree)
 
-        return updated_parts
+    updated_parts: dict[str, etree._ElementTree] = {}
+    for cache_path in cache_paths:
+        cache_tree = read_xml_part(archive, cache_path, parser)
+        updated = _append_missing_cache_fields(cache_tree, table_columns)
+        if updated:
+            updated_parts[cache_path] = cache_tree
+
+    return updated_parts
 
 
 def _extract_table_columns(table_tree: etree._ElementTree) -> list[str]:
@@ -62,16 +72,6 @@ def _extract_table_columns(table_tree: etree._ElementTree) -> list[str]:
     return columns
 
 
-def _cache_source_table_name(cache_tree: etree._ElementTree) -> str | None:
-    ns = _get_main_namespace(cache_tree)
-    worksheet_source = cache_tree.find(
-        f".//{{{ns}}}cacheSource/{{{ns}}}worksheetSource"
-    )
-    if worksheet_source is None:
-        return None
-    return worksheet_source.get("name")
-
-
 def _append_missing_cache_fields(
     cache_tree: etree._ElementTree, table_columns: list[str]
 ) -> bool:
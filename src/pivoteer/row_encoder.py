@@ -0,0 +1,413 @@
+"""Byte-level encoding of worksheet rows for DOM-free injection."""
+
+from __future__ import annotations
+
+import functools
+import os
+from collections import deque
+from collections.abc import (
+    Callable,
+    Hashable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+)
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from types import ModuleType
+from typing import TYPE_CHECKING
+from xml.sax.saxutils import escape
+
+from pivoteer.sanitizer import (
+    DEFAULT_SANITIZE_POLICY,
+    SanitizePolicy,
+    sanitize_columns,
+)
+from pivoteer.utils import column_index_to_letter
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_EMPTY_CELL = b"/>"
+_NUMBER_OPEN = b"><v>"
+_NUMBER_CLOSE = b"</v></c>"
+_INLINE_OPEN = b' t="inlineStr"><is><t>'
+_INLINE_CLOSE = b"</t></is></c>"
+
+# Rows per block for parallel encoding; small enough to balance workers, large
+# enough that pickling each task stays cheap relative to encoding it. Read when
+# rows are encoded, so changing it affects every later save.
+DEFAULT_BLOCK_ROWS = 50_000
+
+_BlockTask = tuple[
+    list[Sequence[object]],
+    Sequence[object],
+    dict[int, Sequence[bytes]],
+    int,
+    int,
+    bool,
+    Mapping[int, bytes],
+]
+
+
+def is_missing(value: object) -> bool:
+    """Return True for None and pandas missing markers (NaN, NaT, NA).
+
+    Plain strings, numbers and NaN are decided without pandas, which is only
+    imported for other objects such as ``NaT`` or ``NA``.
+    """
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return value != value
+    if isinstance(value, (str, int)):
+        return False
+    try:
+        return bool(_pandas().isna(value))
+    except (TypeError, ValueError):
+        return False
+
+
+@functools.cache
+def _pandas() -> ModuleType:
+    import pandas
+
+    return pandas
+
+
+def encode_cell(value: object) -> bytes:
+    """Encode a value as the tail of a ``<c>`` element following its ``r`` attribute.
+
+    The encoding mirrors ``XmlEngine.inject_rows_inline_strings``: missing values
+    become empty cells, numbers are written as ``<v>`` and everything else is an
+    inline string (dates use ISO 8601).
+    """
+    if is_missing(value):
+        return _EMPTY_CELL
+    if isinstance(value, (int, float)):
+        return _NUMBER_OPEN + str(value).encode() + _NUMBER_CLOSE
+
+    text = value.isoformat() if hasattr(value, "isoformat") else str(value)
+    return _INLINE_OPEN + escape(text).encode() + _INLINE_CLOSE
+
+
+def encode_column(values: Iterable[object]) -> list[bytes]:
+    """Encode every value of a column into cell fragments."""
+    return [encode_cell(value) for value in values]
+
+
+def column_encoder(dtype: object) -> Callable[[object], bytes]:
+    """Return the cell encoder planned for a column dtype.
+
+    Plans are looked up by dtype kind in a fixed table, so numpy integer and
+    float columns skip the per-value type dispatch without any dtype objects
+    being retained. Every other dtype uses ``encode_cell``.
+    """
+    import numpy
+
+    # Extension dtypes (nullable Int64, string, ...) can hold pd.NA.
+    if not isinstance(dtype, numpy.dtype):
+        return encode_cell
+    return _KIND_ENCODERS.get(dtype.kind, encode_cell)
+
+
+def _encode_integer(value: object) -> bytes:
+    return _NUMBER_OPEN + str(value).encode() + _NUMBER_CLOSE
+
+
+def _encode_float(value: object) -> bytes:
+    if value != value:
+        return _EMPTY_CELL
+    return _NUMBER_OPEN + str(value).encode() + _NUMBER_CLOSE
+
+
+_KIND_ENCODERS: dict[str, Callable[[object], bytes]] = {
+    "i": _encode_integer,
+    "u": _encode_integer,
+    "f": _encode_float,
+}
+
+
+def encode_series(values: Sequence[object], dtype: object) -> list[bytes]:
+    """Encode one column's Python values with the plan for its dtype."""
+    return list(map(column_encoder(dtype), values))
+
+
+@dataclass(frozen=True)
+class EncodedFrame:
+    """A DataFrame encoded once into cell fragments, one tuple per column.
+
+    Fragments carry no cell references, so the same frame can be spliced into
+    any number of templates at any table anchor with ``apply_encoded``.
+    """
+
+    columns: tuple[Hashable, ...]
+    cells: tuple[tuple[bytes, ...], ...]
+
+    @property
+    def row_count(self) -> int:
+        return len(self.cells[0]) if self.cells else 0
+
+    def take(self, rows: Iterable[int]) -> EncodedFrame:
+        """Return the given rows, in order, without encoding anything again."""
+        rows = list(rows)
+        return EncodedFrame(
+            columns=self.columns,
+            cells=tuple(tuple(column[row] for row in rows) for column in self.cells),
+        )
+
+
+def encode_frame(
+    df: pd.DataFrame, *, sanitize: SanitizePolicy | None = DEFAULT_SANITIZE_POLICY
+) -> EncodedFrame:
+    """Encode every column of ``df`` with the plan for its dtype.
+
+    String cells are sanitized under ``sanitize`` first, as by ``Pivoteer``;
+    call ``sanitizer.sanitize_frame`` beforehand to get the counts.
+    """
+    columns = [df.iloc[:, idx] for idx in range(len(df.columns))]
+    if sanitize is not None:
+        columns, _ = sanitize_columns(list(df.columns), columns, sanitize)
+    cells = []
+    for series in columns:
+        cells.append(tuple(encode_series(series.tolist(), series.dtype)))
+    return EncodedFrame(columns=tuple(df.columns), cells=tuple(cells))
+
+
+def encode_rows(rows: Sequence[Sequence[object]]) -> list[list[bytes]]:
+    """Encode row-major values into column-major cell fragments."""
+    if not rows:
+        return []
+    return [encode_column(column) for column in zip(*rows, strict=True)]
+
+
+def encode_shared_formula(
+    formula: str, ref: str, shared_index: int, row_count: int
+) -> list[bytes]:
+    """Encode a calculated column as one shared formula over ``row_count`` cells.
+
+    The first cell carries the formula text and the ``ref`` range; the others
+    only point at the shared index. No cached values are written, so Excel
+    computes the results on load.
+    """
+    if row_count < 1:
+        return []
+    index = str(shared_index).encode()
+    master = (
+        b'><f t="shared" ref="'
+        + ref.encode()
+        + b'" si="'
+        + index
+        + b'">'
+        + escape(formula).encode()
+        + b"</f></c>"
+    )
+    return [master] + [b'><f t="shared" si="' + index + b'"/></c>'] * (row_count - 1)
+
+
+def encode_row_blocks(
+    columns: Sequence[Sequence[object]],
+    dtypes: Sequence[object],
+    start_row: int,
+    start_col: int,
+    *,
+    fixed: Mapping[int, Sequence[bytes]] | None = None,
+    workers: int | Executor | None = None,
+    block_rows: int | None = None,
+    compact: bool = False,
+    styles: Mapping[int, bytes] | None = None,
+) -> bytes:
+    """Encode column values into ``<row>`` XML, optionally in parallel.
+
+    ``fixed`` holds already encoded columns (e.g. shared formulas) keyed by
+    their offset in the final layout; ``styles`` is passed to
+    ``build_row_block``. Rows are split into contiguous blocks of
+    ``block_rows`` (``DEFAULT_BLOCK_ROWS`` if ``None``); with ``workers`` (a
+    process count or an existing executor) the blocks are encoded concurrently
+    and joined in order, so the output is byte-identical to the serial path.
+    """
+    return b"".join(
+        iter_row_blocks(
+            columns,
+            dtypes,
+            start_row,
+            start_col,
+            fixed=fixed,
+            workers=workers,
+            block_rows=block_rows,
+            compact=compact,
+            styles=styles,
+        )
+    )
+
+
+def iter_row_blocks(
+    columns: Sequence[Sequence[object]],
+    dtypes: Sequence[object],
+    start_row: int,
+    start_col: int,
+    *,
+    fixed: Mapping[int, Sequence[bytes]] | None = None,
+    workers: int | Executor | None = None,
+    block_rows: int | None = None,
+    compact: bool = False,
+    styles: Mapping[int, bytes] | None = None,
+) -> Iterator[bytes]:
+    """Yield the encoded row blocks of ``encode_row_blocks`` one at a time.
+
+    Blocks are encoded on demand; with workers, at most a few blocks per
+    worker are in flight, so memory stays bounded by the block size however
+    many rows there are. ``columns`` may be pandas Series, which are turned
+    into Python values one block at a time.
+    """
+    if block_rows is None:
+        block_rows = DEFAULT_BLOCK_ROWS
+    fixed = dict(fixed or {})
+    styles = dict(styles or {})
+    source = columns or list(fixed.values())
+    row_count = len(source[0]) if source else 0
+    tasks = (
+        (
+            [_slice_rows(column, first, first + block_rows) for column in columns],
+            dtypes,
+            {
+                offset: cells[first : first + block_rows]
+                for offset, cells in fixed.items()
+            },
+            start_row + first,
+            start_col,
+            compact,
+            styles,
+        )
+        for first in range(0, row_count, block_rows)
+    )
+    if workers is None or workers == 1 or row_count <= block_rows:
+        yield from map(_encode_block, tasks)
+    elif isinstance(workers, Executor):
+        yield from _map_in_order(workers, tasks, 2 * (os.cpu_count() or 1))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from _map_in_order(pool, tasks, 2 * workers)
+
+
+def _map_in_order(
+    executor: Executor, tasks: Iterable[_BlockTask], window: int
+) -> Iterator[bytes]:
+    pending: deque[Future[bytes]] = deque()
+    for task in tasks:
+        pending.append(executor.submit(_encode_block, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _encode_block(task: _BlockTask) -> bytes:
+    columns, dtypes, fixed, start_row, start_col, compact, styles = task
+    encoded = [
+        encode_series(_python_values(values), dtype)
+        for values, dtype in zip(columns, dtypes, strict=True)
+    ]
+    for offset in sorted(fixed):
+        encoded.insert(offset, list(fixed[offset]))
+    return build_row_block(
+        encoded, start_row, start_col, compact=compact, styles=styles
+    )
+
+
+def _slice_rows(column: Sequence[object], first: int, stop: int) -> Sequence[object]:
+    iloc = getattr(column, "iloc", None)
+    return iloc[first:stop] if iloc is not None else column[first:stop]
+
+
+def _python_values(column: Sequence[object]) -> Sequence[object]:
+    """Turn a block of a Series into Python values; sequences pass through."""
+    if getattr(column, "iloc", None) is None:
+        return column
+    return column.tolist()
+
+
+def build_row_block(
+    columns: Sequence[Sequence[bytes]],
+    start_row: int,
+    start_col: int,
+    *,
+    compact: bool = False,
+    styles: Mapping[int, bytes] | None = None,
+) -> bytes:
+    """Assemble encoded columns into consecutive ``<row>`` elements.
+
+    ``columns`` holds one list of cell fragments per table column; all lists must
+    have the same length. Every row carries a ``spans`` hint covering the columns.
+    ``styles`` maps column offsets to a style attribute (``b' s="3"'``) given to
+    the column's non-empty cells; rows get no attributes besides ``r`` and
+    ``spans``. ``compact`` leaves out empty cells, rows without any cells, and
+    the ``r`` attribute of every cell that directly follows the previous one
+    (or starts the row in column A), which the spec allows.
+    """
+    if start_row < 1 or start_col < 1:
+        raise ValueError("Start row/col must be >= 1.")
+    if not columns:
+        return b""
+
+    row_count = len(columns[0])
+    if any(len(column) != row_count for column in columns):
+        raise ValueError("Encoded columns must have equal lengths.")
+    if styles:
+        columns = [
+            _style_column(column, styles[offset]) if offset in styles else column
+            for offset, column in enumerate(columns)
+        ]
+
+    letters = [
+        b'<c r="' + column_index_to_letter(start_col + offset).encode()
+        for offset in range(len(columns))
+    ]
+    spans = f'" spans="{start_col}:{start_col + len(columns) - 1}">'.encode()
+    if compact:
+        return _build_compact_rows(columns, letters, spans, start_row, start_col)
+    parts: list[bytes] = []
+    append = parts.append
+    for offset in range(row_count):
+        row_number = str(start_row + offset).encode()
+        append(b'<row r="' + row_number + spans)
+        for letter, column in zip(letters, columns, strict=True):
+            append(letter + row_number + b'"' + column[offset])
+        append(b"</row>")
+    return b"".join(parts)
+
+
+def _build_compact_rows(
+    columns: Sequence[Sequence[bytes]],
+    letters: list[bytes],
+    spans: bytes,
+    start_row: int,
+    start_col: int,
+) -> bytes:
+    parts: list[bytes] = []
+    append = parts.append
+    numbered = list(enumerate(zip(letters, columns, strict=True), start=start_col))
+    for offset in range(len(columns[0])):
+        row_number = str(start_row + offset).encode()
+        row_start = len(parts)
+        next_col = 1
+        for col, (letter, column) in numbered:
+            fragment = column[offset]
+            if fragment == _EMPTY_CELL:
+                continue
+            if col == next_col:
+                append(b"<c" + fragment)
+            else:
+                append(letter + row_number + b'"' + fragment)
+            next_col = col + 1
+        if len(parts) > row_start:
+            parts.insert(row_start, b'<row r="' + row_number + spans)
+            append(b"</row>")
+    return b"".join(parts)
+
+
+def _style_column(column: Sequence[bytes], style: bytes) -> list[bytes]:
+    return [
+        fragment if fragment == _EMPTY_CELL else style + fragment for fragment in column
+    ]
@@ -0,0 +1,275 @@
+"""Vectorized clean-up of strings that XML or Excel cannot store."""
+
+from __future__ import annotations
+
+import functools
+import logging
+import re
+from collections.abc import Hashable, Mapping, Sequence
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import TYPE_CHECKING
+
+from pivoteer.exceptions import InvalidDataError
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+
+# Excel stores at most this many characters in a cell.
+MAX_CELL_LENGTH = 32_767
+
+# Characters outside the XML 1.0 Char production. Lone surrogates only occur in
+# Python strings; Arrow-backed strings cannot hold them and RE2 rejects them.
+_ILLEGAL_PATTERN = r"[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]"
+_ARROW_ILLEGAL_PATTERN = "[\\x00-\\x08\\x0b\\x0c\\x0e-\\x1f\ufffe\uffff]"
+# Excel decodes ``_xHHHH_`` in cell text; literal ones are written with their
+# underscore escaped as ``_x005F_`` so they read back unchanged.
+_ESCAPE_PATTERN = r"_x[0-9A-Fa-f]{4}_"
+_ESCAPE_TAIL_PATTERN = r"_(x[0-9A-Fa-f]{4}_)"
+_ESCAPED_ESCAPE = r"_x005F_\1"
+
+ILLEGAL_CHAR_ACTIONS = ("escape", "strip", "raise")
+OVERLONG_ACTIONS = ("truncate", "raise")
+
+
+@dataclass(frozen=True)
+class SanitizePolicy:
+    """What to do with string cells that XML or Excel cannot store.
+
+    ``illegal_chars`` handles control characters and other code points XML 1.0
+    forbids: ``"escape"`` writes them as Excel's ``_xHHHH_`` escapes, which
+    Excel turns back into the original character, ``"strip"`` removes them and
+    ``"raise"`` fails before anything is written. ``overlong`` handles strings
+    longer than ``max_length``: ``"truncate"`` cuts them, ``"raise"`` fails.
+    Text that looks like an escape is always escaped itself.
+    """
+
+    illegal_chars: str = "escape"
+    overlong: str = "truncate"
+    max_length: int = MAX_CELL_LENGTH
+
+    def __post_init__(self) -> None:
+        if self.illegal_chars not in ILLEGAL_CHAR_ACTIONS:
+            raise ValueError(
+                f"Unknown illegal_chars action {self.illegal_chars!r}; "
+                f"expected one of {ILLEGAL_CHAR_ACTIONS}."
+            )
+        if self.overlong not in OVERLONG_ACTIONS:
+            raise ValueError(
+                f"Unknown overlong action {self.overlong!r}; "
+                f"expected one of {OVERLONG_ACTIONS}."
+            )
+        if self.max_length < 1:
+            raise ValueError("max_length must be >= 1.")
+
+
+DEFAULT_SANITIZE_POLICY = SanitizePolicy()
+
+
+@dataclass(frozen=True)
+class SanitizeReport:
+    """Cells changed by sanitizing, counted per source column.
+
+    Only columns with at least one changed cell are listed.
+    """
+
+    illegal_chars: Mapping[Hashable, int] = field(default_factory=dict)
+    truncated: Mapping[Hashable, int] = field(default_factory=dict)
+
+    @property
+    def illegal_char_cells(self) -> int:
+        return sum(self.illegal_chars.values())
+
+    @property
+    def truncated_cells(self) -> int:
+        return sum(self.truncated.values())
+
+
+def sanitize_columns(
+    labels: Sequence[Hashable],
+    columns: Sequence[pd.Series],
+    policy: SanitizePolicy,
+    *,
+    context: str = "DataFrame",
+) -> tuple[list[pd.Series], SanitizeReport]:
+    """Sanitize the string cells of each column under ``policy``.
+
+    Every check is a whole-column pandas string operation, and only columns
+    with hits are copied; numeric, boolean and datetime columns are skipped
+    outright. Categorical columns are sanitized through their categories.
+    ``context`` names the data in errors and log messages.
+    """
+    illegal: dict[Hashable, int] = {}
+    truncated: dict[Hashable, int] = {}
+    result = []
+    for label, series in zip(labels, columns, strict=True):
+        series, illegal_count, truncated_count = _sanitize_series(
+            series, policy, label=label, context=context
+        )
+        if illegal_count:
+            illegal[label] = illegal_count
+        if truncated_count:
+            truncated[label] = truncated_count
+        result.append(series)
+
+    report = SanitizeReport(illegal_chars=illegal, truncated=truncated)
+    if illegal or truncated:
+        LOGGER.warning(
+            "%s: %s %d cell(s) with characters XML cannot store and truncated "
+            "%d cell(s) to %d characters.",
+            context,
+            "stripped" if policy.illegal_chars == "strip" else "escaped",
+            report.illegal_char_cells,
+            report.truncated_cells,
+            policy.max_length,
+        )
+    return result, report
+
+
+def sanitize_frame(
+    df: pd.DataFrame, policy: SanitizePolicy = DEFAULT_SANITIZE_POLICY
+) -> tuple[pd.DataFrame, SanitizeReport]:
+    """Return ``df`` with its string cells sanitized, and what was changed.
+
+    The frame itself is returned when nothing needs changing; otherwise a
+    shallow copy with only the affected columns replaced.
+    """
+    originals = [df.iloc[:, idx] for idx in range(len(df.columns))]
+    cleaned, report = sanitize_columns(list(df.columns), originals, policy)
+    if all(
+        series is original for original, series in zip(originals, cleaned, strict=True)
+    ):
+        return df, report
+    df = df.copy(deep=False)
+    for idx, (original, series) in enumerate(zip(originals, cleaned, strict=True)):
+        if series is not original:
+            df.isetitem(idx, series)
+    return df, report
+
+
+def _sanitize_series(
+    series: pd.Series, policy: SanitizePolicy, *, label: Hashable, context: str
+) -> tuple[pd.Series, int, int]:
+    if _is_category(series.dtype):
+        cleaned, illegal, overlong = _sanitize_categories(series, policy)
+    elif series.dtype.kind == "O" or _is_string_dtype(series.dtype):
+        cleaned, illegal, overlong = _clean_strings(series, policy)
+    else:
+        return series, 0, 0
+
+    illegal_count = int(illegal.sum())
+    if illegal_count and policy.illegal_chars == "raise":
+        raise InvalidDataError(
+            f"{context} column {label!r} has {illegal_count} cell(s) with "
+            "characters XML cannot store, first at row "
+            f"{series.index[int(illegal.argmax())]!r}."
+        )
+    truncated_count = int(overlong.sum())
+    if truncated_count and policy.overlong == "raise":
+        raise InvalidDataError(
+            f"{context} column {label!r} has {truncated_count} cell(s) longer "
+            f"than {policy.max_length} characters, first at row "
+            f"{series.index[int(overlong.argmax())]!r}."
+        )
+    return cleaned, illegal_count, truncated_count
+
+
+def _clean_strings(
+    series: pd.Series, policy: SanitizePolicy
+) -> tuple[pd.Series, np.ndarray, np.ndarray]:
+    """Clean the strings of ``series``; return it and the per-cell hit masks.
+
+    Non-string values of object columns are left alone. Hits are not cleaned
+    when the policy raises for them. Strings are truncated before anything is
+    escaped, so ``max_length`` counts the characters Excel shows and no escape
+    is cut in half.
+    """
+    try:
+        strings = series.str
+    except AttributeError:
+        # Object columns without any strings, e.g. of ``Decimal`` values.
+        no_hits = _np().zeros(len(series), dtype=bool)
+        return series, no_hits, no_hits
+    pattern = (
+        _ARROW_ILLEGAL_PATTERN
+        if getattr(series.dtype, "storage", None) == "pyarrow"
+        else _ILLEGAL_PATTERN
+    )
+    illegal = _mask(strings.contains(pattern, regex=True))
+    if illegal.any() and policy.illegal_chars == "strip":
+        series = series.mask(illegal, strings.replace(pattern, "", regex=True))
+        strings = series.str
+
+    overlong = _mask(strings.len() > policy.max_length)
+    if overlong.any() and policy.overlong != "raise":
+        series = series.mask(overlong, strings.slice(0, policy.max_length))
+        strings = series.str
+
+    literal = _mask(strings.contains(_ESCAPE_PATTERN, regex=True))
+    if literal.any():
+        escaped = strings.replace(_ESCAPE_TAIL_PATTERN, _ESCAPED_ESCAPE, regex=True)
+        series = series.mask(literal, escaped)
+        strings = series.str
+
+    if illegal.any() and policy.illegal_chars == "escape":
+        escaped = strings.replace(pattern, _escape_char, regex=True)
+        series = series.mask(illegal, escaped)
+    return series, illegal, overlong
+
+
+def _sanitize_categories(
+    series: pd.Series, policy: SanitizePolicy
+) -> tuple[pd.Series, np.ndarray, np.ndarray]:
+    """Clean the categories once and map the hits back to the cells."""
+    categories = series.cat.categories
+    no_hits = _np().zeros(len(series), dtype=bool)
+    if categories.dtype.kind != "O" and not _is_string_dtype(categories.dtype):
+        return series, no_hits, no_hits
+    original = _pandas().Series(categories)
+    cleaned, illegal, overlong = _clean_strings(original, policy)
+    if cleaned is original:
+        return series, no_hits, no_hits
+
+    codes = series.cat.codes.to_numpy()
+    present = codes >= 0
+    cell_illegal = present & illegal[codes]
+    cell_overlong = present & overlong[codes]
+    if cleaned.is_unique:
+        series = series.cat.rename_categories(cleaned.tolist())
+    else:
+        mapping = dict(zip(original.tolist(), cleaned.tolist(), strict=True))
+        series = series.astype(object).map(mapping)
+    return series, cell_illegal, cell_overlong
+
+
+def _mask(hits: pd.Series) -> np.ndarray:
+    return hits.fillna(False).to_numpy(dtype=bool)
+
+
+def _escape_char(match: re.Match[str]) -> str:
+    return f"_x{ord(match.group(0)):04X}_"
+
+
+def _is_string_dtype(dtype: object) -> bool:
+    return not _is_category(dtype) and _pandas().api.types.is_string_dtype(dtype)
+
+
+def _is_category(dtype: object) -> bool:
+    return getattr(dtype, "name", None) == "category"
+
+
+@functools.cache
+def _pandas() -> ModuleType:
+    import pandas
+
+    return pandas
+
+
+@functools.cache
+def _np() -> ModuleType:
+    import numpy
+
+    return numpy
@@ -0,0 +1,379 @@
+"""Byte-level splicing of worksheet XML around a table's row block."""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+
+from pivoteer.exceptions import XmlStructureError
+from pivoteer.utils import column_index_to_letter, column_letter_to_index
+
+_SHEET_DATA_RE = re.compile(
+    rb"<(?P<prefix>[A-Za-z_][\w.-]*:)?sheetData\b[^>]*?(?P<empty>/?)>"
+)
+_ROW_RE = re.compile(rb"<row\b(?P<attrs>[^>]*?)(?P<empty>/?)>")
+_ROW_CLOSE = b"</row>"
+_ROW_INDEX_RE = re.compile(rb'\sr="(\d+)"')
+_CELL_TAG_RE = re.compile(rb"<c\b([^>]*)>")
+_CELL_COLUMN_RE = re.compile(rb'\sr="([A-Z]+)\d+"')
+_CELL_STYLE_RE = re.compile(rb'\ss="(\d+)"')
+_ATTR_NAME_RE = re.compile(rb'\s([\w:.-]+)="')
+# Attributes that spliced rows and cells reproduce or that carry no formatting.
+_SPLICED_ROW_ATTRS = frozenset({b"r", b"spans", b"x14ac:dyDescent"})
+_SPLICED_CELL_ATTRS = frozenset({b"r", b"s", b"t"})
+_CELL_CLOSE = b"</c>"
+_REPLACED_CELL_ATTRS_RE = re.compile(rb'\s[rt]="[^"]*"')
+_EMPTY_CELL = b"/>"
+_SHARED_INDEX_RE = re.compile(rb'<(?:[A-Za-z_][\w.-]*:)?f\b[^>]*?\ssi="(\d+)"')
+_DIMENSION_RE = re.compile(rb'(<dimension\b[^>]*?\sref=")[^"]*(")')
+
+
+@dataclass(frozen=True)
+class WorksheetSegments:
+    """Worksheet XML split around the rows occupied by a table's data block.
+
+    ``prefix`` ends with the opening ``<sheetData>`` tag and ``suffix`` starts
+    with the closing ``</sheetData>`` tag, so the five segments concatenate back
+    to a well-formed worksheet.
+    """
+
+    prefix: bytes
+    before: bytes
+    block: bytes
+    after: bytes
+    suffix: bytes
+
+
+def split_worksheet(
+    xml: bytes,
+    first_row: int,
+    last_row: int,
+    first_col: int | None = None,
+    last_col: int | None = None,
+) -> WorksheetSegments:
+    """Split worksheet XML into prefix, rows before, row block, rows after, suffix.
+
+    Rows numbered ``first_row`` to ``last_row`` form the block. When a column
+    range is given, cells inside the block must fall within it; anything else
+    would be lost by replacing the block and raises ``XmlStructureError``.
+    """
+    if first_row < 1 or last_row < first_row - 1:
+        raise ValueError("Row block bounds are invalid.")
+
+    match = _SHEET_DATA_RE.search(xml)
+    if match is None:
+        raise XmlStructureError("sheetData element not found.")
+    if match.group("prefix"):
+        raise XmlStructureError(
+            "Namespace-prefixed worksheets cannot be spliced; use the DOM engine."
+        )
+
+    if match.group("empty"):
+        tag = match.group(0)
+        prefix = xml[: match.start()] + tag[:-2].rstrip() + b">"
+        suffix = b"</sheetData>" + xml[match.end() :]
+        return WorksheetSegments(prefix, b"", b"", b"", suffix)
+
+    body_start = match.end()
+    body_end = xml.find(b"</sheetData>", body_start)
+    if body_end == -1:
+        raise XmlStructureError("sheetData closing tag not found.")
+
+    block_start = block_end = None
+    previous_row = 0
+    for row_start, row_end, row_index in _iter_rows(xml, body_start, body_end):
+        if row_index <= previous_row:
+            raise XmlStructureError("Worksheet rows are not in ascending order.")
+        previous_row = row_index
+
+        if row_index < first_row:
+            continue
+        if row_index > last_row:
+            if block_start is None:
+                block_start = block_end = row_start
+            break
+        if block_start is None:
+            block_start = row_start
+        if first_col is not None and last_col is not None:
+            _check_row_columns(xml[row_start:row_end], row_index, first_col, last_col)
+        block_end = row_end
+
+    if block_start is None or block_end is None:
+        block_start = block_end = body_end
+
+    return WorksheetSegments(
+        prefix=xml[:body_start],
+        before=xml[body_start:block_start],
+        block=xml[block_start:block_end],
+        after=xml[block_end:body_end],
+        suffix=xml[body_end:],
+    )
+
+
+def splice_worksheet(
+    segments: WorksheetSegments, rows: bytes | Iterable[bytes]
+) -> bytes:
+    """Concatenate segments with freshly generated row bytes replacing the block."""
+    return b"".join(iter_spliced_worksheet(segments, rows))
+
+
+def iter_spliced_worksheet(
+    segments: WorksheetSegments, rows: bytes | Iterable[bytes]
+) -> Iterator[bytes]:
+    """Yield the spliced worksheet in chunks, pulling row bytes as they come."""
+    yield segments.prefix
+    yield segments.before
+    if isinstance(rows, bytes):
+        yield rows
+    else:
+        yield from rows
+    yield segments.after
+    yield segments.suffix
+
+
+def iter_cell_positions(segment: bytes) -> Iterator[tuple[int, int]]:
+    """Yield (row, col) for every cell in a segment of whole rows.
+
+    A cell without an ``r`` attribute, as written in compact mode, sits in the
+    column after the previous cell of its row.
+    """
+    for row_start, row_end, row_index in _iter_rows(segment, 0, len(segment)):
+        for col, _ in _iter_cells(segment[row_start:row_end]):
+            yield row_index, col
+
+
+def first_row_styles(segment: bytes) -> dict[int, bytes]:
+    """Return the ``s`` attribute of each styled cell in the segment's first row.
+
+    Keys are column indexes, values the attribute with a leading space, ready
+    for ``build_row_block``.
+    """
+    for row_start, row_end, _ in _iter_rows(segment, 0, len(segment)):
+        return {
+            col: b' s="' + style.group(1) + b'"'
+            for col, attrs in _iter_cells(segment[row_start:row_end])
+            if (style := _CELL_STYLE_RE.search(attrs)) is not None
+        }
+    return {}
+
+
+def patch_row_cells(
+    segment: bytes, first_row: int, columns: Mapping[int, Sequence[bytes]]
+) -> bytes:
+    """Overwrite the cells of ``columns`` in a segment of whole rows.
+
+    ``columns`` maps column indexes to cell fragments, one per row from
+    ``first_row``, as built by the row encoder. Replaced cells keep their
+    attributes except the type, and their style unless the new value is empty;
+    missing cells and rows are inserted in order. Everything else is copied
+    as is, apart from references added to compact cells of patched rows.
+    """
+    if not columns:
+        return segment
+    row_count = len(next(iter(columns.values())))
+    last_row = first_row + row_count - 1
+    parts: list[bytes] = []
+    position = 0
+    tail = len(segment)
+    next_row = first_row
+    for row_start, row_end, row_index in _iter_rows(segment, 0, len(segment)):
+        if row_index > last_row:
+            tail = row_start
+            break
+        if row_index < first_row:
+            continue
+        parts.append(segment[position:row_start])
+        parts.extend(
+            _new_row(row, first_row, columns) for row in range(next_row, row_index)
+        )
+        parts.append(
+            _patch_row(segment[row_start:row_end], row_index, first_row, columns)
+        )
+        position = row_end
+        next_row = row_index + 1
+    parts.append(segment[position:tail])
+    parts.extend(
+        _new_row(row, first_row, columns) for row in range(next_row, last_row + 1)
+    )
+    parts.append(segment[tail:])
+    return b"".join(parts)
+
+
+def formatting_lost_by_splice(segment: bytes) -> str | None:
+    """Describe the formatting of a row block that splicing it would drop.
+
+    Spliced rows carry only the cell styles of the block's first row, per
+    column. Returns ``None`` when that reproduces the block, otherwise names
+    the first row attribute, cell attribute or cell style that would be lost.
+    """
+    first_styles: dict[int, bytes] | None = None
+    for row_start, row_end, row_index in _iter_rows(segment, 0, len(segment)):
+        row = segment[row_start:row_end]
+        tag = _ROW_RE.match(row)
+        if tag is None:
+            raise XmlStructureError(f"Row {row_index} is malformed.")
+        for name in _ATTR_NAME_RE.findall(tag.group("attrs")):
+            if name not in _SPLICED_ROW_ATTRS:
+                return f"row {row_index} sets {name.decode()}"
+
+        styles: dict[int, bytes] = {}
+        for col, attrs in _iter_cells(row):
+            cell_ref = _cell_ref(col, row_index).decode()
+            for name in _ATTR_NAME_RE.findall(attrs):
+                if name not in _SPLICED_CELL_ATTRS:
+                    return f"cell {cell_ref} sets {name.decode()}"
+            style = _CELL_STYLE_RE.search(attrs)
+            if style is not None:
+                styles[col] = style.group(1)
+            if first_styles is not None and styles.get(col) != first_styles.get(col):
+                return f"cell {cell_ref} is styled unlike the first data row"
+        if first_styles is None:
+            first_styles = styles
+    return None
+
+
+def next_shared_formula_index(*segments: bytes) -> int:
+    """Return the first shared formula index unused by the given segments."""
+    indices = [
+        int(match.group(1))
+        for segment in segments
+        for match in _SHARED_INDEX_RE.finditer(segment)
+    ]
+    return max(indices, default=-1) + 1
+
+
+def replace_dimension(prefix: bytes, ref: str) -> bytes:
+    """Rewrite the ``<dimension ref>`` attribute inside the worksheet prefix."""
+    return _DIMENSION_RE.sub(
+        lambda match: match.group(1) + ref.encode() + match.group(2), prefix, count=1
+    )
+
+
+def _iter_rows(xml: bytes, start: int, end: int) -> Iterable[tuple[int, int, int]]:
+    """Yield (start offset, end offset, row index) for each row in sheetData."""
+    row_index = 0
+    position = start
+    while True:
+        match = _ROW_RE.search(xml, position, end)
+        if match is None:
+            return
+        index_match = _ROW_INDEX_RE.search(match.group("attrs"))
+        row_index = int(index_match.group(1)) if index_match else row_index + 1
+
+        if match.group("empty"):
+            row_end = match.end()
+        else:
+            close = xml.find(_ROW_CLOSE, match.end(), end)
+            if close == -1:
+                raise XmlStructureError(f"Row {row_index} is not closed.")
+            row_end = close + len(_ROW_CLOSE)
+
+        yield match.start(), row_end, row_index
+        position = row_end
+
+
+def _iter_cells(row: bytes) -> Iterator[tuple[int, bytes]]:
+    """Yield (column, attributes) for each cell of a row."""
+    col = 0
+    for cell in _CELL_TAG_RE.finditer(row):
+        attrs = cell.group(1)
+        ref = _CELL_COLUMN_RE.search(attrs)
+        col = column_letter_to_index(ref.group(1).decode()) if ref else col + 1
+        yield col, attrs
+
+
+def _patch_row(
+    row: bytes, row_index: int, first_row: int, columns: Mapping[int, Sequence[bytes]]
+) -> bytes:
+    """Return the row with the target cells replaced or inserted."""
+    tag = _ROW_RE.match(row)
+    if tag is None:
+        raise XmlStructureError(f"Row {row_index} is malformed.")
+    if tag.group("empty"):
+        return _new_row(row_index, first_row, columns, tag.group("attrs").rstrip())
+
+    pending = sorted(columns)
+    parts = [row[: tag.end()]]
+    position = tag.end()
+    col = 0
+    for cell in _CELL_TAG_RE.finditer(row, tag.end()):
+        attrs = cell.group(1)
+        ref = _CELL_COLUMN_RE.search(attrs)
+        col = column_letter_to_index(ref.group(1).decode()) if ref else col + 1
+        if attrs.endswith(b"/"):
+            cell_end = cell.end()
+        else:
+            close = row.find(_CELL_CLOSE, cell.end())
+            if close == -1:
+                raise XmlStructureError(f"A cell of row {row_index} is not closed.")
+            cell_end = close + len(_CELL_CLOSE)
+        parts.append(row[position : cell.start()])
+        while pending and pending[0] < col:
+            target = pending.pop(0)
+            parts.append(_new_cell(target, row_index, b"", columns[target], first_row))
+        if pending and pending[0] == col:
+            pending.pop(0)
+            parts.append(_new_cell(col, row_index, attrs, columns[col], first_row))
+        elif ref is None:
+            # Cells after an inserted one need their own reference.
+            reference = _cell_ref(col, row_index)
+            parts.append(
+                b'<c r="' + reference + b'"' + row[cell.start() + 2 : cell_end]
+            )
+        else:
+            parts.append(row[cell.start() : cell_end])
+        position = cell_end
+    close = len(row) - len(_ROW_CLOSE)
+    parts.append(row[position:close])
+    parts.extend(
+        _new_cell(target, row_index, b"", columns[target], first_row)
+        for target in pending
+    )
+    parts.append(row[close:])
+    return b"".join(parts)
+
+
+def _new_row(
+    row_index: int,
+    first_row: int,
+    columns: Mapping[int, Sequence[bytes]],
+    attrs: bytes | None = None,
+) -> bytes:
+    if attrs is None:
+        attrs = b' r="' + str(row_index).encode() + b'"'
+    cells = b"".join(
+        _new_cell(col, row_index, b"", columns[col], first_row)
+        for col in sorted(columns)
+    )
+    return b"<row" + attrs + b">" + cells + _ROW_CLOSE
+
+
+def _new_cell(
+    col: int,
+    row_index: int,
+    attrs: bytes,
+    fragments: Sequence[bytes],
+    first_row: int,
+) -> bytes:
+    """Build a cell from its old attributes and a fragment of the row encoder."""
+    fragment = fragments[row_index - first_row]
+    kept = _REPLACED_CELL_ATTRS_RE.sub(b"", attrs.rstrip(b"/"))
+    if fragment == _EMPTY_CELL:
+        kept = _CELL_STYLE_RE.sub(b"", kept)
+    return b'<c r="' + _cell_ref(col, row_index) + b'"' + kept + fragment
+
+
+def _cell_ref(col: int, row_index: int) -> bytes:
+    return (column_index_to_letter(col) + str(row_index)).encode()
+
+
+def _check_row_columns(
+    row: bytes, row_index: int, first_col: int, last_col: int
+) -> None:
+    for col, _ in _iter_cells(row):
+        if col < first_col or col > last_col:
+            raise XmlStructureError(
+                f"Row {row_index} has cells outside the table columns; "
+                "it cannot be spliced without losing data."
+            )
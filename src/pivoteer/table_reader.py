@@ -0,0 +1,409 @@
+"""Streaming reader that loads one table's rows back into a DataFrame."""
+
+from __future__ import annotations
+
+import html
+import posixpath
+import re
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from lxml import etree
+
+from pivoteer.exceptions import TableNotFoundError, XmlStructureError
+from pivoteer.models import TableRef
+from pivoteer.part_store import PartStore
+from pivoteer.template_source import LoadedTemplate
+from pivoteer.utils import column_letter_to_index, parse_a1_range
+from pivoteer.xml_engine import ParserPolicy, XmlEngine
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+_TEXT = f"{{{_NS_MAIN}}}t"
+_RUN = f"{{{_NS_MAIN}}}r"
+_SHARED_ITEM = f"{{{_NS_MAIN}}}si"
+_RELATIONSHIP = f"{{{_NS_PKG_REL}}}Relationship"
+
+_REL_TYPE_SHARED_STRINGS = "/sharedStrings"
+_REL_TYPE_STYLES = "/styles"
+
+# Built-in number formats that display dates or times (ECMA-376 18.8.30).
+_BUILTIN_DATE_FORMATS = frozenset(
+    [*range(14, 23), *range(27, 37), *range(45, 48), *range(50, 59)]
+)
+_FORMAT_LITERAL_RE = re.compile(r'"[^"]*"|\\.|\[[^\]]*\]')
+_DATE_TOKEN_RE = re.compile(r"[dmyhs]", re.IGNORECASE)
+
+_SHEET_DATA_RE = re.compile(rb"<([A-Za-z_][\w.-]*:)?sheetData\b[^>]*?>")
+# One token per row start tag or cell. Groups: row marker, row number, column
+# letters, style, type, value, inline string body. The optional lookaheads pick
+# attributes in any order; absent groups come back empty.
+_TOKEN_RE = re.compile(
+    rb'(<row)\b(?=(?:[^>]*?\sr="(\d+)")?)[^>]*>'
+    rb'|<c\b(?=(?:[^>]*?\sr="([A-Z]+)\d+")?)'
+    rb'(?=(?:[^>]*?\ss="(\d+)")?)(?=(?:[^>]*?\st="(\w+)")?)[^>]*?'
+    rb"(?:/>|>(?:<f\b[^>]*?(?:/>|>[^<]*</f>))?"
+    rb"(?:<v>([^<]*)</v>|<is>(.*?)</is>)?.*?</c>)",
+    re.DOTALL,
+)
+# Tags and phonetic runs around the text of an inline string.
+_INLINE_MARKUP_RE = re.compile(rb"<rPh\b.*?</rPh>|<[^>]*>", re.DOTALL)
+# Characters XML cannot carry are stored as ``_xHHHH_``; ``_x005F_`` escapes the
+# underscore of literal text that looks like an escape.
+_ESCAPE_RE = re.compile(r"_x([0-9A-Fa-f]{4})_")
+_CHUNK_SIZE = 1024 * 1024
+
+# Type code for numbers shown with a date format; cells keep their ``t`` value.
+_DATE = b"date"
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+_EXCEL_1904_EPOCH = datetime(1904, 1, 1)
+
+
+def read_table(
+    source: str | Path | PartStore,
+    table_name: str,
+    *,
+    parser_policy: ParserPolicy | None = None,
+    output: str = "pandas",
+) -> pd.DataFrame | Any:
+    """Load the data rows of a table into a DataFrame, or an Arrow table.
+
+    Only the table's worksheet is read, as a stream of byte chunks that is
+    scanned for the table's rows and abandoned after the last one, so memory
+    follows the size of the result, not of the sheet. Cells are decoded from
+    inline and shared strings, numbers, booleans and date-formatted serials,
+    one whole column at a time, into NumPy-backed columns (``int64``,
+    ``float64``, ``bool``, ``datetime64``; text and mixed columns hold Python
+    objects). Serials count from the epoch of the workbook's date system, 1900
+    or 1904, and ``_xHHHH_`` escapes in text are decoded.
+    ``output="arrow"`` returns a ``pyarrow.Table`` and needs ``pyarrow``.
+    """
+    if output not in ("pandas", "arrow"):
+        raise ValueError(f"Unknown output {output!r}; expected 'pandas' or 'arrow'.")
+    if not isinstance(source, PartStore):
+        source = Path(source)
+    engine = XmlEngine(source, parser_policy=parser_policy)
+    if isinstance(source, LoadedTemplate):
+        workbook_map = source.workbook_map
+    else:
+        workbook_map = engine.build_workbook_map()
+    table_ref = workbook_map.tables.get(table_name)
+    if table_ref is None:
+        raise TableNotFoundError(f"Table not found: {table_name}")
+
+    with engine.open_archive() as archive:
+        table = engine.read_xml(archive, table_ref.table_path).getroot()
+        header_rows = int(table.get("headerRowCount", "1"))
+        totals_rows = int(table.get("totalsRowCount", "0"))
+        epoch = _workbook_epoch(engine, archive)
+        rels = _workbook_relationships(engine, archive)
+        shared_strings = _read_shared_strings(
+            archive, rels.get(_REL_TYPE_SHARED_STRINGS), engine.parser_policy
+        )
+        date_styles = _read_date_styles(engine, archive, rels.get(_REL_TYPE_STYLES))
+
+        (start_row, start_col), (end_row, end_col) = parse_a1_range(table_ref.ref)
+        columns = _read_columns(
+            archive,
+            table_ref,
+            rows=(start_row + header_rows, end_row - totals_rows),
+            cols=(start_col, end_col),
+            date_styles=date_styles,
+        )
+
+    frame = _build_frame(
+        table_ref, columns, shared_strings, end_col - start_col + 1, epoch
+    )
+    if output == "pandas":
+        return frame
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("read_table(..., output='arrow') needs pyarrow.") from exc
+    return pyarrow.Table.from_pandas(frame, preserve_index=False)
+
+
+def _read_columns(
+    archive: PartStore,
+    table_ref: TableRef,
+    *,
+    rows: tuple[int, int],
+    cols: tuple[int, int],
+    date_styles: frozenset[bytes],
+) -> list[tuple[list[bytes | None], list[bytes | None]]]:
+    """Collect raw cell values and type codes, one pair of lists per column.
+
+    Nothing is decoded here: one pattern splits each chunk into row and cell
+    tokens, and every cell inside the table costs a few list stores.
+    """
+    first_row, last_row = rows
+    first_col, last_col = cols
+    row_count = max(last_row - first_row + 1, 0)
+    width = last_col - first_col + 1
+    raws: list[list[bytes | None]] = [[None] * row_count for _ in range(width)]
+    codes: list[list[bytes | None]] = [[None] * row_count for _ in range(width)]
+    column_index: dict[bytes, int] = {}
+
+    row_number = 0
+    offset = col_number = -1
+    for tokens in _iter_tokens(archive, table_ref.worksheet_path):
+        for row_tag, row_ref, letters, style, code, value, inline in tokens:
+            if row_tag:
+                row_number = int(row_ref) if row_ref else row_number + 1
+                if row_number > last_row:
+                    return list(zip(raws, codes, strict=True))
+                offset = row_number - first_row
+                col_number = 0
+                continue
+            if letters:
+                col_number = column_index.get(letters, 0)
+                if not col_number:
+                    col_number = column_letter_to_index(letters.decode())
+                    column_index[letters] = col_number
+            else:
+                col_number += 1
+            column = col_number - first_col
+            if offset < 0 or not 0 <= column < width:
+                continue
+            if inline:
+                raw = inline
+            elif value:
+                raw = value
+            else:
+                continue
+            if not code:
+                code = _DATE if style in date_styles else b"n"
+            raws[column][offset] = raw
+            codes[column][offset] = code
+    return list(zip(raws, codes, strict=True))
+
+
+def _iter_tokens(archive: PartStore, path: str) -> Iterator[list[tuple[bytes, ...]]]:
+    """Yield the row and cell tokens of a worksheet, one chunk at a time.
+
+    Each chunk is cut after its last complete row, so no token is split.
+    """
+    try:
+        stream = archive.open(path)
+    except KeyError as exc:
+        raise XmlStructureError(f"Missing XML part: {path}") from exc
+    with stream:
+        buffer = b""
+        in_sheet_data = False
+        while True:
+            chunk = stream.read(_CHUNK_SIZE)
+            buffer += chunk
+            if not in_sheet_data:
+                match = _SHEET_DATA_RE.search(buffer)
+                if match is None:
+                    if not chunk:
+                        raise XmlStructureError("sheetData element not found.")
+                    continue
+                if match.group(1):
+                    raise XmlStructureError(
+                        "Namespace-prefixed worksheets cannot be read as tables."
+                    )
+                buffer = buffer[match.end() :]
+                in_sheet_data = True
+            if chunk:
+                end = buffer.rfind(b"</row>") + len(b"</row>")
+            else:
+                end = buffer.find(b"</sheetData>")
+                end = len(buffer) if end == -1 else end
+            if end > len(b"</row>"):
+                yield _TOKEN_RE.findall(buffer, 0, end)
+                buffer = buffer[end:]
+            if not chunk:
+                return
+
+
+def _build_frame(
+    table_ref: TableRef,
+    columns: list[tuple[list[bytes | None], list[bytes | None]]],
+    shared_strings: list[str],
+    width: int,
+    epoch: datetime,
+) -> pd.DataFrame:
+    import pandas as pd
+
+    names = list(table_ref.columns)
+    if len(names) != width:
+        names = [f"Column{idx}" for idx in range(1, width + 1)]
+    data = {
+        name: _decode_column(raws, codes, shared_strings, epoch)
+        for name, (raws, codes) in zip(names, columns, strict=True)
+    }
+    return pd.DataFrame(data, columns=names)
+
+
+def _decode_column(
+    raws: list[bytes | None],
+    codes: list[bytes | None],
+    shared_strings: list[str],
+    epoch: datetime,
+) -> Any:
+    """Turn one column's raw values into a NumPy array in a single pass.
+
+    Columns holding one kind of value are converted by NumPy, text columns by
+    decoding all their cells joined into one buffer; only mixed columns are
+    decoded cell by cell.
+    """
+    import numpy as np
+
+    kinds = set(codes)
+    kinds.discard(None)
+    values = np.array(raws, dtype=object)
+    missing = np.equal(values, None)
+    if kinds in ({b"n"}, {_DATE}):
+        values[missing] = b"nan"
+        numbers = values.astype(bytes).astype(np.float64)
+        if kinds == {_DATE}:
+            return _serials_to_datetimes(numbers, epoch)
+        if not missing.any() and np.array_equal(numbers, np.trunc(numbers)):
+            return numbers.astype(np.int64)
+        return numbers
+    if kinds == {b"s"}:
+        values[missing] = b"-1"
+        lookup = np.array([*shared_strings, None], dtype=object)
+        return lookup[values.astype(bytes).astype(np.int64)]
+    if kinds == {b"b"} and not missing.any():
+        return values.astype(bytes) == b"1"
+    if kinds <= {b"inlineStr", b"str"}:
+        # NUL cannot occur in XML, so it safely separates the joined cells.
+        joined = b"\x00".join(raw or b"" for raw in raws)
+        if b"inlineStr" in kinds:
+            joined = _INLINE_MARKUP_RE.sub(b"", joined)
+        text = _unescape(joined.decode())
+        strings = np.array(text.split("\x00"), dtype=object)
+        strings[missing] = None
+        return strings
+    return np.array(
+        [
+            None if raw is None else _decode_value(raw, code, shared_strings, epoch)
+            for raw, code in zip(raws, codes, strict=True)
+        ],
+        dtype=object,
+    )
+
+
+def _decode_value(
+    raw: bytes, code: bytes | None, shared_strings: list[str], epoch: datetime
+) -> object:
+    if code == b"n":
+        return float(raw)
+    if code == _DATE:
+        return epoch + timedelta(days=float(raw))
+    if code == b"s":
+        return shared_strings[int(raw)]
+    if code == b"b":
+        return raw == b"1"
+    if code == b"e":
+        return None
+    if code == b"inlineStr":
+        raw = _INLINE_MARKUP_RE.sub(b"", raw)
+    return _unescape(raw.decode())
+
+
+def _unescape(text: str) -> str:
+    """Resolve entity references, then ``_xHHHH_`` escapes in one pass."""
+    if "&" in text:
+        text = html.unescape(text)
+    if "_x" in text:
+        text = _ESCAPE_RE.sub(_escaped_char, text)
+    return text
+
+
+def _escaped_char(match: re.Match[str]) -> str:
+    return chr(int(match.group(1), 16))
+
+
+def _serials_to_datetimes(serials: Any, epoch: datetime) -> Any:
+    """Convert Excel serials counted from ``epoch`` to ``datetime64[ms]``."""
+    import numpy as np
+
+    milliseconds = np.round(serials * 86_400_000)
+    result = np.full(serials.shape, np.datetime64("NaT"), dtype="datetime64[ms]")
+    present = ~np.isnan(milliseconds)
+    result[present] = np.datetime64(epoch, "ms") + milliseconds[present].astype(
+        "int64"
+    ).astype("timedelta64[ms]")
+    return result
+
+
+def _workbook_epoch(engine: XmlEngine, archive: PartStore) -> datetime:
+    """Return the day zero of the workbook's date system."""
+    workbook = engine.read_xml(archive, "xl/workbook.xml").getroot()
+    properties = workbook.find(f"{{{_NS_MAIN}}}workbookPr")
+    if properties is not None and properties.get("date1904") in ("1", "true"):
+        return _EXCEL_1904_EPOCH
+    return _EXCEL_EPOCH
+
+
+def _workbook_relationships(engine: XmlEngine, archive: PartStore) -> dict[str, str]:
+    """Map workbook relationship type suffixes to normalized part paths."""
+    rels_tree = engine.read_xml(archive, "xl/_rels/workbook.xml.rels")
+    paths: dict[str, str] = {}
+    for rel in rels_tree.getroot().iterchildren(_RELATIONSHIP):
+        rel_type = rel.get("Type", "")
+        target = rel.get("Target", "")
+        suffix = rel_type[rel_type.rfind("/") :]
+        if target.startswith("/"):
+            paths[suffix] = target.lstrip("/")
+        else:
+            paths[suffix] = posixpath.normpath(posixpath.join("xl", target))
+    return paths
+
+
+def _read_shared_strings(
+    archive: PartStore, path: str | None, policy: ParserPolicy
+) -> list[str]:
+    if path is None or path not in archive.namelist():
+        return []
+    strings: list[str] = []
+    with archive.open(path) as stream:
+        for _, item in etree.iterparse(
+            stream, events=("end",), tag=_SHARED_ITEM, huge_tree=policy.huge_tree
+        ):
+            strings.append(_rich_text(item))
+            item.clear()
+    return strings
+
+
+def _rich_text(item: etree._Element) -> str:
+    """Join the plain or run text of a shared string item."""
+    text = item.findtext(_TEXT)
+    if text is None:
+        text = "".join(run.findtext(_TEXT) or "" for run in item.iterchildren(_RUN))
+    return _ESCAPE_RE.sub(_escaped_char, text) if "_x" in text else text
+
+
+def _read_date_styles(
+    engine: XmlEngine, archive: PartStore, path: str | None
+) -> frozenset[bytes]:
+    """Return the ``cellXfs`` indices, as attribute bytes, that show a date."""
+    if path is None or path not in archive.namelist():
+        return frozenset()
+    styles = engine.read_xml(archive, path).getroot()
+    custom_dates = {
+        int(fmt.get("numFmtId", "0"))
+        for fmt in styles.iterfind(f"{{{_NS_MAIN}}}numFmts/{{{_NS_MAIN}}}numFmt")
+        if _is_date_format(fmt.get("formatCode", ""))
+    }
+    date_formats = _BUILTIN_DATE_FORMATS | custom_dates
+    return frozenset(
+        str(index).encode()
+        for index, xf in enumerate(
+            styles.iterfind(f"{{{_NS_MAIN}}}cellXfs/{{{_NS_MAIN}}}xf")
+        )
+        if int(xf.get("numFmtId", "0")) in date_formats
+    )
+
+
+def _is_date_format(format_code: str) -> bool:
+    section = _FORMAT_LITERAL_RE.sub("", format_code.split(";")[0])
+    return bool(_DATE_TOKEN_RE.search(section))
@@ -2,12 +2,22 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
 from lxml import etree
 
 from pivoteer.exceptions import XmlStructureError
-from pivoteer.utils import build_a1_range, parse_a1_range
+from pivoteer.sheet_splicer import (
+    WorksheetSegments,
+    iter_cell_positions,
+    replace_dimension,
+)
+from pivoteer.utils import (
+    build_a1_cell,
+    build_a1_range,
+    column_letter_to_index,
+    parse_a1_range,
+)
 
 
 @dataclass(frozen=True)
@@ -42,4 +52,113 @@ class TableResizer:
 
         updated_ref = build_a1_range(start_row, start_col, end_row, end_col)
         table.set("ref", updated_ref)
+        auto_filter = table.find(f"{{{etree.QName(table).namespace}}}autoFilter")
+        if auto_filter is not None:
+            auto_filter.set("ref", updated_ref)
         return TableResizeResult(original_ref=ref, updated_ref=updated_ref)
+
+    def update_worksheet_extents(
+        self,
+        sheet_tree: etree._ElementTree,
+        first_row: int,
+        last_row: int,
+    ) -> str | None:
+        """Refresh row ``spans`` and the sheet ``<dimension>`` in one pass.
+
+        Spans are recomputed for rows ``first_row`` to ``last_row``; other rows
+        contribute their existing spans (or cells) to the dimension. Returns the
+        new dimension ref, or None when the sheet holds no cells.
+        """
+        root = sheet_tree.getroot()
+        ns = etree.QName(root).namespace
+        sheet_data = root.find(f"{{{ns}}}sheetData")
+        if sheet_data is None:
+            raise XmlStructureError("sheetData element not found.")
+
+        bounds: list[int] | None = None
+        row_idx = 0
+        for row in sheet_data.iterfind(f"{{{ns}}}row"):
+            row_idx = int(row.get("r") or row_idx + 1)
+            refresh = first_row <= row_idx <= last_row
+            spans = None if refresh else _parse_spans(row.get("spans"))
+            if spans is None:
+                spans = _cell_columns(row, ns)
+                if spans is None:
+                    continue
+                if refresh:
+                    row.set("spans", f"{spans[0]}:{spans[1]}")
+            bounds = _extend_bounds(bounds, row_idx, spans)
+
+        dimension_ref = _bounds_ref(bounds)
+        dimension = root.find(f"{{{ns}}}dimension")
+        if dimension is not None:
+            dimension.set("ref", dimension_ref or "A1")
+        return dimension_ref
+
+    def update_spliced_extents(
+        self,
+        segments: WorksheetSegments,
+        first_row: int,
+        last_row: int,
+        first_col: int,
+        last_col: int,
+    ) -> WorksheetSegments:
+        """Byte-level counterpart of ``update_worksheet_extents``.
+
+        The new row block covers ``first_row:last_row`` and ``first_col:last_col``
+        and is expected to carry its own spans; cells before and after the block
+        are scanned to compute the sheet dimension, which is patched in place.
+        """
+        bounds = _extend_bounds(None, first_row, (first_col, last_col))
+        bounds = _extend_bounds(bounds, last_row, (first_col, last_col))
+        for segment in (segments.before, segments.after):
+            for row_idx, col_idx in iter_cell_positions(segment):
+                bounds = _extend_bounds(bounds, row_idx, (col_idx, col_idx))
+        prefix = replace_dimension(segments.prefix, _bounds_ref(bounds) or "A1")
+        return replace(segments, prefix=prefix)
+
+
+def _parse_spans(spans: str | None) -> tuple[int, int] | None:
+    if not spans:
+        return None
+    first, _, last = spans.partition(":")
+    try:
+        return int(first), int(last or first)
+    except ValueError:
+        return None
+
+
+def _cell_columns(row: etree._Element, ns: str | None) -> tuple[int, int] | None:
+    min_col = max_col = None
+    col_idx = 0
+    for cell in row.iterfind(f"{{{ns}}}c"):
+        ref = cell.get("r")
+        col_idx = (
+            column_letter_to_index(ref.rstrip("0123456789")) if ref else col_idx + 1
+        )
+        min_col = col_idx if min_col is None else min(min_col, col_idx)
+        max_col = col_idx if max_col is None else max(max_col, col_idx)
+    if min_col is None or max_col is None:
+        return None
+    return min_col, max_col
+
+
+def _extend_bounds(
+    bounds: list[int] | None, row_idx: int, spans: tuple[int, int]
+) -> list[int]:
+    if bounds is None:
+        return [row_idx, spans[0], row_idx, spans[1]]
+    bounds[0] = min(bounds[0], row_idx)
+    bounds[1] = min(bounds[1], spans[0])
+    bounds[2] = max(bounds[2], row_idx)
+    bounds[3] = max(bounds[3], spans[1])
+    return bounds
+
+
+def _bounds_ref(bounds: list[int] | None) -> str | None:
+    if bounds is None:
+        return None
+    start_row, start_col, end_row, end_col = bounds
+    if (start_row, start_col) == (end_row, end_col):
+        return build_a1_cell(start_row, start_col)
+    return build_a1_range(start_row, start_col, end_row, end_col)
@@ -0,0 +1,104 @@
+"""Byte-level edits of a part's root start tag without parsing the document."""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable, Mapping
+from xml.sax.saxutils import escape
+
+from pivoteer.exceptions import XmlStructureError
+
+_ATTRIBUTE_RE = re.compile(
+    rb"""(?P<space>\s+)(?P<name>[^\s=/>]+)\s*=\s*(?P<value>"[^"]*"|'[^']*')"""
+)
+_START_TAG_RE = re.compile(
+    rb"""<[^\s/>]+(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*/?>"""
+)
+_PROLOG_SKIP_RE = re.compile(rb"<\?.*?\?>|<!--.*?-->|<!DOCTYPE[^>]*>", re.DOTALL)
+_ATTRIBUTE_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}
+
+
+def patch_root_attributes(
+    xml: bytes,
+    set_attributes: Mapping[str, str] | None = None,
+    remove_attributes: Iterable[str] = (),
+) -> bytes:
+    """Set or remove attributes on the root element's start tag.
+
+    Only the bytes of the start tag change; the rest of the document is copied
+    as is, so the cost does not depend on the part's size. ``set_attributes``
+    takes unprefixed names, replacing existing values in place and appending new
+    ones. ``remove_attributes`` takes plain or ``{namespace}local`` names; the
+    namespace prefix is resolved from the declarations on the root tag.
+    """
+    start, end = _root_start_tag(xml)
+    tag = xml[start:end]
+    close = b"/>" if tag.endswith(b"/>") else b">"
+    body = tag[: -len(close)]
+
+    attributes = list(_ATTRIBUTE_RE.finditer(body))
+    if attributes:
+        head = body[: attributes[0].start()]
+        tail = body[attributes[-1].end() :]
+    else:
+        head, tail = body.rstrip(), b""
+
+    removed = _resolve_names(attributes, remove_attributes)
+    pending = {
+        name.encode(): _quote(value) for name, value in (set_attributes or {}).items()
+    }
+    parts = [head]
+    for attribute in attributes:
+        name = attribute.group("name")
+        if name in removed:
+            continue
+        if name in pending:
+            parts.append(attribute.group("space") + name + b"=" + pending.pop(name))
+        else:
+            parts.append(attribute.group(0))
+    parts.extend(b" " + name + b"=" + value for name, value in pending.items())
+    parts.append(tail)
+    parts.append(close)
+    return xml[:start] + b"".join(parts) + xml[end:]
+
+
+def _root_start_tag(xml: bytes) -> tuple[int, int]:
+    """Return the byte offsets of the root element's start tag."""
+    start = xml.find(b"<")
+    while start != -1 and xml[start + 1 : start + 2] in (b"?", b"!"):
+        skipped = _PROLOG_SKIP_RE.match(xml, start)
+        if skipped is None:
+            raise XmlStructureError("Malformed XML prolog.")
+        start = xml.find(b"<", skipped.end())
+    if start == -1:
+        raise XmlStructureError("Root element not found.")
+
+    match = _START_TAG_RE.match(xml, start)
+    if match is None:
+        raise XmlStructureError("Root start tag is malformed.")
+    return start, match.end()
+
+
+def _resolve_names(
+    attributes: list[re.Match[bytes]], names: Iterable[str]
+) -> set[bytes]:
+    prefixes: dict[str, str] = {}
+    for attribute in attributes:
+        name = attribute.group("name").decode()
+        if name.startswith("xmlns:"):
+            prefixes[attribute.group("value")[1:-1].decode()] = name[len("xmlns:") :]
+
+    resolved: set[bytes] = set()
+    for name in names:
+        if name.startswith("{"):
+            namespace, _, local = name[1:].partition("}")
+            prefix = prefixes.get(namespace)
+            if prefix is None:
+                continue
+            name = f"{prefix}:{local}"
+        resolved.add(name.encode())
+    return resolved
+
+
+def _quote(value: str) -> bytes:
+    return b'"' + escape(value, _ATTRIBUTE_ENTITIES).encode() + b'"'
@@ -3,115 +3,851 @@
 from __future__ import annotations
 
 import logging
-import zipfile
+import posixpath
+from collections.abc import Callable, Hashable, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import Executor
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
 from lxml import etree
 
-from pivoteer.exceptions import InvalidDataError, TableNotFoundError
-from pivoteer.models import TableRef, WorkbookMap
+from pivoteer.engine_selection import (
+    DEFAULT_MEMORY_BUDGET,
+    EngineChoice,
+    choose_engine,
+    dom_fallback,
+)
+from pivoteer.exceptions import (
+    InvalidDataError,
+    TableNotFoundError,
+    XmlStructureError,
+)
+from pivoteer.introspection import dependent_pivot_caches
+from pivoteer.models import TableRef, TableSchema, WorkbookMap
+from pivoteer.part_store import PartStore
 from pivoteer.pivot_cache_updater import sync_cache_fields
+from pivoteer.row_encoder import (
+    EncodedFrame,
+    encode_series,
+    encode_shared_formula,
+    iter_row_blocks,
+)
+from pivoteer.sanitizer import (
+    DEFAULT_SANITIZE_POLICY,
+    SanitizePolicy,
+    SanitizeReport,
+    sanitize_columns,
+)
+from pivoteer.sheet_splicer import (
+    first_row_styles,
+    formatting_lost_by_splice,
+    iter_spliced_worksheet,
+    next_shared_formula_index,
+    patch_row_cells,
+    split_worksheet,
+)
 from pivoteer.table_resizer import TableResizer
-from pivoteer.utils import parse_a1_range
-from pivoteer.xml_engine import XmlEngine
+from pivoteer.tag_patcher import patch_root_attributes
+from pivoteer.template_source import LoadedTemplate
+from pivoteer.utils import column_index_to_letter, parse_a1_range
+from pivoteer.xml_engine import ParserPolicy, XmlEngine
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 LOGGER = logging.getLogger(__name__)
 
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+_NS_TYPES = "http://schemas.openxmlformats.org/package/2006/content-types"
+_CONTENT_TYPES_PATH = "[Content_Types].xml"
+
+ENGINES = ("dom", "splice", "auto")
+
+
+@dataclass(frozen=True)
+class _PendingSplice:
+    """The inputs of a spliced row block that is encoded when saved.
+
+    ``values`` holds the frame's columns as Series, converted to Python values
+    one block at a time while saving, and ``fixed`` the pre-encoded columns by
+    offset from ``start_col``; ``update_columns`` swaps columns here.
+    """
+
+    first_row: int
+    row_count: int
+    start_col: int
+    values: list[pd.Series]
+    dtypes: list[object]
+    fixed: dict[int, Sequence[bytes]]
+
 
 class TemplateEngine:
-    """Coordinates XmlEngine and TableResizer for template updates."""
+    """Coordinates XmlEngine and TableResizer for template updates.
 
-    def __init__(self, template_path: Path) -> None:
-        self._xml_engine = XmlEngine(template_path)
+    Takes the row-writing and parsing options of ``Pivoteer``; they are
+    described under Configuration in ``docs/modules/pivoteer-library.md``.
+    """
+
+    def __init__(
+        self,
+        template_path: Path | PartStore,
+        *,
+        engine: str = "dom",
+        parser_policy: ParserPolicy | None = None,
+        workers: int | Executor | None = None,
+        compact: bool = False,
+        sanitize: SanitizePolicy | None = DEFAULT_SANITIZE_POLICY,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    ) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}.")
+        if engine == "dom" and (workers is not None or compact):
+            raise ValueError(
+                "workers and compact apply to spliced rows; use engine='splice' "
+                "or engine='auto'."
+            )
+        self._engine = engine
+        self._workers = workers
+        self._compact = compact
+        self._sanitize = sanitize
+        self._memory_budget = memory_budget
+        self._xml_engine = XmlEngine(template_path, parser_policy=parser_policy)
         self._table_resizer = TableResizer()
-        self._workbook_map: WorkbookMap = self._xml_engine.build_workbook_map()
+        if isinstance(template_path, LoadedTemplate):
+            self._workbook_map: WorkbookMap = template_path.workbook_map
+        else:
+            self._workbook_map = self._xml_engine.build_workbook_map()
         self._tables: dict[str, TableRef] = dict(self._workbook_map.tables)
         self._modified_trees: dict[str, etree._ElementTree] = {}
+        self._modified_bytes: dict[str, bytes] = {}
+        self._modified_streams: dict[str, Callable[[], Iterator[bytes]]] = {}
+        self._pending_splices: dict[str, _PendingSplice] = {}
+        self._removed_parts: set[str] = set()
         self._updated_tables: set[str] = set()
+        self._sanitize_reports: dict[str, SanitizeReport] = {}
+        self._engine_choices: dict[str, EngineChoice] = {}
 
     @property
     def template_path(self) -> Path:
         return self._xml_engine.template_path
 
-    def apply_dataframe(self, table_name: str, df: pd.DataFrame) -> None:
-        """Inject a DataFrame into the target table and resize it."""
+    @property
+    def engine_choices(self) -> dict[str, EngineChoice]:
+        """How ``engine="auto"`` wrote each table so far."""
+        return dict(self._engine_choices)
+
+    @property
+    def sanitize_reports(self) -> dict[str, SanitizeReport]:
+        """What sanitizing changed in the data applied to each table."""
+        return dict(self._sanitize_reports)
+
+    def open_archive(
+        self,
+    ) -> AbstractContextManager[PartStore]:
+        """Open the underlying template for reading."""
+        return self._xml_engine.open_archive()
+
+    def apply_dataframe(
+        self,
+        table_name: str,
+        df: pd.DataFrame,
+        *,
+        columns: Sequence[Hashable] | Mapping[str, Hashable] | None = None,
+        match: str = "position",
+    ) -> None:
+        """Inject a DataFrame into the target table and resize it.
+
+        By default the frame's columns map to the table's columns by position.
+        ``columns`` selects source columns instead: a sequence lists them in
+        table order, a mapping goes from table header to source column.
+        ``match="name"`` pairs table headers with equally named frame columns
+        and ignores the rest. Selected columns are read from the original
+        frame; it is never reordered or copied. Spliced rows are encoded from
+        those columns when saving, so do not modify the frame in place before.
+        """
         table_ref = self._tables.get(table_name)
         if not table_ref:
             raise TableNotFoundError(f"Table not found: {table_name}")
-        if df.empty:
-            raise InvalidDataError(
-                f"Table '{table_name}' requires data, but DataFrame was empty."
-            )
-        if df.columns.empty:
-            raise InvalidDataError(
-                f"Table '{table_name}' requires columns, but DataFrame has none."
-            )
+        _check_shape(table_name, len(df), len(df.columns))
+
+        schema = self._workbook_map.table_schemas.get(table_name)
+        positions = _select_columns(
+            table_name, schema, list(df.columns), columns, match
+        )
+        selected = self._sanitize_columns(
+            table_name,
+            [df.columns[position] for position in positions],
+            [df.iloc[:, position] for position in positions],
+        )
+        self._write_table(
+            table_name,
+            table_ref,
+            schema,
+            len(df),
+            values=selected,
+            dtypes=[series.dtype for series in selected],
+        )
 
-        data_rows = df.itertuples(index=False, name=None)
-        rows = [list(row) for row in data_rows]
-        row_count = len(rows)
-        col_count = len(df.columns)
+    def apply_encoded(
+        self,
+        table_name: str,
+        encoded: EncodedFrame,
+        *,
+        columns: Sequence[Hashable] | Mapping[str, Hashable] | None = None,
+        match: str = "position",
+    ) -> None:
+        """Splice a frame encoded by ``encode_frame`` into the target table.
 
-        (start_row, start_col), _ = parse_a1_range(table_ref.ref)
+        Works like ``apply_dataframe`` but skips value encoding, so one encoded
+        frame can be applied to many templates; only cell references are
+        generated per table. The rows are always spliced, whatever ``engine``
+        is set to.
+        """
+        table_ref = self._tables.get(table_name)
+        if not table_ref:
+            raise TableNotFoundError(f"Table not found: {table_name}")
+        _check_shape(table_name, encoded.row_count, len(encoded.columns))
+
+        schema = self._workbook_map.table_schemas.get(table_name)
+        positions = _select_columns(
+            table_name, schema, list(encoded.columns), columns, match
+        )
+        self._write_table(
+            table_name,
+            table_ref,
+            schema,
+            encoded.row_count,
+            encoded=[encoded.cells[position] for position in positions],
+        )
+
+    def _sanitize_columns(
+        self, table_name: str, labels: list[Hashable], columns: list[pd.Series]
+    ) -> list[pd.Series]:
+        if self._sanitize is None:
+            return columns
+        columns, report = sanitize_columns(
+            labels, columns, self._sanitize, context=f"Table '{table_name}'"
+        )
+        self._sanitize_reports[table_name] = report
+        return columns
+
+    def _write_table(
+        self,
+        table_name: str,
+        table_ref: TableRef,
+        schema: TableSchema | None,
+        row_count: int,
+        *,
+        values: list[pd.Series] | None = None,
+        dtypes: list[object] | None = None,
+        encoded: list[Sequence[bytes]] | None = None,
+    ) -> None:
+        """Write selected columns, raw or pre-encoded, and resize the table."""
+        width = len(encoded) if encoded is not None else len(values or [])
+        formulas: dict[int, str] = {}
+        if schema is not None and schema.columns:
+            formulas = schema.formulas_for_width(width)
+        col_count = width + len(formulas)
+
+        (start_row, start_col), (end_row, end_col) = parse_a1_range(table_ref.ref)
         data_start_row = start_row + 1
 
-        with zipfile.ZipFile(self.template_path, "r") as archive:
-            sheet_tree = self._read_xml_part(archive, table_ref.worksheet_path)
-            self._xml_engine.inject_rows_inline_strings(
-                sheet_tree, data_start_row, start_col, rows
-            )
-            self._modified_trees[table_ref.worksheet_path] = sheet_tree
+        worksheet_path = table_ref.worksheet_path
 
+        with self._xml_engine.open_archive() as archive:
             table_tree = self._read_xml_part(archive, table_ref.table_path)
+
+            def splice(
+                workers: int | Executor | None, *, keep_formatting: bool = False
+            ) -> None:
+                self._splice_rows(
+                    archive,
+                    worksheet_path,
+                    formulas,
+                    data_start_row,
+                    start_col,
+                    row_count,
+                    values=values or [],
+                    dtypes=dtypes or [],
+                    encoded=encoded or [],
+                    last_row=max(end_row, start_row + row_count),
+                    last_col=max(end_col, start_col + col_count - 1),
+                    workers=workers,
+                    keep_formatting=keep_formatting,
+                )
+
+            def inject() -> None:
+                self._inject_rows(
+                    archive,
+                    worksheet_path,
+                    formulas,
+                    data_start_row,
+                    start_col,
+                    col_count,
+                    row_count,
+                    values=values or [],
+                )
+
+            if self._engine == "splice" or encoded is not None:
+                splice(self._workers)
+            elif self._engine == "auto":
+                sheet_bytes = archive.getinfo(worksheet_path).file_size
+                choice = choose_engine(
+                    row_count,
+                    col_count,
+                    sheet_bytes,
+                    memory_budget=self._memory_budget,
+                    workers=self._workers,
+                )
+                try:
+                    splice(choice.workers, keep_formatting=True)
+                except XmlStructureError as exc:
+                    fallback = dom_fallback(
+                        row_count,
+                        col_count,
+                        sheet_bytes,
+                        memory_budget=self._memory_budget,
+                        reason=str(exc).rstrip("."),
+                    )
+                    if fallback is None:
+                        raise XmlStructureError(
+                            f"{exc} The DOM engine would exceed the memory budget "
+                            f"of {self._memory_budget} bytes."
+                        ) from exc
+                    choice = fallback
+                    inject()
+                self._engine_choices[table_name] = choice
+                LOGGER.info(
+                    "Table '%s': %s (about %d MiB).",
+                    table_name,
+                    choice.reason,
+                    choice.estimated_bytes // (1024 * 1024),
+                )
+            else:
+                inject()
+
             resize_result = self._table_resizer.resize_table(
                 table_tree, data_rows=row_count, data_cols=col_count
             )
             self._modified_trees[table_ref.table_path] = table_tree
 
-        self._tables[table_name] = TableRef(
-            name=table_ref.name,
-            sheet_name=table_ref.sheet_name,
-            table_path=table_ref.table_path,
-            worksheet_path=table_ref.worksheet_path,
-            ref=resize_result.updated_ref,
-        )
+        self._tables[table_name] = replace(table_ref, ref=resize_result.updated_ref)
         self._updated_tables.add(table_name)
 
-    def ensure_pivot_refresh_on_load(self) -> None:
-        """Set refreshOnLoad=1 for all pivot cache definitions."""
-        pivot_paths = self._workbook_map.pivot_cache_definition_paths.values()
+    def update_columns(
+        self,
+        table_name: str,
+        df: pd.DataFrame,
+        *,
+        columns: Mapping[str, Hashable] | None = None,
+    ) -> None:
+        """Replace the cells of some table columns in the existing row range.
+
+        Frame columns are matched to table headers by name, or through
+        ``columns`` (table header to source column). The frame must have one
+        row per existing data row; the table range and all other columns stay
+        untouched.
+
+        Columns of a table spliced earlier in the session are swapped before
+        its rows are encoded, so the worksheet stays streamed. Otherwise the
+        target cells are patched in the table's row block as bytes, or in the
+        parsed tree when the worksheet has been parsed already. A worksheet
+        holding another table's pending splice is joined into one buffer
+        first.
+        """
+        table_ref = self._tables.get(table_name)
+        if not table_ref:
+            raise TableNotFoundError(f"Table not found: {table_name}")
+        schema = self._workbook_map.table_schemas.get(table_name)
+        if schema is None or not schema.columns:
+            raise InvalidDataError(f"Table '{table_name}' has no column headers.")
+        if columns is None:
+            columns = {name: name for name in df.columns}
+        unknown = [name for name in columns if name not in schema.names]
+        if unknown:
+            raise InvalidDataError(
+                f"Table '{table_name}' has no columns named {unknown}."
+            )
+        absent = [source for source in columns.values() if source not in df.columns]
+        if absent:
+            raise InvalidDataError(f"DataFrame has no columns named {absent}.")
+        if not columns:
+            raise InvalidDataError(
+                f"Table '{table_name}' requires columns, but none were selected."
+            )
+
+        (start_row, start_col), (end_row, _) = parse_a1_range(table_ref.ref)
+
+        with self._xml_engine.open_archive() as archive:
+            table_tree = self._read_xml_part(archive, table_ref.table_path)
+            totals_rows = int(table_tree.getroot().get("totalsRowCount", "0"))
+            data_rows = end_row - start_row - totals_rows
+            if len(df) != data_rows:
+                raise InvalidDataError(
+                    f"Table '{table_name}' has {data_rows} data rows, "
+                    f"but DataFrame has {len(df)}."
+                )
+
+            cleaned = self._sanitize_columns(
+                table_name,
+                list(columns.values()),
+                [df[source] for source in columns.values()],
+            )
+            targets = {
+                start_col + schema.names.index(name): series
+                for name, series in zip(columns, cleaned, strict=True)
+            }
+            worksheet_path = table_ref.worksheet_path
+            first_row = start_row + 1
+            if self._update_pending_splice(worksheet_path, first_row, targets):
+                pass
+            elif worksheet_path in self._modified_trees:
+                self._xml_engine.update_column_cells(
+                    self._modified_trees[worksheet_path],
+                    first_row,
+                    {col: series.tolist() for col, series in targets.items()},
+                )
+            else:
+                raw = self._read_part_bytes(archive, worksheet_path)
+                segments = split_worksheet(raw, first_row, first_row + data_rows - 1)
+                block = patch_row_cells(
+                    segments.block,
+                    first_row,
+                    {
+                        col: encode_series(series.tolist(), series.dtype)
+                        for col, series in targets.items()
+                    },
+                )
+                self._modified_bytes[worksheet_path] = b"".join(
+                    (
+                        segments.prefix,
+                        segments.before,
+                        block,
+                        segments.after,
+                        segments.suffix,
+                    )
+                )
+
+        self._updated_tables.add(table_name)
+
+    def ensure_pivot_refresh_on_load(self, *, refresh_all: bool = False) -> list[str]:
+        """Set refreshOnLoad=1 on pivot caches fed by tables updated so far.
+
+        Caches sourced from static or external data keep their stored snapshot
+        unless ``refresh_all`` forces the flag onto every pivot cache. Returns
+        the paths of the flagged cache definitions.
+        """
+        if refresh_all:
+            pivot_paths = list(self._workbook_map.pivot_cache_definition_paths.values())
+        else:
+            pivot_paths = self.dependent_pivot_caches(self._updated_tables)
         if not pivot_paths:
-            return
+            return []
 
-        with zipfile.ZipFile(self.template_path, "r") as archive:
+        with self._xml_engine.open_archive() as archive:
             for path in pivot_paths:
-                tree = self._read_xml_part(archive, path)
-                root = tree.getroot()
-                root.set("refreshOnLoad", "1")
-                self._modified_trees[path] = tree
+                self._patch_root_attributes(archive, path, {"refreshOnLoad": "1"})
+        return pivot_paths
+
+    def drop_pivot_cache_records(self, cache_paths: Iterable[str]) -> None:
+        """Remove the saved records of pivot caches that refresh on load.
+
+        Excel discards these snapshots when it refreshes, so the records part,
+        its relationship and content-type override are dropped and the
+        definition is marked ``saveData="0"`` with ``recordCount="0"``.
+        """
+        caches = [
+            self._workbook_map.pivot_caches[path]
+            for path in cache_paths
+            if path in self._workbook_map.pivot_caches
+        ]
+        caches = [cache for cache in caches if cache.records_path]
+        if not caches:
+            return
+
+        with self._xml_engine.open_archive() as archive:
+            for cache in caches:
+                self._patch_root_attributes(
+                    archive,
+                    cache.path,
+                    {"saveData": "0", "recordCount": "0"},
+                    remove=(f"{{{_NS_REL}}}id",),
+                )
+                self._drop_relationship(archive, cache.path, cache.records_rel_id)
+                self._removed_parts.add(cache.records_path)
+
+            types_tree = self._read_xml_part(archive, _CONTENT_TYPES_PATH)
+            removed = {f"/{cache.records_path}" for cache in caches}
+            for override in types_tree.getroot().findall(f"{{{_NS_TYPES}}}Override"):
+                if override.get("PartName") in removed:
+                    override.getparent().remove(override)
+            self._modified_trees[_CONTENT_TYPES_PATH] = types_tree
+
+    def get_removed_parts(self) -> set[str]:
+        """Return the paths of parts to leave out of the output archive."""
+        return set(self._removed_parts)
+
+    def dependent_pivot_caches(self, table_names: Iterable[str]) -> list[str]:
+        """Return pivot cache paths sourced from any of the given tables.
+
+        Besides caches bound to the table by name, caches over a sheet range
+        that overlaps the table's template range count as dependent.
+        """
+        return dependent_pivot_caches(self._workbook_map, table_names)
+
+    def _drop_relationship(
+        self, archive: PartStore, part_path: str, rel_id: str | None
+    ) -> None:
+        rels_path = posixpath.join(
+            posixpath.dirname(part_path),
+            "_rels",
+            f"{posixpath.basename(part_path)}.rels",
+        )
+        rels_tree = self._read_xml_part(archive, rels_path)
+        rels_root = rels_tree.getroot()
+        for rel in rels_root.findall(f"{{{_NS_PKG_REL}}}Relationship"):
+            if rel.get("Id") == rel_id:
+                rels_root.remove(rel)
+        if len(rels_root):
+            self._modified_trees[rels_path] = rels_tree
+        else:
+            self._modified_trees.pop(rels_path, None)
+            self._removed_parts.add(rels_path)
 
     def sync_pivot_cache_fields(self) -> None:
         """Append missing pivot cache fields for updated tables."""
         if not self._updated_tables:
             return
 
-        for table_name in sorted(self._updated_tables):
-            updated_parts = sync_cache_fields(self._workbook_map, table_name)
-            for path, tree in updated_parts.items():
-                self._modified_trees[path] = tree
+        with self._xml_engine.open_archive() as archive:
+            for table_name in sorted(self._updated_tables):
+                updated_parts = sync_cache_fields(
+                    self._workbook_map,
+                    table_name,
+                    parser=self._xml_engine.parser,
+                    archive=archive,
+                )
+                for path, tree in updated_parts.items():
+                    self._modified_trees[path] = tree
 
     def get_modified_parts(self) -> dict[str, bytes]:
         """Serialize modified XML trees to bytes for writing."""
-        parts: dict[str, bytes] = {}
+        parts: dict[str, bytes] = dict(self._modified_bytes)
+        for path, stream in self._modified_streams.items():
+            parts[path] = b"".join(stream())
         for path, tree in self._modified_trees.items():
-            parts[path] = etree.tostring(
-                tree, encoding="UTF-8", xml_declaration=True, standalone="yes"
-            )
+            parts[path] = _serialize(tree)
         return parts
 
-    def _read_xml_part(self, archive: zipfile.ZipFile, path: str) -> etree._ElementTree:
+    def get_modified_streams(self) -> dict[str, Iterable[bytes]]:
+        """Return modified parts as iterables of byte chunks for writing.
+
+        Spliced worksheets are generated block by block as they are consumed,
+        so a part never has to exist in memory as one buffer. Other parts are
+        a single chunk.
+        """
+        parts: dict[str, Iterable[bytes]] = {
+            path: (data,) for path, data in self._modified_bytes.items()
+        }
+        for path, stream in self._modified_streams.items():
+            parts[path] = stream()
+        for path, tree in self._modified_trees.items():
+            parts[path] = (_serialize(tree),)
+        return parts
+
+    def _inject_rows(
+        self,
+        archive: PartStore,
+        worksheet_path: str,
+        formulas: dict[int, str],
+        data_start_row: int,
+        start_col: int,
+        col_count: int,
+        row_count: int,
+        *,
+        values: list[pd.Series],
+    ) -> None:
+        """Write the rows into the parsed worksheet tree."""
+        sheet_tree = self._read_xml_part(archive, worksheet_path)
+        rows = [
+            list(row)
+            for row in zip(*(series.tolist() for series in values), strict=True)
+        ]
+        if formulas:
+            rows = [_skip_columns(row, formulas, col_count) for row in rows]
+        self._xml_engine.inject_rows_inline_strings(
+            sheet_tree, data_start_row, start_col, rows
+        )
+        for offset, formula in formulas.items():
+            self._xml_engine.fill_shared_formula(
+                sheet_tree,
+                start_col + offset,
+                data_start_row,
+                data_start_row + row_count - 1,
+                formula,
+            )
+        self._table_resizer.update_worksheet_extents(
+            sheet_tree, data_start_row, data_start_row + row_count - 1
+        )
+        self._modified_trees[worksheet_path] = sheet_tree
+
+    def _splice_rows(
+        self,
+        archive: PartStore,
+        worksheet_path: str,
+        formulas: dict[int, str],
+        data_start_row: int,
+        start_col: int,
+        row_count: int,
+        *,
+        values: list[pd.Series],
+        dtypes: list[object],
+        encoded: list[Sequence[bytes]],
+        last_row: int,
+        last_col: int,
+        workers: int | Executor | None,
+        keep_formatting: bool = False,
+    ) -> None:
+        """Replace the table's row block; ``encoded`` columns skip encoding.
+
+        Generated cells take their column's ``s`` style from the template's
+        first data row. Row attributes (``ht``, ``s``, ``customFormat``), styles
+        that differ between rows and other cell attributes are not carried over;
+        with ``keep_formatting`` such a block raises ``XmlStructureError``
+        instead. Nothing staged for the worksheet changes unless it succeeds.
+        """
+        sheet_bytes = self._peek_part_bytes(archive, worksheet_path)
+        segments = split_worksheet(
+            sheet_bytes, data_start_row, last_row, start_col, last_col
+        )
+        if keep_formatting:
+            lost = formatting_lost_by_splice(segments.block)
+            if lost is not None:
+                raise XmlStructureError(f"Splicing would drop formatting: {lost}.")
+        data_end_row = data_start_row + row_count - 1
+        shared_index = next_shared_formula_index(segments.before, segments.after)
+        fixed: dict[int, Sequence[bytes]] = {}
+        if encoded:
+            data_offsets = [
+                offset
+                for offset in range(len(encoded) + len(formulas))
+                if offset not in formulas
+            ]
+            fixed.update(zip(data_offsets, encoded, strict=True))
+        for offset, formula in sorted(formulas.items()):
+            col_letter = column_index_to_letter(start_col + offset)
+            fixed[offset] = encode_shared_formula(
+                formula,
+                f"{col_letter}{data_start_row}:{col_letter}{data_end_row}",
+                shared_index,
+                row_count,
+            )
+            shared_index += 1
+        width = len(values) + len(fixed)
+        # Each column keeps the cell style of the template's first data row.
+        styles = {
+            col - start_col: style
+            for col, style in first_row_styles(segments.block).items()
+            if start_col <= col < start_col + width
+        }
+        segments = self._table_resizer.update_spliced_extents(
+            segments,
+            data_start_row,
+            data_end_row,
+            start_col,
+            start_col + width - 1,
+        )
+
+        def stream() -> Iterator[bytes]:
+            rows = iter_row_blocks(
+                values,
+                dtypes,
+                data_start_row,
+                start_col,
+                fixed=fixed,
+                workers=workers,
+                compact=self._compact,
+                styles=styles,
+            )
+            return iter_spliced_worksheet(segments, rows)
+
+        # Rows are encoded when the part is written, not here.
+        self._modified_trees.pop(worksheet_path, None)
+        self._modified_bytes.pop(worksheet_path, None)
+        self._modified_streams[worksheet_path] = stream
+        self._pending_splices[worksheet_path] = _PendingSplice(
+            data_start_row, row_count, start_col, values, dtypes, fixed
+        )
+
+    def _update_pending_splice(
+        self, path: str, first_row: int, columns: dict[int, pd.Series]
+    ) -> bool:
+        """Swap columns of the pending splice of ``path`` if it covers them."""
+        pending = self._pending_splices.get(path)
+        if pending is None or pending.first_row != first_row:
+            return False
+        width = len(pending.values) + len(pending.fixed)
+        if any(
+            len(series) != pending.row_count or not 0 <= col - pending.start_col < width
+            for col, series in columns.items()
+        ):
+            return False
+        value_offsets = [
+            offset for offset in range(width) if offset not in pending.fixed
+        ]
+        for col, series in columns.items():
+            offset = col - pending.start_col
+            if offset in pending.fixed:
+                pending.fixed[offset] = encode_series(series.tolist(), series.dtype)
+            else:
+                index = value_offsets.index(offset)
+                pending.values[index] = series
+                pending.dtypes[index] = series.dtype
+        return True
+
+    def _patch_root_attributes(
+        self,
+        archive: PartStore,
+        path: str,
+        attributes: dict[str, str],
+        *,
+        remove: tuple[str, ...] = (),
+    ) -> None:
+        """Edit root attributes, on the tree if parsed already, else as bytes."""
+        tree = self._modified_trees.get(path)
+        if tree is None:
+            raw = self._read_part_bytes(archive, path)
+            self._modified_bytes[path] = patch_root_attributes(raw, attributes, remove)
+            return
+        root = tree.getroot()
+        for name in remove:
+            root.attrib.pop(name, None)
+        for name, value in attributes.items():
+            root.set(name, value)
+
+    def _read_xml_part(self, archive: PartStore, path: str) -> etree._ElementTree:
         cached = self._modified_trees.get(path)
         if cached is not None:
             return cached
+        self._materialize_stream(path)
+        raw = self._modified_bytes.pop(path, None)
+        if raw is not None:
+            tree = self._xml_engine.parse_xml(raw)
+            self._modified_trees[path] = tree
+            return tree
         return self._xml_engine.read_xml(archive, path)
+
+    def _peek_part_bytes(self, archive: PartStore, path: str) -> bytes:
+        """Return a part's current bytes without changing what is staged."""
+        stream = self._modified_streams.get(path)
+        if stream is not None:
+            return b"".join(stream())
+        raw = self._modified_bytes.get(path)
+        if raw is not None:
+            return raw
+        tree = self._modified_trees.get(path)
+        if tree is not None:
+            return _serialize(tree)
+        try:
+            return archive.read(path)
+        except KeyError as exc:
+            raise XmlStructureError(f"Missing XML part: {path}") from exc
+
+    def _read_part_bytes(self, archive: PartStore, path: str) -> bytes:
+        self._materialize_stream(path)
+        raw = self._modified_bytes.get(path)
+        if raw is not None:
+            return raw
+        tree = self._modified_trees.pop(path, None)
+        if tree is not None:
+            # Keep the edits as bytes in case the caller fails before storing
+            # its own result.
+            raw = self._modified_bytes[path] = _serialize(tree)
+            return raw
+        try:
+            return archive.read(path)
+        except KeyError as exc:
+            raise XmlStructureError(f"Missing XML part: {path}") from exc
+
+    def _materialize_stream(self, path: str) -> None:
+        """Turn a pending spliced part into bytes before it is edited again."""
+        stream = self._modified_streams.pop(path, None)
+        self._pending_splices.pop(path, None)
+        if stream is not None:
+            self._modified_bytes[path] = b"".join(stream())
+
+
+def _check_shape(table_name: str, row_count: int, column_count: int) -> None:
+    if row_count == 0:
+        raise InvalidDataError(
+            f"Table '{table_name}' requires data, but DataFrame was empty."
+        )
+    if column_count == 0:
+        raise InvalidDataError(
+            f"Table '{table_name}' requires columns, but DataFrame has none."
+        )
+
+
+def _select_columns(
+    table_name: str,
+    schema: TableSchema | None,
+    labels: list[Hashable],
+    columns: Sequence[Hashable] | Mapping[str, Hashable] | None,
+    match: str,
+) -> list[int]:
+    """Return the positions of the source columns to write, in table order."""
+    if match not in ("position", "name"):
+        raise ValueError(f"Unknown match {match!r}; expected 'position' or 'name'.")
+    if match == "name":
+        if columns is not None:
+            raise ValueError("Pass either columns or match='name', not both.")
+        if schema is None or not schema.columns:
+            raise InvalidDataError(f"Table '{table_name}' has no column headers.")
+        columns = {name: name for name in schema.names if name in labels}
+
+    if columns is None:
+        if schema is not None and schema.columns:
+            schema.check_column_order(labels)
+        return list(range(len(labels)))
+
+    if isinstance(columns, Mapping):
+        if schema is None or not schema.columns:
+            raise InvalidDataError(f"Table '{table_name}' has no column headers.")
+        unknown = [name for name in columns if name not in schema.names]
+        if unknown:
+            raise InvalidDataError(
+                f"Table '{table_name}' has no columns named {unknown}."
+            )
+        missing = [
+            column.name
+            for column in schema.columns
+            if column.name not in columns and column.formula is None
+        ]
+        if missing:
+            raise InvalidDataError(
+                f"Table '{table_name}' columns {missing} have no source column."
+            )
+        sources = [columns[name] for name in schema.names if name in columns]
+    else:
+        sources = list(columns)
+
+    absent = [source for source in sources if source not in labels]
+    if absent:
+        raise InvalidDataError(f"DataFrame has no columns named {absent}.")
+    return [labels.index(source) for source in sources]
+
+
+def _skip_columns(
+    row: list[object], formulas: dict[int, str], col_count: int
+) -> list[object]:
+    values = iter(row)
+    return [None if idx in formulas else next(values) for idx in range(col_count)]
+
+
+def _serialize(tree: etree._ElementTree) -> bytes:
+    return etree.tostring(
+        tree, encoding="UTF-8", xml_declaration=True, standalone="yes"
+    )
@@ -0,0 +1,159 @@
+"""Template sources shared across worker processes and threads."""
+
+from __future__ import annotations
+
+import io
+import mmap
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pivoteer.exceptions import TemplateNotFoundError, XmlStructureError
+from pivoteer.part_store import BytesPartStore, PartStore, ZipPartStore
+
+if TYPE_CHECKING:
+    from pivoteer.models import WorkbookMap
+    from pivoteer.xml_engine import ParserPolicy
+
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_CHUNK_SIZE = 1 << 16
+
+
+class MappedTemplate(PartStore):
+    """Read-only view of an ``.xlsx`` template backed by a memory map.
+
+    The ZIP central directory is read once; afterwards every part is
+    decompressed straight from the mapping by offset, without file reads.
+    Worker processes forked after construction share the mapped pages, and
+    spawned workers receive a pickled instance that maps the same file again,
+    so all workers use the same page cache.
+
+    Like every ``PartStore`` it can be passed wherever a template path is
+    accepted.
+    """
+
+    def __init__(self, template_path: str | Path) -> None:
+        path = Path(template_path)
+        if not path.exists():
+            raise TemplateNotFoundError(f"Template not found: {path}")
+        with open(path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        with zipfile.ZipFile(self._mmap, "r") as archive:
+            super().__init__(path, archive.infolist())
+        self._offsets = {info.filename: self._data_offset(info) for info in self._infos}
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __reduce__(self) -> tuple[type[MappedTemplate], tuple[Path]]:
+        return (MappedTemplate, (self._path,))
+
+    def _read(self, info: zipfile.ZipInfo) -> bytes:
+        start = self._offsets[info.filename]
+        end = start + info.compress_size
+        if info.compress_type == zipfile.ZIP_STORED:
+            return self._mmap[start:end]
+        with memoryview(self._mmap)[start:end] as compressed:
+            return zlib.decompress(compressed, -zlib.MAX_WBITS, info.file_size)
+
+    def _open(self, info: zipfile.ZipInfo) -> io.BufferedReader:
+        start = self._offsets[info.filename]
+        view = memoryview(self._mmap)[start : start + info.compress_size]
+        deflated = info.compress_type == zipfile.ZIP_DEFLATED
+        return io.BufferedReader(_MappedPartReader(view, deflated), _CHUNK_SIZE)
+
+    def _data_offset(self, info: zipfile.ZipInfo) -> int:
+        if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            raise XmlStructureError(
+                f"Unsupported compression for memory-mapped part: {info.filename}"
+            )
+        header = _LOCAL_HEADER.unpack_from(self._mmap, info.header_offset)
+        if header[0] != _LOCAL_HEADER_SIGNATURE:
+            raise XmlStructureError(f"Corrupt local header for part: {info.filename}")
+        name_length, extra_length = header[-2:]
+        return info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+
+
+class LoadedTemplate(BytesPartStore):
+    """Immutable in-memory template shared by concurrent sessions.
+
+    Every part is read into memory and the ``WorkbookMap`` is built once at
+    construction. Nothing is mutated afterwards, so one instance can back any
+    number of ``Pivoteer``/``TemplateEngine`` sessions across threads without
+    locks: each session keeps its own modified parts and reads everything else
+    from the shared bytes, and creating one skips all ZIP and map work.
+
+    The parts can come from any ``PartStore``, e.g. an unpacked directory;
+    a plain path is read as a ZIP file.
+    """
+
+    def __init__(
+        self,
+        template_path: str | Path | PartStore,
+        *,
+        parser_policy: ParserPolicy | None = None,
+    ) -> None:
+        from pivoteer.xml_engine import XmlEngine
+
+        if isinstance(template_path, PartStore):
+            source = template_path
+            infos = source.infolist()
+            parts = {info.filename: source.read(info.filename) for info in infos}
+        else:
+            with ZipPartStore(template_path) as source:
+                infos = source.infolist()
+                parts = {info.filename: source.read(info.filename) for info in infos}
+        super().__init__(parts, infos, path=source.path)
+        self._workbook_map = XmlEngine(
+            self, parser_policy=parser_policy
+        ).build_workbook_map()
+
+    @property
+    def workbook_map(self) -> WorkbookMap:
+        """The template's workbook map; treat it as read-only."""
+        return self._workbook_map
+
+
+class _MappedPartReader(io.RawIOBase):
+    """Raw stream over a stored or deflated part inside a memory map."""
+
+    def __init__(self, view: memoryview, deflated: bool) -> None:
+        self._view = view
+        self._offset = 0
+        self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS) if deflated else None
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: memoryview) -> int:  # type: ignore[override]
+        if self._decompressor is None:
+            chunk = self._view[self._offset : self._offset + len(buffer)]
+            size = len(chunk)
+            buffer[:size] = chunk
+            self._offset += size
+            return size
+
+        while not self._pending and not self._decompressor.eof:
+            data = self._decompressor.unconsumed_tail
+            if not data:
+                data = self._view[self._offset : self._offset + _CHUNK_SIZE]
+                self._offset += len(data)
+                if not data:
+                    self._pending = self._decompressor.flush()
+                    break
+            self._pending = self._decompressor.decompress(data, _CHUNK_SIZE)
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+        super().close()
@@ -4,10 +4,14 @@ from __future__ import annotations
 
 import logging
 import posixpath
+import re
+import threading
 import zipfile
+from collections.abc import Mapping, Sequence
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass
 from pathlib import Path
 
-import pandas as pd
 from lxml import etree
 
 from pivoteer.exceptions import (
@@ -15,8 +19,21 @@ from pivoteer.exceptions import (
     TemplateNotFoundError,
     XmlStructureError,
 )
-from pivoteer.models import TableRef, WorkbookMap, WorksheetInfo
-from pivoteer.utils import build_a1_cell
+from pivoteer.models import (
+    ColumnSpec,
+    PivotCacheInfo,
+    TableRef,
+    TableSchema,
+    WorkbookMap,
+    WorksheetInfo,
+)
+from pivoteer.part_store import PartStore, ZipPartStore
+from pivoteer.row_encoder import is_missing
+from pivoteer.utils import (
+    build_a1_cell,
+    column_index_to_letter,
+    column_letter_to_index,
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -28,48 +45,159 @@ _NSMAP_MAIN = {"main": _NS_MAIN}
 _NSMAP_REL = {"rel": _NS_REL}
 _NSMAP_PKG = {"rel": _NS_PKG_REL}
 
+_REL_TYPE_TABLE = "/table"
+_REL_TYPE_PIVOT_TABLE = "/pivotTable"
+_REL_TYPE_PIVOT_CACHE = "/pivotCacheDefinition"
+_REL_TYPE_PIVOT_RECORDS = "/pivotCacheRecords"
+
+
+_DEFAULT_PARSERS = threading.local()
+
+# A defined name over one sheet range, e.g. ``'My Data'!$A$1:$C$3``.
+_NAMED_RANGE_RE = re.compile(
+    r"^=?(?:'(?P<quoted>(?:[^']|'')+)'|(?P<sheet>[^'!]+))!"
+    r"(?P<ref>\$?[A-Z]+\$?\d+(?::\$?[A-Z]+\$?\d+)?)$"
+)
+# A defined name over a table, e.g. ``DataSource[#All]``.
+_NAMED_TABLE_RE = re.compile(r"^=?(?P<table>[^\[\]!]+)(?:\[.*\])?$")
+
+
+@dataclass(frozen=True)
+class ParserPolicy:
+    """Controls how XML parts are parsed.
+
+    ``huge_tree`` lifts libxml2's safety limits (text nodes over 10 MB, very deep
+    trees) for trusted templates with very large worksheets. Parts whose
+    uncompressed size exceeds ``incremental_threshold`` bytes are parsed from the
+    decompressing ZIP stream instead of being read into memory first.
+    """
+
+    huge_tree: bool = False
+    incremental_threshold: int | None = None
+
+    def create_parser(self) -> etree.XMLParser:
+        return etree.XMLParser(remove_blank_text=False, huge_tree=self.huge_tree)
+
+
+def read_xml_part(
+    archive: zipfile.ZipFile | PartStore,
+    path: str,
+    parser: etree.XMLParser | None = None,
+    *,
+    incremental_threshold: int | None = None,
+) -> etree._ElementTree:
+    """Read an XML part from a ZIP archive or part store as an lxml ElementTree.
 
-def read_xml_part(archive: zipfile.ZipFile, path: str) -> etree._ElementTree:
-    """Read an XML part from a ZIP archive and return an lxml ElementTree."""
+    Without an explicit parser, a default parser cached per thread is reused.
+    """
+    if parser is None:
+        parser = _default_parser()
     try:
+        if (
+            incremental_threshold is not None
+            and archive.getinfo(path).file_size > incremental_threshold
+        ):
+            with archive.open(path) as stream:
+                return etree.parse(stream, parser)
         data = archive.read(path)
     except KeyError as exc:
         raise XmlStructureError(f"Missing XML part: {path}") from exc
-    parser = etree.XMLParser(remove_blank_text=False)
     return etree.fromstring(data, parser).getroottree()
 
 
+def _default_parser() -> etree.XMLParser:
+    parser = getattr(_DEFAULT_PARSERS, "parser", None)
+    if parser is None:
+        parser = ParserPolicy().create_parser()
+        _DEFAULT_PARSERS.parser = parser
+    return parser
+
+
 class XmlEngine:
-    """Provides ZIP IO and XML manipulation for Excel workbooks."""
+    """Provides ZIP IO and XML manipulation for Excel workbooks.
 
-    def __init__(self, template_path: Path) -> None:
-        if not template_path.exists():
+    Each engine owns one parser built from its ``ParserPolicy`` and reuses it
+    for every part it reads; like lxml parsers, an engine is meant to be used
+    from one thread at a time. The template is either a path, opened as a
+    ``ZipPartStore`` on demand, or a shared ``PartStore`` such as ``MappedTemplate``
+    or ``LoadedTemplate``.
+    """
+
+    def __init__(
+        self,
+        template_path: Path | PartStore,
+        *,
+        parser_policy: ParserPolicy | None = None,
+    ) -> None:
+        self._source: PartStore | None = None
+        if isinstance(template_path, PartStore):
+            self._source = template_path
+            template_path = template_path.path
+        elif not template_path.exists():
             raise TemplateNotFoundError(f"Template not found: {template_path}")
         self._template_path = template_path
+        self._parser_policy = parser_policy or ParserPolicy()
+        self._parser = self._parser_policy.create_parser()
 
     @property
     def template_path(self) -> Path:
         return self._template_path
 
+    def open_archive(
+        self,
+    ) -> AbstractContextManager[PartStore]:
+        """Open the template for reading.
+
+        A ``PartStore`` passed in is shared and therefore left open on exit; a
+        path is opened as a ``ZipPartStore`` and closed again.
+        """
+        if self._source is not None:
+            return nullcontext(self._source)
+        return ZipPartStore(self._template_path)
+
+    @property
+    def parser_policy(self) -> ParserPolicy:
+        return self._parser_policy
+
+    @property
+    def parser(self) -> etree.XMLParser:
+        return self._parser
+
     def build_workbook_map(self) -> WorkbookMap:
         """Build a map of worksheets, tables, and pivot caches."""
-        with zipfile.ZipFile(self._template_path, "r") as archive:
+        with self.open_archive() as archive:
             workbook_tree = self._read_xml(archive, "xl/workbook.xml")
             rels_tree = self._read_xml(archive, "xl/_rels/workbook.xml.rels")
 
             worksheets = self._parse_worksheets(workbook_tree, rels_tree)
-            tables = self._parse_tables(archive, worksheets)
+            tables, schemas = self._parse_tables(archive, worksheets)
             pivot_cache_paths = self._parse_pivot_caches(rels_tree)
+            pivot_caches = self._index_pivot_caches(
+                archive,
+                worksheets,
+                tables,
+                pivot_cache_paths,
+                self._parse_defined_names(workbook_tree),
+            )
+
+        table_pivot_caches: dict[str, tuple[str, ...]] = {}
+        for cache in pivot_caches.values():
+            if cache.source_type == "table" and cache.source_name:
+                dependents = table_pivot_caches.get(cache.source_name, ())
+                table_pivot_caches[cache.source_name] = (*dependents, cache.path)
 
         return WorkbookMap(
             template_path=self._template_path,
             worksheets=worksheets,
             tables=tables,
             pivot_cache_definition_paths=pivot_cache_paths,
+            pivot_caches=pivot_caches,
+            table_pivot_caches=table_pivot_caches,
+            table_schemas=schemas,
         )
 
     def read_sheet_xml(
-        self, archive: zipfile.ZipFile, worksheet_path: str
+        self, archive: zipfile.ZipFile | PartStore, worksheet_path: str
     ) -> etree._ElementTree:
         """Read worksheet XML as an lxml tree."""
         return self._read_xml(archive, worksheet_path)
@@ -113,6 +241,120 @@ class XmlEngine:
 
         self._sort_rows(sheet_data)
 
+    def update_column_cells(
+        self,
+        tree: etree._ElementTree,
+        first_row: int,
+        columns: Mapping[int, Sequence[object]],
+    ) -> None:
+        """Overwrite the cells of selected columns for rows from ``first_row``.
+
+        Rows are looked up through an index built in one pass, and each row is
+        scanned only until the target cells are found, so cells of other
+        columns are neither visited twice nor modified.
+        """
+        if first_row < 1 or any(col_idx < 1 for col_idx in columns):
+            raise InvalidDataError("Start row/col must be >= 1.")
+        if not columns:
+            return
+        row_count = len(next(iter(columns.values())))
+        if any(len(values) != row_count for values in columns.values()):
+            raise InvalidDataError("Column value lists must have equal lengths.")
+        last_row = first_row + row_count - 1
+
+        sheet_data = tree.find(".//main:sheetData", namespaces=_NSMAP_MAIN)
+        if sheet_data is None:
+            raise XmlStructureError("sheetData element not found.")
+
+        row_index: dict[int, etree._Element] = {}
+        for row in sheet_data.iterfind("main:row", namespaces=_NSMAP_MAIN):
+            row_idx = int(row.get("r", "0"))
+            if first_row <= row_idx <= last_row:
+                row_index[row_idx] = row
+
+        letters = {col_idx: column_index_to_letter(col_idx) for col_idx in columns}
+        created_rows = False
+        for offset in range(row_count):
+            row_idx = first_row + offset
+            row = row_index.get(row_idx)
+            if row is None:
+                row = etree.SubElement(sheet_data, f"{{{_NS_MAIN}}}row")
+                row.set("r", str(row_idx))
+                created_rows = True
+
+            targets = {f"{letters[col_idx]}{row_idx}": col_idx for col_idx in columns}
+            found: dict[int, etree._Element] = {}
+            cell_ref = ""
+            for cell in row.iterfind("main:c", namespaces=_NSMAP_MAIN):
+                previous_ref, cell_ref = cell_ref, cell.get("r", "")
+                if not cell_ref:
+                    # Compact rows omit references; number such cells as we go.
+                    cell_ref = _next_cell_ref(previous_ref, row_idx)
+                    cell.set("r", cell_ref)
+                col_idx = targets.get(cell_ref)
+                if col_idx is not None:
+                    found[col_idx] = cell
+                    if len(found) == len(targets):
+                        break
+
+            for cell_ref, col_idx in targets.items():
+                cell = found.get(col_idx)
+                if cell is None:
+                    cell = self._insert_cell(row, cell_ref, col_idx)
+                self._set_cell_value_inline(cell, columns[col_idx][offset])
+
+        if created_rows:
+            self._sort_rows(sheet_data)
+
+    def fill_shared_formula(
+        self,
+        tree: etree._ElementTree,
+        col_idx: int,
+        first_row: int,
+        last_row: int,
+        formula: str,
+    ) -> None:
+        """Write one shared formula into a column for ``first_row:last_row``.
+
+        Cells in the range lose their values; no cached results are written, so
+        Excel computes them on load. The shared index is the first one unused in
+        the worksheet.
+        """
+        if first_row < 1 or col_idx < 1 or last_row < first_row:
+            raise InvalidDataError("Formula range is invalid.")
+
+        sheet_data = tree.find(".//main:sheetData", namespaces=_NSMAP_MAIN)
+        if sheet_data is None:
+            raise XmlStructureError("sheetData element not found.")
+
+        used = [
+            int(node.get("si"))
+            for node in sheet_data.iterfind(".//main:f[@si]", namespaces=_NSMAP_MAIN)
+        ]
+        shared_index = str(max(used, default=-1) + 1)
+        shared_ref = (
+            f"{build_a1_cell(first_row, col_idx)}:{build_a1_cell(last_row, col_idx)}"
+        )
+
+        for row_idx in range(first_row, last_row + 1):
+            row_element = self._find_or_create_row(sheet_data, row_idx)
+            cell = self._find_or_create_cell(
+                row_element, build_a1_cell(row_idx, col_idx)
+            )
+            for child in list(cell):
+                cell.remove(child)
+            cell.attrib.pop("t", None)
+            formula_node = etree.SubElement(cell, f"{{{_NS_MAIN}}}f")
+            formula_node.set("t", "shared")
+            if row_idx == first_row:
+                formula_node.set("ref", shared_ref)
+                formula_node.set("si", shared_index)
+                formula_node.text = formula
+            else:
+                formula_node.set("si", shared_index)
+
+        self._sort_rows(sheet_data)
+
     def _parse_worksheets(
         self,
         workbook_tree: etree._ElementTree,
@@ -142,28 +384,22 @@ class XmlEngine:
 
     def _parse_tables(
         self,
-        archive: zipfile.ZipFile,
+        archive: PartStore,
         worksheets: dict[str, WorksheetInfo],
-    ) -> dict[str, TableRef]:
+    ) -> tuple[dict[str, TableRef], dict[str, TableSchema]]:
+        """Resolve tables through worksheet relationships, never sheet data."""
+        names = set(archive.namelist())
         tables: dict[str, TableRef] = {}
+        schemas: dict[str, TableSchema] = {}
         for worksheet in worksheets.values():
-            sheet_tree = self._read_xml(archive, worksheet.path)
-            table_parts = sheet_tree.findall(
-                ".//main:tableParts/main:tablePart", _NSMAP_MAIN
-            )
-            if not table_parts:
-                continue
-
             rels_path = self._sheet_rels_path(worksheet.path)
-            rels_tree = self._read_xml(archive, rels_path)
-            rel_map = self._parse_relationships(rels_tree)
-
-            for table_part in table_parts:
-                rel_id = table_part.get(f"{{{_NS_REL}}}id")
-                if not rel_id:
-                    continue
-                target = rel_map.get(rel_id)
-                if not target:
+            if rels_path not in names:
+                continue
+            rel_map = self._parse_typed_relationships(
+                self._read_xml(archive, rels_path)
+            )
+            for rel_type, target in rel_map.values():
+                if not rel_type.endswith(_REL_TYPE_TABLE):
                     continue
                 table_path = self._normalize_rel_target(worksheet.path, target)
                 table_tree = self._read_xml(archive, table_path)
@@ -173,15 +409,37 @@ class XmlEngine:
                 if not name or not ref:
                     raise XmlStructureError("Table definition missing name or ref.")
 
+                schema = self._parse_table_schema(name, table_node)
+                schemas[name] = schema
                 tables[name] = TableRef(
                     name=name,
                     sheet_name=worksheet.name,
                     table_path=table_path,
                     worksheet_path=worksheet.path,
                     ref=ref,
+                    columns=schema.names,
                 )
 
-        return tables
+        return tables, schemas
+
+    def _parse_table_schema(self, name: str, table: etree._Element) -> TableSchema:
+        columns = []
+        for column in table.iterfind("{*}tableColumns/{*}tableColumn"):
+            formula = column.find("{*}calculatedColumnFormula")
+            columns.append(
+                ColumnSpec(
+                    name=column.get("name", ""),
+                    formula=(
+                        formula.text
+                        if formula is not None
+                        and formula.text
+                        and formula.get("array") != "1"
+                        else None
+                    ),
+                    data_dxf_id=column.get("dataDxfId"),
+                )
+            )
+        return TableSchema(name=name, columns=tuple(columns))
 
     def _parse_pivot_caches(self, rels_tree: etree._ElementTree) -> dict[str, str]:
         rel_map = self._parse_relationships(rels_tree)
@@ -191,8 +449,149 @@ class XmlEngine:
                 cache_paths[rel_id] = f"xl/{target}"
         return cache_paths
 
-    def read_xml(self, archive: zipfile.ZipFile, path: str) -> etree._ElementTree:
-        return read_xml_part(archive, path)
+    def _index_pivot_caches(
+        self,
+        archive: PartStore,
+        worksheets: dict[str, WorksheetInfo],
+        tables: dict[str, TableRef],
+        cache_paths: dict[str, str],
+        defined_names: dict[tuple[str, str | None], str],
+    ) -> dict[str, PivotCacheInfo]:
+        users = self._parse_pivot_table_caches(archive, worksheets)
+        names = set(archive.namelist())
+        caches: dict[str, PivotCacheInfo] = {}
+        for rel_id, path in cache_paths.items():
+            source_type, name, sheet, ref = self._read_cache_source(archive, path)
+            if source_type == "name" and name in tables:
+                source_type = "table"
+            elif source_type == "name" and name:
+                # Resolve the name to the range or table it covers; a sheet on
+                # the source selects a name scoped to that sheet.
+                formula = defined_names.get((name, sheet)) or defined_names.get(
+                    (name, None)
+                )
+                source_type, name, sheet, ref = _resolve_defined_name(
+                    name, formula, tables
+                )
+
+            records_rel_id = records_path = None
+            rels_path = self._sheet_rels_path(path)
+            if rels_path in names:
+                cache_rels = self._parse_typed_relationships(
+                    self._read_xml(archive, rels_path)
+                )
+                for cache_rel_id, (rel_type, target) in cache_rels.items():
+                    if rel_type.endswith(_REL_TYPE_PIVOT_RECORDS):
+                        records_rel_id = cache_rel_id
+                        records_path = self._normalize_rel_target(path, target)
+            caches[path] = PivotCacheInfo(
+                path=path,
+                rel_id=rel_id,
+                source_type=source_type,
+                source_name=name,
+                source_sheet=sheet,
+                source_ref=ref,
+                pivot_table_paths=tuple(users.get(path, ())),
+                records_path=records_path,
+                records_rel_id=records_rel_id,
+            )
+        return caches
+
+    def _read_cache_source(
+        self, archive: PartStore, path: str
+    ) -> tuple[str, str | None, str | None, str | None]:
+        """Read only a cache definition's ``cacheSource``, skipping its fields."""
+        try:
+            stream = archive.open(path)
+        except KeyError as exc:
+            raise XmlStructureError(f"Missing XML part: {path}") from exc
+        with stream:
+            events = etree.iterparse(
+                stream,
+                events=("end",),
+                tag="{*}cacheSource",
+                huge_tree=self._parser_policy.huge_tree,
+            )
+            for _, cache_source in events:
+                source = cache_source.find("{*}worksheetSource")
+                if cache_source.get("type") != "worksheet" or source is None:
+                    return "external", None, None, None
+                name = source.get("name")
+                if name:
+                    return "name", name, source.get("sheet"), source.get("ref")
+                return "range", None, source.get("sheet"), source.get("ref")
+        return "external", None, None, None
+
+    def _parse_defined_names(
+        self, workbook_tree: etree._ElementTree
+    ) -> dict[tuple[str, str | None], str]:
+        """Map (name, scope sheet or ``None``) to each defined name's formula."""
+        sheet_names = [
+            sheet.get("name")
+            for sheet in workbook_tree.findall(".//main:sheets/main:sheet", _NSMAP_MAIN)
+        ]
+        defined: dict[tuple[str, str | None], str] = {}
+        for node in workbook_tree.iterfind(
+            ".//main:definedNames/main:definedName", _NSMAP_MAIN
+        ):
+            name = node.get("name")
+            if not name or not node.text:
+                continue
+            scope = node.get("localSheetId")
+            sheet = None
+            if scope is not None:
+                if not scope.isdigit() or int(scope) >= len(sheet_names):
+                    continue
+                sheet = sheet_names[int(scope)]
+            defined[(name, sheet)] = node.text.strip()
+        return defined
+
+    def _parse_pivot_table_caches(
+        self,
+        archive: PartStore,
+        worksheets: dict[str, WorksheetInfo],
+    ) -> dict[str, list[str]]:
+        """Map pivot cache definition paths to the pivot tables using them."""
+        names = set(archive.namelist())
+        users: dict[str, list[str]] = {}
+        for worksheet in worksheets.values():
+            rels_path = self._sheet_rels_path(worksheet.path)
+            if rels_path not in names:
+                continue
+            sheet_rels = self._parse_typed_relationships(
+                self._read_xml(archive, rels_path)
+            )
+            for rel_type, target in sheet_rels.values():
+                if not rel_type.endswith(_REL_TYPE_PIVOT_TABLE):
+                    continue
+                pivot_path = self._normalize_rel_target(worksheet.path, target)
+                pivot_rels_path = self._sheet_rels_path(pivot_path)
+                if pivot_rels_path not in names:
+                    continue
+                pivot_rels = self._parse_typed_relationships(
+                    self._read_xml(archive, pivot_rels_path)
+                )
+                for cache_type, cache_target in pivot_rels.values():
+                    if cache_type.endswith(_REL_TYPE_PIVOT_CACHE):
+                        cache_path = self._normalize_rel_target(
+                            pivot_path, cache_target
+                        )
+                        users.setdefault(cache_path, []).append(pivot_path)
+        return users
+
+    def read_xml(
+        self, archive: zipfile.ZipFile | PartStore, path: str
+    ) -> etree._ElementTree:
+        return read_xml_part(
+            archive,
+            path,
+            self._parser,
+            incremental_threshold=self._parser_policy.incremental_threshold,
+        )
+
+    def parse_xml(self, data: bytes) -> etree._ElementTree:
+        """Parse serialized XML bytes with the engine's parser."""
+        return etree.fromstring(data, self._parser).getroottree()
 
     # Backward-compatible alias
     _read_xml = read_xml
@@ -210,6 +609,17 @@ class XmlEngine:
                 rels[rel_id] = target
         return rels
 
+    def _parse_typed_relationships(
+        self, rels_tree: etree._ElementTree
+    ) -> dict[str, tuple[str, str]]:
+        rels: dict[str, tuple[str, str]] = {}
+        for rel in rels_tree.findall(".//rel:Relationship", _NSMAP_PKG):
+            rel_id = rel.get("Id")
+            target = rel.get("Target")
+            if rel_id and target:
+                rels[rel_id] = (rel.get("Type", ""), target)
+        return rels
+
     def _sheet_rels_path(self, worksheet_path: str) -> str:
         filename = Path(worksheet_path).name
         parent = Path(worksheet_path).parent
@@ -242,6 +652,20 @@ class XmlEngine:
         cell.set("r", cell_ref)
         return cell
 
+    def _insert_cell(
+        self, row: etree._Element, cell_ref: str, col_idx: int
+    ) -> etree._Element:
+        """Create a cell, keeping the row's cells in column order."""
+        cell = etree.Element(f"{{{_NS_MAIN}}}c")
+        cell.set("r", cell_ref)
+        for existing in row.iterfind("main:c", _NSMAP_MAIN):
+            letters = existing.get("r", "").rstrip("0123456789")
+            if letters and column_letter_to_index(letters) > col_idx:
+                existing.addprevious(cell)
+                return cell
+        row.append(cell)
+        return cell
+
     def _set_cell_value_inline(self, cell: etree._Element, value: object) -> None:
         for child in list(cell):
             cell.remove(child)
@@ -265,10 +689,7 @@ class XmlEngine:
         text.text = text_value
 
     def _is_missing(self, value: object) -> bool:
-        try:
-            return bool(pd.isna(value))
-        except (TypeError, ValueError):
-            return False
+        return is_missing(value)
 
     def _sort_rows(self, sheet_data: etree._Element) -> None:
         rows = sheet_data.findall("main:row", namespaces=_NSMAP_MAIN)
@@ -277,3 +698,27 @@ class XmlEngine:
             sheet_data.remove(row)
         for row in rows_sorted:
             sheet_data.append(row)
+
+
+def _next_cell_ref(previous_ref: str, row_idx: int) -> str:
+    """Return the reference of the cell after ``previous_ref`` in its row."""
+    letters = previous_ref.rstrip("0123456789")
+    col_idx = column_letter_to_index(letters) + 1 if letters else 1
+    return build_a1_cell(row_idx, col_idx)
+
+
+def _resolve_defined_name(
+    name: str, formula: str | None, tables: Mapping[str, TableRef]
+) -> tuple[str, str | None, str | None, str | None]:
+    """Return a named cache source as a table, a sheet range or unresolved."""
+    if formula:
+        table = _NAMED_TABLE_RE.match(formula)
+        if table is not None and table.group("table") in tables:
+            return "table", table.group("table"), None, None
+        named_range = _NAMED_RANGE_RE.match(formula)
+        if named_range is not None:
+            sheet = named_range.group("sheet")
+            if sheet is None:
+                sheet = named_range.group("quoted").replace("''", "'")
+            return "name", name, sheet, named_range.group("ref")
+    return "name", name, None, None
@@ -0,0 +1,301 @@
+"""Build minimal workbooks with tables, pivot caches and pivot tables."""
+
+from __future__ import annotations
+
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from lxml import etree
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_CONTENT_TYPES = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+TABLE_COLUMNS = ("Category", "Region", "Amount")
+CALCULATED_FORMULA = "Sales[[#This Row],[Amount]]*2"
+_CT_PREFIX = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+_NSMAP = {"main": NS_MAIN}
+
+
+@dataclass(frozen=True)
+class CacheSpec:
+    """Describes one pivot cache: its source and how many pivot tables use it.
+
+    ``source`` is ``("table", name)``, ``("name", defined_name)``,
+    ``("range", sheet, ref)`` or ``("external",)``.
+    """
+
+    source: tuple[str, ...]
+    pivot_tables: int = 1
+    records: bool = True
+
+
+def cache_path(index: int) -> str:
+    return f"xl/pivotCache/pivotCacheDefinition{index}.xml"
+
+
+def records_path(index: int) -> str:
+    return f"xl/pivotCache/pivotCacheRecords{index}.xml"
+
+
+def write_pivot_workbook(
+    path: Path,
+    caches: list[CacheSpec],
+    defined_names: dict[str, str] | None = None,
+) -> None:
+    """Write a workbook with a ``DataSource`` table and the given pivot caches.
+
+    ``defined_names`` maps workbook-scoped names to their formulas.
+    """
+    parts: dict[str, str] = {}
+    overrides = [
+        ("/xl/workbook.xml", f"{_CT_PREFIX}.sheet.main+xml"),
+        ("/xl/worksheets/sheet1.xml", f"{_CT_PREFIX}.worksheet+xml"),
+        ("/xl/worksheets/sheet2.xml", f"{_CT_PREFIX}.worksheet+xml"),
+        ("/xl/tables/table1.xml", f"{_CT_PREFIX}.table+xml"),
+    ]
+
+    workbook_rels = [
+        _rel("rId1", "worksheet", "worksheets/sheet1.xml"),
+        _rel("rId2", "worksheet", "worksheets/sheet2.xml"),
+    ]
+    pivot_cache_refs = []
+    pivot_sheet_rels = []
+    pivot_table_index = 0
+    for index, spec in enumerate(caches, start=1):
+        rel_id = f"rId{index + 2}"
+        workbook_rels.append(
+            _rel(
+                rel_id,
+                "pivotCacheDefinition",
+                f"pivotCache/pivotCacheDefinition{index}.xml",
+            )
+        )
+        pivot_cache_refs.append(f'<pivotCache cacheId="{index}" r:id="{rel_id}"/>')
+        parts[cache_path(index)] = _cache_definition(spec)
+        overrides.append(
+            (f"/{cache_path(index)}", f"{_CT_PREFIX}.pivotCacheDefinition+xml")
+        )
+        if spec.records:
+            parts[f"xl/pivotCache/_rels/pivotCacheDefinition{index}.xml.rels"] = _rels(
+                [_rel("rId1", "pivotCacheRecords", f"pivotCacheRecords{index}.xml")]
+            )
+            parts[records_path(index)] = (
+                f'<pivotCacheRecords xmlns="{NS_MAIN}" count="2">'
+                '<r><x v="0"/></r><r><x v="1"/></r></pivotCacheRecords>'
+            )
+            overrides.append(
+                (f"/{records_path(index)}", f"{_CT_PREFIX}.pivotCacheRecords+xml")
+            )
+
+        for _ in range(spec.pivot_tables):
+            pivot_table_index += 1
+            table_path = f"xl/pivotTables/pivotTable{pivot_table_index}.xml"
+            parts[table_path] = (
+                f'<pivotTableDefinition xmlns="{NS_MAIN}" name="Pivot{pivot_table_index}" '
+                f'cacheId="{index}"/>'
+            )
+            parts[f"xl/pivotTables/_rels/pivotTable{pivot_table_index}.xml.rels"] = (
+                _rels(
+                    [
+                        _rel(
+                            "rId1",
+                            "pivotCacheDefinition",
+                            f"../pivotCache/pivotCacheDefinition{index}.xml",
+                        )
+                    ]
+                )
+            )
+            pivot_sheet_rels.append(
+                _rel(
+                    f"rId{pivot_table_index}",
+                    "pivotTable",
+                    f"../pivotTables/pivotTable{pivot_table_index}.xml",
+                )
+            )
+            overrides.append((f"/{table_path}", f"{_CT_PREFIX}.pivotTable+xml"))
+
+    parts["xl/workbook.xml"] = (
+        f'<workbook xmlns="{NS_MAIN}" xmlns:r="{NS_REL}"><sheets>'
+        '<sheet name="Data" sheetId="1" r:id="rId1"/>'
+        '<sheet name="Pivot" sheetId="2" r:id="rId2"/>'
+        f"</sheets>{_defined_names(defined_names or {})}"
+        f"<pivotCaches>{''.join(pivot_cache_refs)}</pivotCaches></workbook>"
+    )
+    parts["xl/_rels/workbook.xml.rels"] = _rels(workbook_rels)
+    parts["xl/worksheets/sheet1.xml"] = (
+        f'<worksheet xmlns="{NS_MAIN}" xmlns:r="{NS_REL}"><dimension ref="A1:C3"/>'
+        "<sheetData>"
+        '<row r="1"><c r="A1" t="inlineStr"><is><t>Category</t></is></c>'
+        '<c r="B1" t="inlineStr"><is><t>Region</t></is></c>'
+        '<c r="C1" t="inlineStr"><is><t>Amount</t></is></c></row>'
+        '<row r="2"><c r="A2" t="inlineStr"><is><t>Hardware</t></is></c>'
+        '<c r="B2" t="inlineStr"><is><t>North</t></is></c><c r="C2"><v>1</v></c></row>'
+        '<row r="3"><c r="A3" t="inlineStr"><is><t>Software</t></is></c>'
+        '<c r="B3" t="inlineStr"><is><t>South</t></is></c><c r="C3"><v>2</v></c></row>'
+        '</sheetData><tableParts count="1"><tablePart r:id="rId1"/></tableParts>'
+        "</worksheet>"
+    )
+    parts["xl/worksheets/_rels/sheet1.xml.rels"] = _rels(
+        [_rel("rId1", "table", "../tables/table1.xml")]
+    )
+    parts["xl/worksheets/sheet2.xml"] = (
+        f'<worksheet xmlns="{NS_MAIN}"><sheetData/></worksheet>'
+    )
+    if pivot_sheet_rels:
+        parts["xl/worksheets/_rels/sheet2.xml.rels"] = _rels(pivot_sheet_rels)
+    columns = "".join(
+        f'<tableColumn id="{idx}" name="{name}"/>'
+        for idx, name in enumerate(TABLE_COLUMNS, start=1)
+    )
+    parts["xl/tables/table1.xml"] = (
+        f'<table xmlns="{NS_MAIN}" id="1" name="DataSource" displayName="DataSource" '
+        f'ref="A1:C3"><autoFilter ref="A1:C3"/><tableColumns count="3">{columns}'
+        "</tableColumns></table>"
+    )
+    override_xml = "".join(
+        f'<Override PartName="{name}" ContentType="{content_type}"/>'
+        for name, content_type in overrides
+    )
+    content_types = (
+        f'<Types xmlns="{NS_CONTENT_TYPES}">'
+        '<Default Extension="rels" '
+        'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        f"{override_xml}</Types>"
+    )
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", content_types)
+        for name, content in parts.items():
+            archive.writestr(name, content)
+
+
+def _cache_definition(spec: CacheSpec) -> str:
+    kind = spec.source[0]
+    if kind in ("table", "name"):
+        source = (
+            f'<cacheSource type="worksheet"><worksheetSource name="{spec.source[1]}"/>'
+            "</cacheSource>"
+        )
+    elif kind == "range":
+        source = (
+            '<cacheSource type="worksheet">'
+            f'<worksheetSource ref="{spec.source[2]}" sheet="{spec.source[1]}"/>'
+            "</cacheSource>"
+        )
+    else:
+        source = '<cacheSource type="external" connectionId="1"/>'
+    fields = "".join(
+        f'<cacheField name="{name}" numFmtId="0"><sharedItems/></cacheField>'
+        for name in TABLE_COLUMNS
+    )
+    record_id = ' r:id="rId1"' if spec.records else ""
+    return (
+        f'<pivotCacheDefinition xmlns="{NS_MAIN}" xmlns:r="{NS_REL}"{record_id} '
+        'refreshedBy="Author" recordCount="2">'
+        f'{source}<cacheFields count="{len(TABLE_COLUMNS)}">{fields}</cacheFields>'
+        "</pivotCacheDefinition>"
+    )
+
+
+def _defined_names(names: dict[str, str]) -> str:
+    if not names:
+        return ""
+    nodes = "".join(
+        f'<definedName name="{name}">{formula}</definedName>'
+        for name, formula in names.items()
+    )
+    return f"<definedNames>{nodes}</definedNames>"
+
+
+def _rel(rel_id: str, rel_type: str, target: str) -> str:
+    return f'<Relationship Id="{rel_id}" Type="{NS_REL}/{rel_type}" Target="{target}"/>'
+
+
+def _rels(relationships: list[str]) -> str:
+    return (
+        f'<Relationships xmlns="{NS_PKG_REL}">{"".join(relationships)}</Relationships>'
+    )
+
+
+def replace_in_part(
+    source: Path, target: Path, part: str, old: bytes, new: bytes
+) -> Path:
+    """Copy the workbook ``source`` to ``target`` with ``old`` replaced in a part."""
+    with (
+        zipfile.ZipFile(source) as src,
+        zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as dest,
+    ):
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename == part:
+                if old not in data:
+                    raise ValueError(f"{old!r} not found in {part}")
+                data = data.replace(old, new)
+            dest.writestr(info, data)
+    return target
+
+
+def write_calculated_workbook(path: Path) -> None:
+    """Write a workbook whose table ``Sales`` has a calculated third column."""
+    workbook_xml = (
+        f'<workbook xmlns="{NS_MAIN}" xmlns:r="{NS_REL}">'
+        '<sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    )
+    workbook_rels_xml = (
+        f'<Relationships xmlns="{NS_PKG_REL}">'
+        f'<Relationship Id="rId1" Type="{NS_REL}/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        "</Relationships>"
+    )
+    worksheet_xml = (
+        f'<worksheet xmlns="{NS_MAIN}" xmlns:r="{NS_REL}">'
+        '<dimension ref="A1:C2"/><sheetData>'
+        '<row r="1"><c r="A1" t="inlineStr"><is><t>Name</t></is></c>'
+        '<c r="B1" t="inlineStr"><is><t>Amount</t></is></c>'
+        '<c r="C1" t="inlineStr"><is><t>Double</t></is></c></row>'
+        '<row r="2"><c r="A2" t="inlineStr"><is><t>x</t></is></c>'
+        f'<c r="B2"><v>1</v></c><c r="C2"><f>{CALCULATED_FORMULA}</f><v>2</v></c></row>'
+        '<row r="5"><c r="E5"><f t="shared" ref="E5:E6" si="0">A1</f></c></row>'
+        '<row r="6"><c r="E6"><f t="shared" si="0"/></c></row>'
+        '</sheetData><tableParts count="1"><tablePart r:id="rId1"/></tableParts>'
+        "</worksheet>"
+    )
+    worksheet_rels_xml = (
+        f'<Relationships xmlns="{NS_PKG_REL}">'
+        f'<Relationship Id="rId1" Type="{NS_REL}/table" '
+        'Target="../tables/table1.xml"/>'
+        "</Relationships>"
+    )
+    table_xml = (
+        f'<table xmlns="{NS_MAIN}" id="1" name="Sales" displayName="Sales" '
+        'ref="A1:C2"><autoFilter ref="A1:C2"/><tableColumns count="3">'
+        '<tableColumn id="1" name="Name"/><tableColumn id="2" name="Amount"/>'
+        '<tableColumn id="3" name="Double">'
+        f"<calculatedColumnFormula>{CALCULATED_FORMULA}</calculatedColumnFormula>"
+        "</tableColumn></tableColumns></table>"
+    )
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("xl/workbook.xml", workbook_xml)
+        archive.writestr("xl/_rels/workbook.xml.rels", workbook_rels_xml)
+        archive.writestr("xl/worksheets/sheet1.xml", worksheet_xml)
+        archive.writestr("xl/worksheets/_rels/sheet1.xml.rels", worksheet_rels_xml)
+        archive.writestr("xl/tables/table1.xml", table_xml)
+
+
+def formula_cells(path: Path) -> dict[str, dict[str, str | None]]:
+    """Return the formula attributes and text of the column C cells, by ref."""
+    with zipfile.ZipFile(path, "r") as archive:
+        sheet = etree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+    cells = {}
+    for cell in sheet.iterfind(".//main:c", _NSMAP):
+        formula = cell.find("main:f", _NSMAP)
+        if formula is None or not cell.get("r", "").startswith("C"):
+            continue
+        assert cell.find("main:v", _NSMAP) is None
+        cells[cell.get("r")] = {**formula.attrib, "text": formula.text}
+    return cells
@@ -0,0 +1,104 @@
+"""Tests for writing one workbook per DataFrame group."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from pivoteer.burst import burst
+from pivoteer.exceptions import InvalidDataError
+from pivoteer.table_reader import read_table
+from tests.pivot_fixtures import replace_in_part, write_pivot_workbook
+
+_DF = pd.DataFrame(
+    {
+        "Category": ["Hardware", "Software", "Services", "Hardware", "Software"],
+        "Region": ["North", "South", "North", "East", "South"],
+        "Amount": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "Date": [1, 2, 3, 4, 5],
+    }
+)
+
+
+def test_one_workbook_per_group(template_path: Path, tmp_path: Path) -> None:
+    outputs = burst(
+        template_path,
+        "DataSource",
+        _DF,
+        by="Region",
+        output_pattern=str(tmp_path / "report_{Region}.xlsx"),
+        max_workers=3,
+    )
+
+    assert list(outputs) == ["East", "North", "South"]
+    for region, path in outputs.items():
+        assert path == tmp_path / f"report_{region}.xlsx"
+        frame = read_table(path, "DataSource")
+        expected = _DF[_DF["Region"] == region]
+        assert frame["Region"].tolist() == expected["Region"].tolist()
+        assert frame["Amount"].tolist() == expected["Amount"].tolist()
+
+
+def test_formatting_splicing_would_drop_is_kept(tmp_path: Path) -> None:
+    sheet = "xl/worksheets/sheet1.xml"
+    source = tmp_path / "source.xlsx"
+    write_pivot_workbook(source, [])
+    height = b'<row r="3" ht="30" customHeight="1"'
+    template = replace_in_part(
+        source, tmp_path / "tall.xlsx", sheet, b'<row r="3"', height
+    )
+    df = pd.DataFrame(
+        {
+            "Category": ["A", "B", "C"],
+            "Region": ["N", "N", "S"],
+            "Amount": [1, 2, 3],
+        }
+    )
+
+    outputs = burst(
+        template,
+        "DataSource",
+        df,
+        by="Region",
+        output_pattern=str(tmp_path / "report_{Region}.xlsx"),
+    )
+
+    with zipfile.ZipFile(outputs["N"]) as archive:
+        assert height in archive.read(sheet)
+    assert read_table(outputs["N"], "DataSource")["Amount"].tolist() == [1, 2]
+    assert read_table(outputs["S"], "DataSource")["Amount"].tolist() == [3]
+
+
+@pytest.mark.parametrize("by", [["Region", "Category"], ("Region", "Category")])
+def test_multiple_keys_and_callable_pattern(
+    template_path: Path, tmp_path: Path, by: list[str] | tuple[str, ...]
+) -> None:
+    outputs = burst(
+        template_path,
+        "DataSource",
+        _DF,
+        by=by,
+        output_pattern=lambda key: tmp_path / f"{key[0]}-{key[1]}.xlsx",
+    )
+
+    assert len(outputs) == 4
+    assert outputs[("South", "Software")] == tmp_path / "South-Software.xlsx"
+    frame = read_table(outputs[("South", "Software")], "DataSource")
+    assert frame["Amount"].tolist() == [2.0, 5.0]
+
+
+def test_invalid_bursts_raise(template_path: Path, tmp_path: Path) -> None:
+    with pytest.raises(InvalidDataError, match="no columns named"):
+        burst(template_path, "DataSource", _DF, by="Missing", output_pattern="x")
+    with pytest.raises(ValueError, match="its own path"):
+        burst(
+            template_path,
+            "DataSource",
+            _DF,
+            by="Region",
+            output_pattern=str(tmp_path / "same.xlsx"),
+        )
+    assert not (tmp_path / "same.xlsx").exists()
@@ -0,0 +1,64 @@
+"""Tests for shared-formula filling of calculated table columns."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from lxml import etree
+
+from pivoteer.core import Pivoteer
+from pivoteer.row_encoder import encode_shared_formula
+from pivoteer.sheet_splicer import next_shared_formula_index
+from tests.pivot_fixtures import (
+    CALCULATED_FORMULA,
+    formula_cells,
+    write_calculated_workbook,
+)
+
+
+@pytest.mark.parametrize("engine", ["dom", "splice"])
+def test_calculated_column_filled_with_shared_formula(
+    tmp_path: Path, engine: str
+) -> None:
+    template = tmp_path / "calculated.xlsx"
+    write_calculated_workbook(template)
+    df = pd.DataFrame({"Name": ["a", "b", "c"], "Amount": [1, 2, 3]})
+
+    pivoteer = Pivoteer(template, engine=engine)
+    pivoteer.apply_dataframe("Sales", df)
+    output = pivoteer.save(tmp_path / f"{engine}.xlsx")
+
+    assert formula_cells(output) == {
+        "C2": {"t": "shared", "ref": "C2:C4", "si": "1", "text": CALCULATED_FORMULA},
+        "C3": {"t": "shared", "si": "1", "text": None},
+        "C4": {"t": "shared", "si": "1", "text": None},
+    }
+    with zipfile.ZipFile(output, "r") as archive:
+        table = etree.fromstring(archive.read("xl/tables/table1.xml"))
+    assert table.get("ref") == "A1:C4"
+
+
+def test_full_width_dataframe_keeps_supplied_values(tmp_path: Path) -> None:
+    template = tmp_path / "calculated.xlsx"
+    write_calculated_workbook(template)
+    df = pd.DataFrame({"Name": ["a"], "Amount": [1], "Double": [5]})
+
+    pivoteer = Pivoteer(template)
+    pivoteer.apply_dataframe("Sales", df)
+    output = pivoteer.save(tmp_path / "values.xlsx")
+
+    assert formula_cells(output) == {}
+
+
+def test_encode_shared_formula_repeats_reference_only() -> None:
+    cells = encode_shared_formula('[@A]&"<"', "D2:D4", 3, 3)
+    assert cells[0] == (b'><f t="shared" ref="D2:D4" si="3">[@A]&amp;"&lt;"</f></c>')
+    assert cells[1:] == [b'><f t="shared" si="3"/></c>'] * 2
+
+
+def test_next_shared_formula_index() -> None:
+    assert next_shared_formula_index(b"<row/>") == 0
+    assert next_shared_formula_index(b'<f t="shared" si="4"/>', b'<f si="1"/>') == 5
@@ -0,0 +1,159 @@
+"""Tests for column selection by mapping, name matching and projection."""
+
+from __future__ import annotations
+
+import tracemalloc
+import zipfile
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pivoteer.core import Pivoteer
+from pivoteer.exceptions import InvalidDataError
+from tests.pivot_fixtures import formula_cells, write_calculated_workbook
+
+_ORDERED = pd.DataFrame(
+    {
+        "Category": ["Hardware", "Software"],
+        "Region": ["North", "South"],
+        "Amount": [1.5, 2.0],
+        "Date": ["2024-01-01", "2024-01-02"],
+    }
+)
+_SHUFFLED = pd.DataFrame(
+    {
+        "amt": [1.5, 2.0],
+        "Extra": ["x", "y"],
+        "Date": ["2024-01-01", "2024-01-02"],
+        "Region": ["North", "South"],
+        "Category": ["Hardware", "Software"],
+    }
+)
+
+
+def _sheet(path: Path) -> bytes:
+    with zipfile.ZipFile(path) as archive:
+        return archive.read("xl/worksheets/sheet1.xml")
+
+
+def _render(template: Path, output: Path, df: pd.DataFrame, **options: Any) -> bytes:
+    pivoteer = Pivoteer(template, engine=options.pop("engine", "dom"))
+    pivoteer.apply_dataframe("DataSource", df, **options)
+    return _sheet(pivoteer.save(output))
+
+
+@pytest.mark.parametrize("engine", ["dom", "splice"])
+def test_selection_modes_match_ordered_frame(
+    template_path: Path, tmp_path: Path, engine: str
+) -> None:
+    expected = _render(
+        template_path, tmp_path / "ordered.xlsx", _ORDERED, engine=engine
+    )
+    by_name = _SHUFFLED.rename(columns={"amt": "Amount"})
+    assert (
+        _render(
+            template_path, tmp_path / "n.xlsx", by_name, engine=engine, match="name"
+        )
+        == expected
+    )
+    assert (
+        _render(
+            template_path,
+            tmp_path / "l.xlsx",
+            _SHUFFLED,
+            engine=engine,
+            columns=["Category", "Region", "amt", "Date"],
+        )
+        == expected
+    )
+    mapping = {
+        "Amount": "amt",
+        "Date": "Date",
+        "Region": "Region",
+        "Category": "Category",
+    }
+    assert (
+        _render(
+            template_path,
+            tmp_path / "m.xlsx",
+            _SHUFFLED,
+            engine=engine,
+            columns=mapping,
+        )
+        == expected
+    )
+
+
+def test_mapping_omitting_calculated_column_fills_formula(tmp_path: Path) -> None:
+    template = tmp_path / "calculated.xlsx"
+    write_calculated_workbook(template)
+    df = pd.DataFrame({"qty": [1, 2], "label": ["a", "b"]})
+
+    pivoteer = Pivoteer(template)
+    pivoteer.apply_dataframe("Sales", df, columns={"Name": "label", "Amount": "qty"})
+    output = pivoteer.save(tmp_path / "out.xlsx")
+
+    assert set(formula_cells(output)) == {"C2", "C3"}
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"match": "name"},
+        {"columns": ["Category", "Region", "Amount", "Date"]},
+        {
+            "columns": {
+                "Date": "Date",
+                "Amount": "Amount",
+                "Category": "Category",
+                "Region": "Region",
+            }
+        },
+    ],
+)
+def test_selection_does_not_copy_the_frame(
+    template_path: Path, options: dict[str, Any]
+) -> None:
+    rows = 200_000
+    df = pd.DataFrame(
+        {
+            "Extra": np.zeros(rows),
+            "Amount": np.arange(rows, dtype=float),
+            "Date": np.arange(rows, dtype=float),
+            "Region": np.arange(rows, dtype=float),
+            "Category": np.arange(rows, dtype=float),
+        }
+    )
+    pivoteer = Pivoteer(template_path, engine="splice")
+    tracemalloc.start()
+    try:
+        pivoteer.apply_dataframe("DataSource", df, **options)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # A copy of the four selected columns would take over 6 MB.
+    assert peak < 2 * 1024 * 1024
+
+
+@pytest.mark.parametrize(
+    ("options", "error", "message"),
+    [
+        ({"columns": {"Nope": "amt"}}, InvalidDataError, "no columns named"),
+        ({"columns": {"Category": "Category"}}, InvalidDataError, "no source column"),
+        ({"columns": ["Category", "Missing"]}, InvalidDataError, "DataFrame has no"),
+        ({"columns": ["Category"], "match": "name"}, ValueError, "not both"),
+        ({"match": "fuzzy"}, ValueError, "Unknown match"),
+    ],
+)
+def test_invalid_selection_raises(
+    template_path: Path,
+    options: dict[str, Any],
+    error: type[Exception],
+    message: str,
+) -> None:
+    pivoteer = Pivoteer(template_path)
+    with pytest.raises(error, match=message):
+        pivoteer.apply_dataframe("DataSource", _SHUFFLED, **options)
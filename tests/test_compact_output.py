@@ -0,0 +1,82 @@
+"""Tests for compact row output without empty cells or redundant references."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pivoteer.core import Pivoteer
+from pivoteer.row_encoder import build_row_block, encode_rows
+from pivoteer.sheet_splicer import iter_cell_positions
+from pivoteer.table_reader import read_table
+
+_DF = pd.DataFrame(
+    {
+        "Category": ["Hardware", None, "Services"],
+        "Region": ["North", "South", None],
+        "Amount": [1.5, np.nan, 3.0],
+        "Date": [1, 2, 3],
+    }
+)
+
+
+def test_compact_rows_drop_empty_cells_and_implied_refs() -> None:
+    columns = encode_rows([[1, None, 3], [None, None, None], [None, 5, 6]])
+
+    assert build_row_block(columns, 2, 1, compact=True) == (
+        b'<row r="2" spans="1:3"><c><v>1</v></c><c r="C2"><v>3</v></c></row>'
+        b'<row r="4" spans="1:3"><c r="B4"><v>5</v></c><c><v>6</v></c></row>'
+    )
+    assert build_row_block(columns[:1], 7, 2, compact=True) == (
+        b'<row r="7" spans="2:2"><c r="B7"><v>1</v></c></row>'
+    )
+
+
+def test_cell_positions_follow_implied_refs() -> None:
+    segment = (
+        b'<row r="2"><c><v>1</v></c><c r="C2"><v>3</v></c><c/></row>'
+        b'<row r="4"><c r="B4"/><c><v>6</v></c></row>'
+    )
+    assert list(iter_cell_positions(segment)) == [
+        (2, 1),
+        (2, 3),
+        (2, 4),
+        (4, 2),
+        (4, 3),
+    ]
+
+
+def test_compact_output_reads_back_the_same(
+    template_path: Path, tmp_path: Path
+) -> None:
+    outputs = {}
+    for compact in (False, True):
+        pivoteer = Pivoteer(template_path, engine="splice", compact=compact)
+        pivoteer.apply_dataframe("DataSource", _DF)
+        outputs[compact] = pivoteer.save(tmp_path / f"compact_{compact}.xlsx")
+
+    sizes = {}
+    for compact, path in outputs.items():
+        with zipfile.ZipFile(path) as archive:
+            sizes[compact] = archive.getinfo("xl/worksheets/sheet1.xml").file_size
+    assert sizes[True] < sizes[False]
+    pd.testing.assert_frame_equal(
+        read_table(outputs[True], "DataSource"),
+        read_table(outputs[False], "DataSource"),
+    )
+
+
+def test_update_columns_after_compact_splice(
+    template_path: Path, tmp_path: Path
+) -> None:
+    pivoteer = Pivoteer(template_path, engine="splice", compact=True)
+    pivoteer.apply_dataframe("DataSource", _DF)
+    pivoteer.update_columns("DataSource", pd.DataFrame({"Date": [7, 8, 9]}))
+    output = pivoteer.save(tmp_path / "updated.xlsx")
+
+    frame = read_table(output, "DataSource")
+    assert frame["Date"].tolist() == [7, 8, 9]
+    assert frame["Amount"].tolist()[::2] == [1.5, 3.0]
@@ -0,0 +1,84 @@
+"""Tests for byte-reproducible saves and output content hashes."""
+
+from __future__ import annotations
+
+import hashlib
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from pivoteer.core import Pivoteer
+from pivoteer.part_store import FIXED_DATE_TIME, ZipPartSink
+
+_DF = pd.DataFrame(
+    {
+        "Category": ["A", "B"],
+        "Region": ["North", "South"],
+        "Amount": [1, 2],
+        "Date": [45000, 45001],
+    }
+)
+
+
+def _restamp(template: Path, output: Path, date_time: tuple[int, ...]) -> Path:
+    """Copy ``template`` with every entry's timestamp set to ``date_time``."""
+    with (
+        zipfile.ZipFile(template) as source,
+        zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as target,
+    ):
+        for info in source.infolist():
+            entry = zipfile.ZipInfo(info.filename, date_time=date_time)
+            entry.compress_type = info.compress_type
+            target.writestr(entry, source.read(info))
+    return output
+
+
+@pytest.mark.parametrize("engine", ["dom", "splice"])
+def test_deterministic_saves_ignore_template_timestamps(
+    template_path: Path, tmp_path: Path, engine: str
+) -> None:
+    digests = set()
+    for year in (2001, 2024):
+        template = _restamp(
+            template_path, tmp_path / f"t{year}.xlsx", (year, 5, 6, 7, 8, 10)
+        )
+        pivoteer = Pivoteer(template, engine=engine, deterministic=True)
+        pivoteer.apply_dataframe("DataSource", _DF)
+        output, digest = pivoteer.save_with_digest(tmp_path / f"out{year}.xlsx")
+        assert digest == hashlib.sha256(output.read_bytes()).hexdigest()
+        digests.add(digest)
+
+        with zipfile.ZipFile(output) as archive:
+            infos = archive.infolist()
+        assert {info.date_time for info in infos} == {FIXED_DATE_TIME}
+        with zipfile.ZipFile(template) as archive:
+            assert [info.filename for info in infos] == archive.namelist()
+    assert len(digests) == 1
+
+
+def test_default_saves_keep_template_timestamps(
+    template_path: Path, tmp_path: Path
+) -> None:
+    template = _restamp(template_path, tmp_path / "t.xlsx", (2001, 5, 6, 7, 8, 10))
+    pivoteer = Pivoteer(template)
+    pivoteer.apply_dataframe("DataSource", _DF)
+    output, digest = pivoteer.save_with_digest(tmp_path / "out.xlsx", algorithm="md5")
+
+    assert len(digest) == 32
+    with zipfile.ZipFile(output) as archive:
+        assert {info.date_time for info in archive.infolist()} == {
+            (2001, 5, 6, 7, 8, 10)
+        }
+
+
+def test_deterministic_sink_streams_with_fixed_metadata(tmp_path: Path) -> None:
+    outputs = []
+    for index in range(2):
+        path = tmp_path / f"sink{index}.zip"
+        with ZipPartSink(path, deterministic=True) as sink:
+            sink.write("a.xml", b"<a/>")
+            sink.write_stream("b.xml", [b"<b>", b"x" * 64, b"</b>"], buffer_size=16)
+        outputs.append(path.read_bytes())
+    assert outputs[0] == outputs[1]
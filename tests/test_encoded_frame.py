@@ -0,0 +1,106 @@
+"""Tests for encoding a DataFrame once and splicing it into many templates."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import xlsxwriter
+
+from pivoteer.core import Pivoteer
+from pivoteer.exceptions import InvalidDataError
+from pivoteer.row_encoder import encode_frame
+from pivoteer.table_reader import read_table
+from tests.pivot_fixtures import formula_cells, write_calculated_workbook
+
+_DF = pd.DataFrame(
+    {
+        "Category": ["Hardware", "Software", None],
+        "Region": ["North", "South", "East"],
+        "Amount": [1.5, 2.0, 3.25],
+        "Date": [1, 2, 3],
+    }
+)
+_SHEET = "xl/worksheets/sheet1.xml"
+
+
+def _write_offset_template(path: Path) -> None:
+    workbook = xlsxwriter.Workbook(str(path))
+    worksheet = workbook.add_worksheet("Data")
+    worksheet.add_table(
+        "C5:F6",
+        {
+            "name": "DataSource",
+            "columns": [{"header": name} for name in _DF.columns],
+            "data": [["x", "y", 1, 2]],
+        },
+    )
+    workbook.close()
+
+
+def _read_part(path: Path, name: str) -> bytes:
+    with zipfile.ZipFile(path) as archive:
+        return archive.read(name)
+
+
+def test_encoded_frame_matches_apply_dataframe(
+    template_path: Path, tmp_path: Path
+) -> None:
+    encoded = encode_frame(_DF)
+    outputs = {}
+    for name in ("dataframe", "encoded"):
+        pivoteer = Pivoteer(template_path, engine="splice")
+        if name == "dataframe":
+            pivoteer.apply_dataframe("DataSource", _DF)
+        else:
+            pivoteer.apply_encoded("DataSource", encoded)
+        outputs[name] = pivoteer.save(tmp_path / f"{name}.xlsx")
+
+    for part in (_SHEET, "xl/tables/table1.xml"):
+        assert _read_part(outputs["dataframe"], part) == _read_part(
+            outputs["encoded"], part
+        )
+
+
+def test_one_encoding_fans_out_to_different_anchors(
+    template_path: Path, tmp_path: Path
+) -> None:
+    offset_template = tmp_path / "offset.xlsx"
+    _write_offset_template(offset_template)
+    encoded = encode_frame(_DF)
+
+    for index, template in enumerate((template_path, offset_template)):
+        pivoteer = Pivoteer(template)
+        pivoteer.apply_encoded("DataSource", encoded, match="name")
+        output = pivoteer.save(tmp_path / f"out{index}.xlsx")
+
+        frame = read_table(output, "DataSource")
+        assert frame["Region"].tolist() == ["North", "South", "East"]
+        assert frame["Amount"].tolist() == [1.5, 2.0, 3.25]
+
+    sheet = _read_part(tmp_path / "out1.xlsx", _SHEET)
+    assert b'<row r="6" spans="3:6"><c r="C6" t="inlineStr">' in sheet
+    assert b'<c r="F8"><v>3</v></c>' in sheet
+
+
+def test_encoded_frame_fills_calculated_columns(tmp_path: Path) -> None:
+    template = tmp_path / "calculated.xlsx"
+    write_calculated_workbook(template)
+    encoded = encode_frame(pd.DataFrame({"Name": ["a", "b"], "Amount": [1, 2]}))
+
+    pivoteer = Pivoteer(template)
+    pivoteer.apply_encoded("Sales", encoded)
+    output = pivoteer.save(tmp_path / "out.xlsx")
+
+    cells = formula_cells(output)
+    assert cells["C2"]["ref"] == "C2:C3"
+    assert set(cells) == {"C2", "C3"}
+
+
+def test_empty_encoded_frame_raises(template_path: Path) -> None:
+    encoded = encode_frame(_DF.iloc[:0])
+    assert encoded.row_count == 0
+    with pytest.raises(InvalidDataError, match="requires data"):
+        Pivoteer(template_path).apply_encoded("DataSource", encoded)
@@ -0,0 +1,182 @@
+"""Tests for engine="auto" and its memory-budgeted engine choice."""
+
+from __future__ import annotations
+
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import xlsxwriter
+
+from pivoteer.core import Pivoteer
+from pivoteer.engine_selection import (
+    choose_engine,
+    dom_fallback,
+    estimate_splice_bytes,
+)
+from pivoteer.exceptions import XmlStructureError
+from pivoteer.table_reader import read_table
+from tests.pivot_fixtures import replace_in_part, write_pivot_workbook
+
+_SHEET = "xl/worksheets/sheet1.xml"
+
+
+def test_frames_are_spliced_serially_unless_workers_are_given() -> None:
+    for rows in (1_000, 5_000_000):
+        choice = choose_engine(rows, 4, 10_000)
+        assert (choice.engine, choice.workers) == ("splice", None)
+        assert choice.estimated_bytes == estimate_splice_bytes(rows, 4, 10_000)
+
+
+def test_given_process_count_is_capped_by_budget() -> None:
+    rows = 1_000_000
+    assert choose_engine(rows, 4, 0, workers=8).workers == 8
+
+    budget = estimate_splice_bytes(rows, 4, 0, workers=3)
+    assert choose_engine(rows, 4, 0, memory_budget=budget, workers=8).workers == 3
+
+    lean = choose_engine(rows, 4, 0, memory_budget=1, workers=8)
+    assert lean.workers is None
+    assert "over the memory budget" in lean.reason
+
+
+def test_given_executor_is_kept() -> None:
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        choice = choose_engine(10, 4, 0, workers=pool)
+    assert (choice.engine, choice.workers) == ("splice", pool)
+
+
+def test_dom_fallback_respects_budget() -> None:
+    assert dom_fallback(10, 3, 1_000).engine == "dom"
+    assert dom_fallback(10, 3, 1_000, memory_budget=1_000) is None
+
+
+def test_auto_engine_splices_and_reports(template_path: Path, tmp_path: Path) -> None:
+    df = pd.DataFrame(
+        {"Category": ["A", "B"], "Region": ["N", "S"], "Amount": [1, 2], "Date": [3, 4]}
+    )
+    pivoteer = Pivoteer(template_path, engine="auto")
+    pivoteer.apply_dataframe("DataSource", df)
+    output = pivoteer.save(tmp_path / "auto.xlsx")
+
+    assert pivoteer.engine_choices["DataSource"].engine == "splice"
+    assert read_table(output, "DataSource")["Amount"].tolist() == [1, 2]
+
+
+def _template_with_side_cell(tmp_path: Path) -> Path:
+    """A table whose first data row has a cell right of the table."""
+    source = tmp_path / "source.xlsx"
+    write_pivot_workbook(source, [])
+    template = tmp_path / "side_cell.xlsx"
+    with (
+        zipfile.ZipFile(source) as src,
+        zipfile.ZipFile(template, "w", zipfile.ZIP_DEFLATED) as dest,
+    ):
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename == _SHEET:
+                data = data.replace(
+                    b"<v>1</v></c></row>", b'<v>1</v></c><c r="E2"><v>7</v></c></row>'
+                )
+            dest.writestr(info, data)
+    return template
+
+
+def test_auto_engine_falls_back_to_dom(tmp_path: Path) -> None:
+    template = _template_with_side_cell(tmp_path)
+    df = pd.DataFrame({"Category": ["A", "B"], "Region": ["N", "S"], "Amount": [5, 6]})
+    pivoteer = Pivoteer(template, engine="auto")
+    pivoteer.apply_dataframe("DataSource", df)
+    output = pivoteer.save(tmp_path / "fallback.xlsx")
+
+    assert pivoteer.engine_choices["DataSource"].engine == "dom"
+    with zipfile.ZipFile(output) as archive:
+        assert b'<c r="E2"><v>7</v></c>' in archive.read(_SHEET)
+
+
+def test_auto_engine_refuses_dom_over_budget(tmp_path: Path) -> None:
+    template = _template_with_side_cell(tmp_path)
+    df = pd.DataFrame({"Category": ["A"], "Region": ["N"], "Amount": [5]})
+    pivoteer = Pivoteer(template, engine="auto", memory_budget=1_000)
+    with pytest.raises(XmlStructureError, match="exceed the memory budget"):
+        pivoteer.apply_dataframe("DataSource", df)
+
+
+def _side_by_side_tables(path: Path) -> Path:
+    """Two tables whose data rows share the same worksheet rows."""
+    workbook = xlsxwriter.Workbook(str(path))
+    worksheet = workbook.add_worksheet("Data")
+    for name, ref in (("TabA", "A1:B3"), ("TabB", "D1:E3")):
+        worksheet.add_table(
+            ref,
+            {
+                "name": name,
+                "columns": [{"header": f"{name}Key"}, {"header": f"{name}Value"}],
+                "data": [["old", 0], ["old", 0]],
+            },
+        )
+    workbook.close()
+    return path
+
+
+def test_second_dom_fallback_keeps_first_tables_rows(tmp_path: Path) -> None:
+    template = _side_by_side_tables(tmp_path / "two_tables.xlsx")
+    pivoteer = Pivoteer(template, engine="auto")
+    pivoteer.apply_dataframe(
+        "TabA", pd.DataFrame({"TabAKey": ["a", "b"], "TabAValue": [1, 2]})
+    )
+    pivoteer.apply_dataframe(
+        "TabB", pd.DataFrame({"TabBKey": ["c", "d"], "TabBValue": [3, 4]})
+    )
+    output = pivoteer.save(tmp_path / "out.xlsx")
+
+    choices = pivoteer.engine_choices
+    assert (choices["TabA"].engine, choices["TabB"].engine) == ("dom", "dom")
+    assert read_table(output, "TabA")["TabAValue"].tolist() == [1, 2]
+    assert read_table(output, "TabB")["TabBValue"].tolist() == [3, 4]
+
+
+@pytest.mark.parametrize(
+    ("old", "new"),
+    [
+        (b'<c r="A2" t', b'<c r="A2" s="1" t'),
+        (b'<row r="3"', b'<row r="3" ht="30" customHeight="1"'),
+        (b'<c r="C3"', b'<c r="C3" cm="1"'),
+    ],
+)
+def test_auto_engine_keeps_formatting_splicing_would_drop(
+    tmp_path: Path, old: bytes, new: bytes
+) -> None:
+    source = tmp_path / "source.xlsx"
+    write_pivot_workbook(source, [])
+    template = replace_in_part(source, tmp_path / "styled.xlsx", _SHEET, old, new)
+    df = pd.DataFrame({"Category": ["A", "B"], "Region": ["N", "S"], "Amount": [5, 6]})
+    pivoteer = Pivoteer(template, engine="auto")
+    pivoteer.apply_dataframe("DataSource", df)
+    output = pivoteer.save(tmp_path / "out.xlsx")
+
+    assert pivoteer.engine_choices["DataSource"].engine == "dom"
+    assert "formatting" in pivoteer.engine_choices["DataSource"].reason
+    with zipfile.ZipFile(output) as archive:
+        assert new in archive.read(_SHEET)
+
+
+def test_auto_engine_splices_uniformly_styled_rows(tmp_path: Path) -> None:
+    source = tmp_path / "source.xlsx"
+    write_pivot_workbook(source, [])
+    styled = replace_in_part(
+        source, tmp_path / "styled2.xlsx", _SHEET, b'<c r="C2">', b'<c r="C2" s="2">'
+    )
+    template = replace_in_part(
+        styled, tmp_path / "styled.xlsx", _SHEET, b'<c r="C3">', b'<c r="C3" s="2">'
+    )
+    df = pd.DataFrame({"Category": ["A"] * 3, "Region": ["N"] * 3, "Amount": [5, 6, 7]})
+    pivoteer = Pivoteer(template, engine="auto")
+    pivoteer.apply_dataframe("DataSource", df)
+    output = pivoteer.save(tmp_path / "out.xlsx")
+
+    assert pivoteer.engine_choices["DataSource"].engine == "splice"
+    with zipfile.ZipFile(output) as archive:
+        assert archive.read(_SHEET).count(b' s="2"') == 3
@@ -0,0 +1,43 @@
+"""Import-cost checks: metadata-only use must not load pandas."""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_ROOT = Path(__file__).resolve().parents[1] / "src"
+# Generous enough for slow CI runners; importing pandas alone costs about this.
+IMPORT_BUDGET_SECONDS = 0.5
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import pivoteer.core
+elapsed = time.perf_counter() - start
+from pivoteer.xml_engine import XmlEngine
+XmlEngine(__import__("pathlib").Path(sys.argv[1])).build_workbook_map()
+print(json.dumps({"elapsed": elapsed, "pandas": "pandas" in sys.modules}))
+"""
+
+
+def _probe(template_path: Path) -> dict[str, object]:
+    env = {**os.environ, "PYTHONPATH": str(SRC_ROOT)}
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE, str(template_path)],
+        capture_output=True,
+        check=True,
+        env=env,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def test_metadata_use_does_not_import_pandas(template_path: Path) -> None:
+    assert _probe(template_path)["pandas"] is False
+
+
+def test_import_time_budget(template_path: Path) -> None:
+    assert _probe(template_path)["elapsed"] < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,68 @@
+"""Tests for the read-only template introspection API."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+from typing import IO
+
+from pivoteer.introspection import inspect
+from pivoteer.models import TableInfo
+from pivoteer.part_store import ZipPartStore
+from tests.pivot_fixtures import (
+    TABLE_COLUMNS,
+    CacheSpec,
+    cache_path,
+    write_pivot_workbook,
+)
+
+
+class _SheetGuardStore(ZipPartStore):
+    """Fails the test if any worksheet body is read."""
+
+    def _read(self, info: zipfile.ZipInfo) -> bytes:
+        assert not info.filename.startswith("xl/worksheets/sheet"), info.filename
+        return super()._read(info)
+
+    def _open(self, info: zipfile.ZipInfo) -> IO[bytes]:
+        assert not info.filename.startswith("xl/worksheets/sheet"), info.filename
+        return super()._open(info)
+
+
+def test_inspect_reports_tables_and_dependents(tmp_path: Path) -> None:
+    fixture = tmp_path / "pivots.xlsx"
+    write_pivot_workbook(
+        fixture,
+        [
+            CacheSpec(("table", "DataSource"), pivot_tables=2),
+            CacheSpec(("range", "Data", "$B$2:$C$9")),
+            CacheSpec(("external",)),
+        ],
+    )
+
+    with _SheetGuardStore(fixture) as store:
+        info = inspect(store)
+
+    assert info.sheet_names == ("Data", "Pivot")
+    assert info.tables == {
+        "DataSource": TableInfo(
+            name="DataSource",
+            sheet_name="Data",
+            ref="A1:C3",
+            columns=TABLE_COLUMNS,
+            pivot_cache_paths=(cache_path(1), cache_path(2)),
+            pivot_table_paths=(
+                "xl/pivotTables/pivotTable1.xml",
+                "xl/pivotTables/pivotTable2.xml",
+                "xl/pivotTables/pivotTable3.xml",
+            ),
+        )
+    }
+    assert set(info.pivot_caches) == {cache_path(i) for i in (1, 2, 3)}
+
+
+def test_inspect_accepts_path(template_path: Path) -> None:
+    info = inspect(str(template_path))
+    table = info.tables["DataSource"]
+    assert table.columns == ("Category", "Region", "Amount", "Date")
+    assert info.template_path == template_path
@@ -0,0 +1,119 @@
+"""Tests for block-parallel row encoding in the splice engine."""
+
+from __future__ import annotations
+
+import zipfile
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pivoteer import row_encoder
+from pivoteer.core import Pivoteer
+from pivoteer.row_encoder import (
+    build_row_block,
+    encode_row_blocks,
+    encode_series,
+    encode_shared_formula,
+)
+
+_VALUES = [
+    ["a", None, "c<d", "e", "f", "g", "h"],
+    [1, 2, 3, 4, 5, 6, 7],
+    [0.5, float("nan"), 2.25, 3.0, 4.5, 5.0, 6.75],
+]
+_DTYPES = [np.dtype(object), np.dtype("int64"), np.dtype("float64")]
+
+
+class _CountingExecutor(ThreadPoolExecutor):
+    """A thread pool that counts the blocks submitted to it."""
+
+    def __init__(self, max_workers: int) -> None:
+        super().__init__(max_workers=max_workers)
+        self.submitted = 0
+
+    def submit(self, fn: Callable[..., bytes], /, *args: object) -> Future[bytes]:
+        self.submitted += 1
+        return super().submit(fn, *args)
+
+
+def _serial() -> bytes:
+    encoded = [
+        encode_series(values, dtype)
+        for values, dtype in zip(_VALUES, _DTYPES, strict=True)
+    ]
+    return build_row_block(encoded, 2, 1)
+
+
+@pytest.mark.parametrize("block_rows", [1, 2, 3, 7, 100])
+def test_blocks_match_single_block(block_rows: int) -> None:
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        block = encode_row_blocks(
+            _VALUES, _DTYPES, 2, 1, workers=pool, block_rows=block_rows
+        )
+    assert block == _serial()
+
+
+def test_process_pool_matches_serial() -> None:
+    block = encode_row_blocks(_VALUES, _DTYPES, 2, 1, workers=2, block_rows=3)
+    assert block == _serial()
+
+
+def test_fixed_columns_split_across_blocks() -> None:
+    formula = encode_shared_formula("[@B]*2", "B2:B8", 0, 7)
+    expected = build_row_block(
+        [
+            encode_series(_VALUES[0], _DTYPES[0]),
+            formula,
+            encode_series(_VALUES[1], _DTYPES[1]),
+        ],
+        2,
+        1,
+    )
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        block = encode_row_blocks(
+            _VALUES[:2],
+            _DTYPES[:2],
+            2,
+            1,
+            fixed={1: formula},
+            workers=pool,
+            block_rows=2,
+        )
+    assert block == expected
+
+
+def test_empty_columns_encode_nothing() -> None:
+    assert encode_row_blocks([[]], [np.dtype(object)], 2, 1, workers=2) == b""
+
+
+def test_parallel_save_matches_serial(
+    template_path: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Small blocks, so that 50 rows are encoded as several parallel blocks.
+    monkeypatch.setattr(row_encoder, "DEFAULT_BLOCK_ROWS", 8)
+    df = pd.DataFrame(
+        {
+            "Category": [f"c{i}" for i in range(50)],
+            "Region": ["North", "South"] * 25,
+            "Amount": np.arange(50, dtype=float),
+            "Date": ["2024-01-01"] * 50,
+        }
+    )
+    outputs = {}
+    with _CountingExecutor(max_workers=4) as pool:
+        for name, workers in (("serial", None), ("parallel", pool)):
+            pivoteer = Pivoteer(template_path, engine="splice", workers=workers)
+            pivoteer.apply_dataframe("DataSource", df)
+            outputs[name] = pivoteer.save(tmp_path / f"{name}.xlsx")
+    assert pool.submitted == 7
+
+    with (
+        zipfile.ZipFile(outputs["serial"]) as serial,
+        zipfile.ZipFile(outputs["parallel"]) as parallel,
+    ):
+        for name in serial.namelist():
+            assert serial.read(name) == parallel.read(name)
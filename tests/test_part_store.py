@@ -0,0 +1,125 @@
+"""Unit tests for part store backends and the ZIP sink."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from pivoteer.core import Pivoteer
+from pivoteer.exceptions import TemplateNotFoundError
+from pivoteer.part_store import (
+    BytesPartStore,
+    DirectoryPartStore,
+    PartStore,
+    ZipPartSink,
+    ZipPartStore,
+)
+from pivoteer.template_source import MappedTemplate
+
+_DF = pd.DataFrame(
+    {
+        "Category": ["Hardware", "Software"],
+        "Region": ["North", "South"],
+        "Amount": [1.0, 2.0],
+        "Date": ["2024-01-01", "2024-01-02"],
+    }
+)
+
+
+def _unpack(template_path: Path, root: Path) -> Path:
+    with zipfile.ZipFile(template_path) as archive:
+        archive.extractall(root)
+    return root
+
+
+def _stores(template_path: Path, tmp_path: Path) -> dict[str, PartStore]:
+    return {
+        "zip": ZipPartStore(template_path),
+        "bytes": BytesPartStore.from_zip_bytes(template_path.read_bytes()),
+        "mmap": MappedTemplate(template_path),
+        "directory": DirectoryPartStore(_unpack(template_path, tmp_path / "unpacked")),
+    }
+
+
+def test_backends_read_same_parts(template_path: Path, tmp_path: Path) -> None:
+    with zipfile.ZipFile(template_path) as archive:
+        expected = {name: archive.read(name) for name in archive.namelist()}
+
+    for kind, store in _stores(template_path, tmp_path).items():
+        with store:
+            assert sorted(store.namelist()) == sorted(expected), kind
+            for name, data in expected.items():
+                assert store.read(name) == data, (kind, name)
+                assert store.getinfo(name).file_size == len(data)
+                with store.open(name) as stream:
+                    assert stream.read() == data
+            assert store.stats.parts_read == 2 * len(expected)
+            assert store.stats.bytes_read == 2 * sum(map(len, expected.values()))
+
+
+def test_streams_count_only_the_bytes_read(template_path: Path, tmp_path: Path) -> None:
+    for kind, store in _stores(template_path, tmp_path).items():
+        with store:
+            with store.open("xl/worksheets/sheet1.xml") as stream:
+                assert len(stream.read(10)) == 10
+            assert (store.stats.parts_read, store.stats.bytes_read) == (1, 10), kind
+
+
+def test_store_without_read_cannot_be_built(tmp_path: Path) -> None:
+    with pytest.raises(TypeError):
+        PartStore(tmp_path, [])  # type: ignore[abstract]
+
+
+def test_directory_store_lists_content_types_first(
+    template_path: Path, tmp_path: Path
+) -> None:
+    store = DirectoryPartStore(_unpack(template_path, tmp_path / "unpacked"))
+    assert store.namelist()[0] == "[Content_Types].xml"
+
+
+def test_missing_sources_raise(tmp_path: Path) -> None:
+    with pytest.raises(TemplateNotFoundError):
+        ZipPartStore(tmp_path / "missing.xlsx")
+    with pytest.raises(TemplateNotFoundError):
+        DirectoryPartStore(tmp_path / "missing")
+
+
+def test_pivoteer_output_matches_for_every_backend(
+    template_path: Path, tmp_path: Path
+) -> None:
+    plain = Pivoteer(template_path)
+    plain.apply_dataframe("DataSource", _DF)
+    with zipfile.ZipFile(plain.save(tmp_path / "plain.xlsx")) as archive:
+        expected = {name: archive.read(name) for name in archive.namelist()}
+
+    for kind, store in _stores(template_path, tmp_path).items():
+        with store:
+            pivoteer = Pivoteer(store)
+            pivoteer.apply_dataframe("DataSource", _DF)
+            output = pivoteer.save(tmp_path / f"{kind}.xlsx")
+        with zipfile.ZipFile(output) as archive:
+            actual = {name: archive.read(name) for name in archive.namelist()}
+        assert actual == expected, kind
+
+
+def test_sink_creates_file_on_first_write(tmp_path: Path) -> None:
+    output = tmp_path / "out.zip"
+    with ZipPartSink(output) as sink:
+        assert not output.exists()
+        sink.write("a.xml", b"<a/>")
+        sink.write(zipfile.ZipInfo("b.xml"), b"<b/>")
+    with zipfile.ZipFile(output) as archive:
+        assert archive.read("a.xml") == b"<a/>"
+        assert archive.read("b.xml") == b"<b/>"
+    assert (sink.stats.parts_written, sink.stats.bytes_written) == (2, 8)
+
+
+def test_sink_discards_partial_output(tmp_path: Path) -> None:
+    output = tmp_path / "out.zip"
+    with pytest.raises(RuntimeError), ZipPartSink(output) as sink:
+        sink.write("a.xml", b"<a/>")
+        raise RuntimeError("boom")
+    assert not output.exists()
@@ -0,0 +1,78 @@
+"""Tests for dropping stale pivot cache records on save."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+from lxml import etree
+
+from pivoteer.core import Pivoteer
+from tests.pivot_fixtures import (
+    NS_REL,
+    CacheSpec,
+    cache_path,
+    records_path,
+    write_pivot_workbook,
+)
+
+_DF = pd.DataFrame(
+    {"Category": ["Hardware"], "Region": ["North"], "Amount": [3.0]},
+)
+
+
+def _save(tmp_path: Path, caches: list[CacheSpec], **options: bool) -> Path:
+    template = tmp_path / "pivots.xlsx"
+    write_pivot_workbook(template, caches)
+    pivoteer = Pivoteer(template, **options)
+    pivoteer.apply_dataframe("DataSource", _DF)
+    return pivoteer.save(tmp_path / "out.xlsx")
+
+
+def test_records_dropped_for_refreshed_caches(tmp_path: Path) -> None:
+    output = _save(
+        tmp_path,
+        [CacheSpec(("table", "DataSource")), CacheSpec(("external",))],
+        drop_pivot_records=True,
+    )
+
+    with zipfile.ZipFile(output) as archive:
+        names = archive.namelist()
+        definition = etree.fromstring(archive.read(cache_path(1)))
+        content_types = archive.read("[Content_Types].xml").decode()
+
+    assert records_path(1) not in names
+    assert "xl/pivotCache/_rels/pivotCacheDefinition1.xml.rels" not in names
+    assert f"/{records_path(1)}" not in content_types
+    assert definition.get(f"{{{NS_REL}}}id") is None
+    assert definition.get("refreshOnLoad") == "1"
+    assert definition.get("saveData") == "0"
+    assert definition.get("recordCount") == "0"
+
+    # The external cache does not refresh from the table and keeps its records.
+    assert records_path(2) in names
+    assert f"/{records_path(2)}" in content_types
+
+
+def test_records_kept_by_default(tmp_path: Path) -> None:
+    output = _save(tmp_path, [CacheSpec(("table", "DataSource"))])
+
+    with zipfile.ZipFile(output) as archive:
+        assert records_path(1) in archive.namelist()
+        definition = etree.fromstring(archive.read(cache_path(1)))
+    assert definition.get(f"{{{NS_REL}}}id") == "rId1"
+    assert definition.get("saveData") is None
+
+
+def test_cache_without_records_is_untouched(tmp_path: Path) -> None:
+    output = _save(
+        tmp_path,
+        [CacheSpec(("table", "DataSource"), records=False)],
+        drop_pivot_records=True,
+    )
+
+    with zipfile.ZipFile(output) as archive:
+        definition = etree.fromstring(archive.read(cache_path(1)))
+    assert definition.get("refreshOnLoad") == "1"
+    assert definition.get("saveData") is None
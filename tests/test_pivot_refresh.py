@@ -0,0 +1,63 @@
+"""Tests for selecting which pivot caches refresh on load."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from lxml import etree
+
+from pivoteer.core import Pivoteer
+from tests.pivot_fixtures import CacheSpec, cache_path, write_pivot_workbook
+
+_CACHES = [
+    CacheSpec(("table", "DataSource")),
+    CacheSpec(("range", "Data", "$A$1:$B$2")),
+    CacheSpec(("range", "Data", "E10:F12")),
+    CacheSpec(("external",)),
+    CacheSpec(("name", "SalesRange")),
+    CacheSpec(("name", "OtherRange")),
+    CacheSpec(("name", "Unresolved")),
+]
+_DEFINED_NAMES = {"SalesRange": "Data!$A$1:$C$3", "OtherRange": "'Data'!$H$1:$J$9"}
+
+
+def _refresh_flags(path: Path) -> list[str | None]:
+    with zipfile.ZipFile(path, "r") as archive:
+        return [
+            etree.fromstring(archive.read(cache_path(index))).get("refreshOnLoad")
+            for index in range(1, len(_CACHES) + 1)
+        ]
+
+
+@pytest.fixture()
+def pivot_template(tmp_path: Path) -> Path:
+    template = tmp_path / "pivots.xlsx"
+    write_pivot_workbook(template, _CACHES, _DEFINED_NAMES)
+    return template
+
+
+def _render(template: Path, output: Path, **options: bool) -> Path:
+    df = pd.DataFrame({"Category": ["A"], "Region": ["B"], "Amount": [1.0]})
+    pivoteer = Pivoteer(template, **options)
+    pivoteer.apply_dataframe("DataSource", df)
+    return pivoteer.save(output)
+
+
+def test_only_dependent_caches_refresh(pivot_template: Path, tmp_path: Path) -> None:
+    output = _render(pivot_template, tmp_path / "out.xlsx")
+    assert _refresh_flags(output) == ["1", "1", None, None, "1", None, "1"]
+
+
+def test_refresh_all_pivots_override(pivot_template: Path, tmp_path: Path) -> None:
+    output = _render(pivot_template, tmp_path / "out.xlsx", refresh_all_pivots=True)
+    assert _refresh_flags(output) == ["1"] * len(_CACHES)
+
+
+def test_no_updates_leave_caches_untouched(
+    pivot_template: Path, tmp_path: Path
+) -> None:
+    output = Pivoteer(pivot_template).save(tmp_path / "out.xlsx")
+    assert _refresh_flags(output) == [None] * len(_CACHES)
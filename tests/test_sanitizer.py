@@ -0,0 +1,110 @@
+"""Tests for sanitizing strings that XML or Excel cannot store."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from lxml import etree
+
+from pivoteer.core import Pivoteer
+from pivoteer.exceptions import InvalidDataError
+from pivoteer.sanitizer import SanitizePolicy, sanitize_frame
+from pivoteer.table_reader import read_table
+
+_DF = pd.DataFrame(
+    {
+        "Category": ["Hard\x01ware", "Software", None],
+        "Region": pd.Categorical(["North\x0b", "South", "North\x0b"]),
+        "Amount": [1, 2, 3],
+        "Date": ["ok", 5, "x" * 40],
+    }
+)
+
+
+def test_escape_and_truncate_report_cell_counts() -> None:
+    cleaned, report = sanitize_frame(_DF, SanitizePolicy(max_length=20))
+
+    assert cleaned["Category"].tolist()[:2] == ["Hard_x0001_ware", "Software"]
+    assert cleaned["Region"].tolist() == ["North_x000B_", "South", "North_x000B_"]
+    assert cleaned["Date"].tolist() == ["ok", 5, "x" * 20]
+    pd.testing.assert_series_equal(cleaned["Amount"], _DF["Amount"])
+    assert dict(report.illegal_chars) == {"Category": 1, "Region": 2}
+    assert dict(report.truncated) == {"Date": 1}
+    assert (report.illegal_char_cells, report.truncated_cells) == (3, 1)
+
+
+def test_truncation_never_cuts_an_escape() -> None:
+    df = pd.DataFrame({"a": ["x\x01", "ab\x01cd"]})
+    cleaned, report = sanitize_frame(df, SanitizePolicy(max_length=3))
+    assert cleaned["a"].tolist() == ["x_x0001_", "ab_x0001_"]
+    assert dict(report.truncated) == {"a": 1}
+
+
+def test_literal_escapes_are_protected() -> None:
+    df = pd.DataFrame(
+        {
+            "a": ["_x0041_ and _X0041_", "_x00e9_\x02", "plain"],
+            "b": pd.Categorical(["_x0041_", "plain", "_x0041_"]),
+        }
+    )
+    cleaned, report = sanitize_frame(df)
+    assert cleaned["a"].tolist() == [
+        "_x005F_x0041_ and _X0041_",
+        "_x005F_x00e9__x0002_",
+        "plain",
+    ]
+    assert cleaned["b"].tolist() == ["_x005F_x0041_", "plain", "_x005F_x0041_"]
+    assert dict(report.illegal_chars) == {"a": 1}
+
+
+def test_clean_frame_is_returned_as_is() -> None:
+    df = pd.DataFrame({"a": ["x", "y"], "b": [1.0, 2.0]})
+    cleaned, report = sanitize_frame(df)
+    assert cleaned is df
+    assert not report.illegal_chars and not report.truncated
+
+
+def test_strip_policy_removes_illegal_characters() -> None:
+    cleaned, _ = sanitize_frame(_DF, SanitizePolicy(illegal_chars="strip"))
+    assert cleaned["Category"].tolist()[0] == "Hardware"
+    assert cleaned["Region"].tolist() == ["North", "South", "North"]
+
+
+@pytest.mark.parametrize(
+    ("policy", "message"),
+    [
+        (SanitizePolicy(illegal_chars="raise"), "'Category' has 1 cell"),
+        (SanitizePolicy(overlong="raise", max_length=10), "longer than 10"),
+    ],
+)
+def test_raise_policies(policy: SanitizePolicy, message: str) -> None:
+    with pytest.raises(InvalidDataError, match=message):
+        sanitize_frame(_DF, policy)
+
+
+def test_unknown_action_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Unknown illegal_chars"):
+        SanitizePolicy(illegal_chars="drop")
+
+
+@pytest.mark.parametrize("engine", ["dom", "splice"])
+def test_pivoteer_writes_well_formed_sheets(
+    template_path: Path, tmp_path: Path, engine: str
+) -> None:
+    pivoteer = Pivoteer(template_path, engine=engine)
+    pivoteer.apply_dataframe("DataSource", _DF)
+    output = pivoteer.save(tmp_path / f"{engine}.xlsx")
+
+    with zipfile.ZipFile(output) as archive:
+        etree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+    assert read_table(output, "DataSource")["Category"].tolist()[0] == "Hard\x01ware"
+    assert pivoteer.sanitize_reports["DataSource"].illegal_char_cells == 3
+
+
+def test_pivoteer_raise_policy_fails_before_writing(template_path: Path) -> None:
+    pivoteer = Pivoteer(template_path, sanitize=SanitizePolicy(illegal_chars="raise"))
+    with pytest.raises(InvalidDataError, match="Table 'DataSource' column"):
+        pivoteer.apply_dataframe("DataSource", _DF)
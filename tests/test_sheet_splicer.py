@@ -0,0 +1,265 @@
+"""Unit tests for byte-level worksheet splicing and row encoding."""
+
+from __future__ import annotations
+
+import zipfile
+from math import nan
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from lxml import etree
+
+from pivoteer.core import Pivoteer
+from pivoteer.exceptions import XmlStructureError
+from pivoteer.row_encoder import build_row_block, encode_cell, encode_rows
+from pivoteer.sheet_splicer import (
+    first_row_styles,
+    formatting_lost_by_splice,
+    patch_row_cells,
+    splice_worksheet,
+    split_worksheet,
+)
+from tests.pivot_fixtures import replace_in_part, write_pivot_workbook
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NSMAP = {"main": _NS_MAIN}
+
+
+def _sheet(rows: str) -> bytes:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<worksheet xmlns="{_NS_MAIN}"><dimension ref="A1:B4"/>'
+        f"<sheetData>{rows}</sheetData>"
+        '<tableParts count="1"><tablePart r:id="rId1" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"/>'
+        "</tableParts></worksheet>"
+    ).encode()
+
+
+_HEADER = '<row r="1"><c r="A1" t="inlineStr"><is><t>H</t></is></c></row>'
+_DATA = '<row r="2"><c r="A2"><v>1</v></c></row><row r="3"><c r="A3"><v>2</v></c></row>'
+_FOOTER = '<row r="6"><c r="A6"><v>9</v></c></row>'
+
+
+class TestSplitWorksheet:
+    def test_segments_round_trip(self) -> None:
+        xml = _sheet(_HEADER + _DATA + _FOOTER)
+        segments = split_worksheet(xml, 2, 3)
+        assert segments.before == _HEADER.encode()
+        assert segments.block == _DATA.encode()
+        assert segments.after == _FOOTER.encode()
+        assert splice_worksheet(segments, segments.block) == xml
+
+    def test_block_without_existing_rows(self) -> None:
+        xml = _sheet(_HEADER + _FOOTER)
+        segments = split_worksheet(xml, 2, 3)
+        assert segments.before == _HEADER.encode()
+        assert segments.block == b""
+        assert segments.after == _FOOTER.encode()
+
+    def test_empty_sheet_data(self) -> None:
+        xml = f'<worksheet xmlns="{_NS_MAIN}"><sheetData/></worksheet>'.encode()
+        segments = split_worksheet(xml, 2, 2)
+        spliced = splice_worksheet(segments, b'<row r="2"/>')
+        assert spliced.endswith(b'<sheetData><row r="2"/></sheetData></worksheet>')
+
+    def test_cells_beside_table_raise(self) -> None:
+        row = '<row r="2"><c r="A2"><v>1</v></c><c r="F2"><v>2</v></c></row>'
+        xml = _sheet(_HEADER + row)
+        with pytest.raises(XmlStructureError, match="outside the table"):
+            split_worksheet(xml, 2, 2, first_col=1, last_col=2)
+
+    def test_missing_sheet_data_raises(self) -> None:
+        with pytest.raises(XmlStructureError):
+            split_worksheet(b"<worksheet/>", 2, 3)
+
+    def test_unsorted_rows_raise(self) -> None:
+        reversed_rows = '<row r="3"><c r="A3"><v>2</v></c></row><row r="2"><c r="A2"><v>1</v></c></row>'
+        xml = _sheet(_HEADER + reversed_rows)
+        with pytest.raises(XmlStructureError, match="ascending"):
+            split_worksheet(xml, 2, 3)
+
+
+class TestRowEncoder:
+    def test_encode_cell_types(self) -> None:
+        assert encode_cell(None) == b"/>"
+        assert encode_cell(nan) == b"/>"
+        assert encode_cell(pd.NaT) == b"/>"
+        assert encode_cell(42) == b"><v>42</v></c>"
+        assert encode_cell(3.5) == b"><v>3.5</v></c>"
+        assert encode_cell("a<b") == b' t="inlineStr"><is><t>a&lt;b</t></is></c>'
+
+    def test_build_row_block(self) -> None:
+        block = build_row_block(encode_rows([[1, "x"], [None, 2]]), 5, 2)
+        assert block == (
+            b'<row r="5" spans="2:3"><c r="B5"><v>1</v></c>'
+            b'<c r="C5" t="inlineStr"><is><t>x</t></is></c></row>'
+            b'<row r="6" spans="2:3"><c r="B6"/><c r="C6"><v>2</v></c></row>'
+        )
+
+    def test_build_row_block_with_styles(self) -> None:
+        columns = encode_rows([[1, "x"], [None, 2]])
+        block = build_row_block(columns, 5, 2, styles={0: b' s="4"'})
+        assert block == (
+            b'<row r="5" spans="2:3"><c r="B5" s="4"><v>1</v></c>'
+            b'<c r="C5" t="inlineStr"><is><t>x</t></is></c></row>'
+            b'<row r="6" spans="2:3"><c r="B6"/><c r="C6"><v>2</v></c></row>'
+        )
+
+    def test_first_row_styles(self) -> None:
+        block = (
+            b'<row r="2"><c r="A2" s="3"><v>1</v></c><c r="B2"/><c s="5"/></row>'
+            b'<row r="3"><c r="A3" s="9"/></row>'
+        )
+        assert first_row_styles(block) == {1: b' s="3"', 3: b' s="5"'}
+        assert first_row_styles(b"") == {}
+
+
+def _sheet_cells(path: Path) -> dict[str, tuple[str | None, str | None]]:
+    with zipfile.ZipFile(path, "r") as archive:
+        root = etree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+    cells = {}
+    for cell in root.iterfind(".//main:sheetData/main:row/main:c", _NSMAP):
+        text = "".join(cell.itertext()) or None
+        cells[cell.get("r")] = (cell.get("t"), text)
+    return cells
+
+
+@pytest.mark.parametrize(
+    ("block", "lost"),
+    [
+        (
+            '<row r="2" spans="1:2"><c r="A2" s="1"/><c r="B2"><v>1</v></c></row>'
+            '<row r="3"><c r="A3" s="1"><v>2</v></c><c r="B3"/></row>',
+            None,
+        ),
+        ('<row r="2" ht="30"><c r="A2"/></row>', "row 2 sets ht"),
+        ('<row r="2"><c r="A2" vm="1"/></row>', "cell A2 sets vm"),
+        (
+            '<row r="2"><c r="A2" s="1"/></row><row r="3"><c r="A3"/></row>',
+            "cell A3 is styled unlike the first data row",
+        ),
+    ],
+)
+def test_formatting_lost_by_splice(block: str, lost: str | None) -> None:
+    assert formatting_lost_by_splice(block.encode()) == lost
+
+
+def test_patch_row_cells_replaces_and_inserts() -> None:
+    segment = (
+        b'<row r="2" ht="20"><c r="A2" s="3"><v>1</v></c><c t="s"><v>0</v></c>'
+        b'<c r="D2" s="4" t="inlineStr"><is><t>x</t></is></c></row>'
+        b'<row r="4"/><row r="5"><c r="B5"><v>7</v></c></row>'
+    )
+    patched = patch_row_cells(
+        segment,
+        2,
+        {
+            2: [encode_cell(5), encode_cell(6), encode_cell(None)],
+            4: [encode_cell(None), encode_cell("y"), encode_cell(8)],
+        },
+    )
+
+    assert patched == (
+        b'<row r="2" ht="20"><c r="A2" s="3"><v>1</v></c><c r="B2"><v>5</v></c>'
+        b'<c r="D2"/></row>'
+        b'<row r="3"><c r="B3"><v>6</v></c>'
+        b'<c r="D3" t="inlineStr"><is><t>y</t></is></c></row>'
+        b'<row r="4"><c r="B4"/><c r="D4"><v>8</v></c></row>'
+        b'<row r="5"><c r="B5"><v>7</v></c></row>'
+    )
+
+
+def test_patch_row_cells_numbers_compact_cells() -> None:
+    segment = b'<row r="2"><c s="1"><v>1</v></c><c><v>3</v></c></row>'
+    patched = patch_row_cells(segment, 2, {1: [encode_cell(9)]})
+    assert patched == (
+        b'<row r="2"><c r="A2" s="1"><v>9</v></c><c r="B2"><v>3</v></c></row>'
+    )
+
+
+def test_splice_engine_matches_dom_engine(template_path: Path, tmp_path: Path) -> None:
+    df = pd.DataFrame(
+        {
+            "Category": ["Hardware", "Software", None],
+            "Region": ["North", "South", "East"],
+            "Amount": [1.5, 2.0, nan],
+            "Date": ["2024-01-01", "2024-01-02", "2024-01-03"],
+        }
+    )
+    outputs = {}
+    for engine in ("dom", "splice"):
+        pivoteer = Pivoteer(template_path, engine=engine)
+        pivoteer.apply_dataframe("DataSource", df)
+        outputs[engine] = pivoteer.save(tmp_path / f"{engine}.xlsx")
+
+    dom_cells = _sheet_cells(outputs["dom"])
+    splice_cells = _sheet_cells(outputs["splice"])
+    # The DOM engine keeps stale template rows below a shrunken table.
+    assert {ref: dom_cells[ref] for ref in splice_cells} == splice_cells
+    assert "A5" not in splice_cells
+    assert splice_cells["A1"] == dom_cells["A1"]
+
+
+def test_unknown_engine_raises(template_path: Path) -> None:
+    with pytest.raises(ValueError, match="Unknown engine"):
+        Pivoteer(template_path, engine="fast")
+
+
+@pytest.mark.parametrize("option", [{"workers": 2}, {"compact": True}])
+def test_splice_options_rejected_with_dom_engine(
+    template_path: Path, option: dict[str, object]
+) -> None:
+    with pytest.raises(ValueError, match="apply to spliced rows"):
+        Pivoteer(template_path, engine="dom", **option)
+
+
+_PIVOT_SHEET = "xl/worksheets/sheet1.xml"
+_FRAME = pd.DataFrame(
+    {"Category": ["A", None, "C"], "Region": ["N", "S", "E"], "Amount": [1, 2, 3]}
+)
+
+
+def test_splice_keeps_first_data_row_cell_styles(tmp_path: Path) -> None:
+    source = tmp_path / "source.xlsx"
+    write_pivot_workbook(source, [])
+    template = replace_in_part(
+        source,
+        tmp_path / "styled.xlsx",
+        _PIVOT_SHEET,
+        b'<c r="A2" t="inlineStr">',
+        b'<c r="A2" s="2" t="inlineStr">',
+    )
+    pivoteer = Pivoteer(template, engine="splice")
+    pivoteer.apply_dataframe("DataSource", _FRAME)
+    output = pivoteer.save(tmp_path / "out.xlsx")
+
+    with zipfile.ZipFile(output) as archive:
+        root = etree.fromstring(archive.read(_PIVOT_SHEET))
+    styles = {
+        cell.get("r"): cell.get("s")
+        for cell in root.iterfind(".//main:sheetData/main:row/main:c", _NSMAP)
+    }
+    assert (styles["A2"], styles["A3"], styles["A4"]) == ("2", None, "2")
+    assert styles["B2"] is None
+
+
+def test_failed_splice_keeps_earlier_edits(tmp_path: Path) -> None:
+    source = tmp_path / "source.xlsx"
+    write_pivot_workbook(source, [])
+    template = replace_in_part(
+        source,
+        tmp_path / "side_cell.xlsx",
+        _PIVOT_SHEET,
+        b"<v>1</v></c></row>",
+        b'<v>1</v></c><c r="E2"><v>7</v></c></row>',
+    )
+    pivoteer = Pivoteer(template, engine="splice")
+    pivoteer.update_columns("DataSource", pd.DataFrame({"Amount": [10, 20]}))
+    with pytest.raises(XmlStructureError, match="outside the table"):
+        pivoteer.apply_dataframe("DataSource", _FRAME)
+    output = pivoteer.save(tmp_path / "out.xlsx")
+
+    cells = _sheet_cells(output)
+    assert (cells["C2"][1], cells["C3"][1]) == ("10", "20")
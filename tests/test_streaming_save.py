@@ -0,0 +1,107 @@
+"""Tests for writing spliced worksheets into the output ZIP as a stream."""
+
+from __future__ import annotations
+
+import tracemalloc
+import types
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pivoteer.core import Pivoteer
+from pivoteer.part_store import ZipPartSink
+from pivoteer.template_engine import TemplateEngine
+
+_DF = pd.DataFrame(
+    {
+        "Category": [f"c{i}" for i in range(20)],
+        "Region": ["North", "South"] * 10,
+        "Amount": [float(i) for i in range(20)],
+        "Date": ["2024-01-01"] * 20,
+    }
+)
+_SHEET = "xl/worksheets/sheet1.xml"
+
+
+def test_small_stream_written_like_a_single_part(tmp_path: Path) -> None:
+    outputs = []
+    for name in ("write", "stream"):
+        output = tmp_path / f"{name}.zip"
+        info = zipfile.ZipInfo("a.xml", date_time=(2024, 1, 1, 0, 0, 0))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with ZipPartSink(output) as sink:
+            if name == "write":
+                sink.write(info, b"<a>text</a>")
+            else:
+                sink.write_stream(info, [b"<a>", b"text", b"</a>"])
+        outputs.append(output.read_bytes())
+    assert outputs[0] == outputs[1]
+
+
+def test_large_stream_fed_in_chunks(tmp_path: Path) -> None:
+    output = tmp_path / "out.zip"
+    chunks = [b"<a>", *(b"<b>%d</b>" % index for index in range(1000)), b"</a>"]
+    with ZipPartSink(output) as sink:
+        sink.write_stream("a.xml", iter(chunks), buffer_size=64)
+        sink.write("b.xml", b"<b/>")
+    with zipfile.ZipFile(output) as archive:
+        assert archive.testzip() is None
+        assert archive.read("a.xml") == b"".join(chunks)
+    assert sink.stats.parts_written == 2
+    assert sink.stats.bytes_written == len(b"".join(chunks)) + 4
+
+
+def test_spliced_sheet_is_generated_lazily(template_path: Path) -> None:
+    engine = TemplateEngine(template_path, engine="splice")
+    engine.apply_dataframe("DataSource", _DF)
+
+    stream = engine.get_modified_streams()[_SHEET]
+    assert isinstance(stream, types.GeneratorType)
+    assert b"".join(stream) == engine.get_modified_parts()[_SHEET]
+
+
+def test_spliced_frame_is_not_copied_until_saved(template_path: Path) -> None:
+    rows = 200_000
+    df = pd.DataFrame(
+        {
+            "Category": np.arange(rows, dtype=float),
+            "Region": np.arange(rows, dtype=float),
+            "Amount": np.arange(rows, dtype=float),
+            "Date": np.arange(rows, dtype=float),
+        }
+    )
+    engine = TemplateEngine(template_path, engine="splice")
+    tracemalloc.start()
+    try:
+        engine.apply_dataframe("DataSource", df)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # As Python floats the four columns would take over 25 MB.
+    assert peak < 2 * 1024 * 1024
+
+
+def test_column_update_keeps_spliced_sheet_lazy(template_path: Path) -> None:
+    engine = TemplateEngine(template_path, engine="splice")
+    engine.apply_dataframe("DataSource", _DF)
+    engine.update_columns("DataSource", _DF.assign(Region="West")[["Region"]])
+
+    stream = engine.get_modified_streams()[_SHEET]
+    assert isinstance(stream, types.GeneratorType)
+    assert b"".join(stream).count(b"<t>West</t>") == 20
+
+
+def test_spliced_sheet_edited_again_before_save(
+    template_path: Path, tmp_path: Path
+) -> None:
+    pivoteer = Pivoteer(template_path, engine="splice")
+    pivoteer.apply_dataframe("DataSource", _DF)
+    pivoteer.update_columns("DataSource", _DF.assign(Region="West")[["Region"]])
+    output = pivoteer.save(tmp_path / "out.xlsx")
+
+    with zipfile.ZipFile(output) as archive:
+        sheet = archive.read(_SHEET)
+    assert sheet.count(b"<t>West</t>") == 20
+    assert b"<t>North</t>" not in sheet
@@ -0,0 +1,147 @@
+"""Tests for streaming tables back into DataFrames."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import xlsxwriter
+
+from pivoteer.core import Pivoteer
+from pivoteer.exceptions import TableNotFoundError
+from pivoteer.table_reader import read_table
+
+
+def _write_typed_workbook(path: Path) -> None:
+    workbook = xlsxwriter.Workbook(str(path))
+    worksheet = workbook.add_worksheet("Data")
+    date_format = workbook.add_format({"num_format": "yyyy-mm-dd"})
+    worksheet.write("A1", "above the table")
+    worksheet.add_table(
+        "B3:F7",
+        {
+            "name": "Typed",
+            "total_row": True,
+            "columns": [
+                {"header": "Name"},
+                {"header": "Count", "total_function": "sum"},
+                {"header": "Flag"},
+                {"header": "When", "format": date_format},
+                {"header": "Mixed"},
+            ],
+            "data": [
+                ["a & b", 1, True, datetime(2024, 1, 2), "x"],
+                ["c", 2, False, datetime(2024, 3, 4, 12), 5],
+                [None, 3, True, None, None],
+            ],
+        },
+    )
+    worksheet.write("H4", "beside the table")
+    workbook.close()
+
+
+def test_decodes_shared_strings_booleans_and_dates(tmp_path: Path) -> None:
+    path = tmp_path / "typed.xlsx"
+    _write_typed_workbook(path)
+
+    frame = read_table(path, "Typed")
+
+    assert list(frame.columns) == ["Name", "Count", "Flag", "When", "Mixed"]
+    assert frame["Name"].tolist()[:2] == ["a & b", "c"]
+    assert pd.isna(frame["Name"][2])
+    assert frame["Count"].dtype == np.int64
+    assert frame["Count"].tolist() == [1, 2, 3]
+    assert frame["Flag"].dtype == bool
+    assert frame["Flag"].tolist() == [True, False, True]
+    assert frame["When"].dtype.kind == "M"
+    assert frame["When"][1] == pd.Timestamp(2024, 3, 4, 12)
+    assert pd.isna(frame["When"][2])
+    assert frame["Mixed"].tolist() == ["x", 5.0, None]
+
+
+def test_dates_follow_the_1904_date_system(tmp_path: Path) -> None:
+    path = tmp_path / "1904.xlsx"
+    workbook = xlsxwriter.Workbook(str(path), {"date_1904": True})
+    worksheet = workbook.add_worksheet("Data")
+    date_format = workbook.add_format({"num_format": "yyyy-mm-dd"})
+    worksheet.add_table(
+        "A1:A3",
+        {
+            "name": "Dates",
+            "columns": [{"header": "When", "format": date_format}],
+            "data": [[datetime(2024, 1, 2)], [datetime(2024, 3, 4, 12)]],
+        },
+    )
+    workbook.close()
+
+    frame = read_table(path, "Dates")
+
+    assert frame["When"].tolist() == [
+        pd.Timestamp(2024, 1, 2),
+        pd.Timestamp(2024, 3, 4, 12),
+    ]
+
+
+def test_decodes_escaped_characters(tmp_path: Path) -> None:
+    path = tmp_path / "escaped.xlsx"
+    workbook = xlsxwriter.Workbook(str(path))
+    worksheet = workbook.add_worksheet("Data")
+    worksheet.add_table(
+        "A1:B3",
+        {
+            "name": "Escaped",
+            "columns": [{"header": "Text"}, {"header": "Mixed"}],
+            "data": [["a\x01b", "_x0041_"], ["_x005F_", 1]],
+        },
+    )
+    workbook.close()
+
+    frame = read_table(path, "Escaped")
+
+    assert frame["Text"].tolist() == ["a\x01b", "_x005F_"]
+    assert frame["Mixed"].tolist() == ["_x0041_", 1.0]
+
+
+@pytest.mark.parametrize("engine", ["dom", "splice"])
+def test_round_trips_applied_dataframe(
+    template_path: Path, tmp_path: Path, engine: str
+) -> None:
+    df = pd.DataFrame(
+        {
+            "Category": ["Hardware", "a<b&c", None],
+            "Region": ["North", "_x0041_", "\x01East"],
+            "Amount": [1.5, np.nan, 3.25],
+            "Date": [1, 2, 3],
+        }
+    )
+    pivoteer = Pivoteer(template_path, engine=engine)
+    pivoteer.apply_dataframe("DataSource", df)
+    output = pivoteer.save(tmp_path / f"{engine}.xlsx")
+
+    frame = read_table(output, "DataSource")
+
+    assert frame["Category"].tolist()[:2] == ["Hardware", "a<b&c"]
+    assert pd.isna(frame["Category"][2])
+    assert frame["Region"].tolist() == ["North", "_x0041_", "\x01East"]
+    np.testing.assert_array_equal(frame["Amount"], df["Amount"])
+    assert frame["Date"].tolist() == [1, 2, 3]
+
+
+def test_unknown_table_and_output_raise(template_path: Path) -> None:
+    with pytest.raises(TableNotFoundError):
+        read_table(template_path, "Missing")
+    with pytest.raises(ValueError, match="Unknown output"):
+        read_table(template_path, "DataSource", output="polars")
+
+
+def test_arrow_output(template_path: Path) -> None:
+    pyarrow = pytest.importorskip("pyarrow")
+
+    table = read_table(template_path, "DataSource", output="arrow")
+
+    assert isinstance(table, pyarrow.Table)
+    assert table.num_rows == 12
+    assert table.column_names == ["Category", "Region", "Amount", "Date"]
@@ -0,0 +1,97 @@
+"""Unit tests for table, dimension and span updates in TableResizer."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+from lxml import etree
+
+from pivoteer.core import Pivoteer
+from pivoteer.sheet_splicer import split_worksheet
+from pivoteer.table_resizer import TableResizer
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NSMAP = {"main": _NS_MAIN}
+
+
+def _tree(xml: str) -> etree._ElementTree:
+    return etree.fromstring(xml.encode()).getroottree()
+
+
+def test_resize_table_updates_auto_filter() -> None:
+    tree = _tree(
+        f'<table xmlns="{_NS_MAIN}" ref="A1:C3"><autoFilter ref="A1:C3"/></table>'
+    )
+    result = TableResizer().resize_table(tree, data_rows=5, data_cols=3)
+    auto_filter = tree.find("main:autoFilter", _NSMAP)
+    assert result.updated_ref == "A1:C6"
+    assert auto_filter is not None
+    assert auto_filter.get("ref") == "A1:C6"
+
+
+def test_update_worksheet_extents_refreshes_spans_and_dimension() -> None:
+    tree = _tree(
+        f'<worksheet xmlns="{_NS_MAIN}"><dimension ref="A1:B2"/><sheetData>'
+        '<row r="1" spans="1:2"><c r="A1"/><c r="B1"/></row>'
+        '<row r="2" spans="1:9"><c r="B2"/><c r="D2"/></row>'
+        '<row r="7" spans="5:6"/>'
+        "</sheetData></worksheet>"
+    )
+    ref = TableResizer().update_worksheet_extents(tree, 2, 2)
+    rows = tree.findall(".//main:row", _NSMAP)
+    dimension = tree.find("main:dimension", _NSMAP)
+    assert rows[1].get("spans") == "2:4"
+    assert rows[2].get("spans") == "5:6"
+    assert ref == "A1:F7"
+    assert dimension is not None
+    assert dimension.get("ref") == "A1:F7"
+
+
+def test_update_spliced_extents_patches_dimension() -> None:
+    xml = (
+        f'<worksheet xmlns="{_NS_MAIN}"><dimension ref="A1:B3"/><sheetData>'
+        '<row r="1"><c r="A1"/><c r="B1"/></row>'
+        '<row r="2"><c r="A2"/></row>'
+        '<row r="9"><c r="E9"/></row>'
+        "</sheetData></worksheet>"
+    ).encode()
+    segments = split_worksheet(xml, 2, 2)
+    updated = TableResizer().update_spliced_extents(segments, 2, 4, 1, 3)
+    assert b'<dimension ref="A1:E9"/>' in updated.prefix
+    assert updated.before == segments.before
+
+
+def _output_metadata(path: Path) -> tuple[str, str, list[str]]:
+    with zipfile.ZipFile(path, "r") as archive:
+        sheet = etree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+        table = etree.fromstring(archive.read("xl/tables/table1.xml"))
+    dimension = sheet.find("main:dimension", _NSMAP)
+    auto_filter = table.find("main:autoFilter", _NSMAP)
+    assert dimension is not None
+    assert auto_filter is not None
+    spans = [row.get("spans") for row in sheet.iterfind(".//main:row", _NSMAP)]
+    return dimension.get("ref"), auto_filter.get("ref"), spans
+
+
+def test_saved_metadata_matches_table_extent(
+    template_path: Path, tmp_path: Path
+) -> None:
+    df = pd.DataFrame(
+        {
+            "Category": ["Hardware"] * 30,
+            "Region": ["North"] * 30,
+            "Amount": [1.0] * 30,
+            "Date": ["2024-01-01"] * 30,
+        }
+    )
+    for engine in ("dom", "splice"):
+        pivoteer = Pivoteer(template_path, engine=engine)
+        pivoteer.apply_dataframe("DataSource", df)
+        output = pivoteer.save(tmp_path / f"{engine}.xlsx")
+
+        dimension, auto_filter, spans = _output_metadata(output)
+        assert dimension == "A1:D31"
+        assert auto_filter == "A1:D31"
+        assert spans[1:] == ["1:4"] * 30
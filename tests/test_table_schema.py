@@ -0,0 +1,101 @@
+"""Tests for cached table schemas and per-dtype encoding plans."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pivoteer.exceptions import InvalidDataError
+from pivoteer.models import ColumnSpec, TableSchema
+from pivoteer.row_encoder import column_encoder, encode_cell, encode_series
+from pivoteer.template_engine import TemplateEngine
+from pivoteer.template_source import LoadedTemplate
+from tests.pivot_fixtures import CALCULATED_FORMULA, write_calculated_workbook
+
+
+def test_schema_read_from_table_columns(tmp_path: Path) -> None:
+    template = tmp_path / "calculated.xlsx"
+    write_calculated_workbook(template)
+
+    schema = LoadedTemplate(template).workbook_map.table_schemas["Sales"]
+
+    assert schema == TableSchema(
+        name="Sales",
+        columns=(
+            ColumnSpec("Name"),
+            ColumnSpec("Amount"),
+            ColumnSpec("Double", formula=CALCULATED_FORMULA),
+        ),
+    )
+    assert schema.formulas == {2: CALCULATED_FORMULA}
+
+
+def test_formulas_for_width() -> None:
+    schema = TableSchema(
+        "T", (ColumnSpec("A"), ColumnSpec("B"), ColumnSpec("C", formula="1"))
+    )
+    assert schema.formulas_for_width(3) == {}
+    assert schema.formulas_for_width(2) == {2: "1"}
+    with pytest.raises(InvalidDataError, match=r"has 3 \(or 2 without calculated\)"):
+        schema.formulas_for_width(4)
+
+
+@pytest.mark.parametrize("engine", ["dom", "splice"])
+def test_mismatched_width_fails_before_xml_work(
+    template_path: Path, engine: str
+) -> None:
+    template_engine = TemplateEngine(template_path, engine=engine)
+    df = pd.DataFrame({"Category": ["a"], "Region": ["b"]})
+
+    with pytest.raises(InvalidDataError, match="DataFrame has 2"):
+        template_engine.apply_dataframe("DataSource", df)
+    assert template_engine.get_modified_parts() == {}
+
+
+def test_column_order_is_checked_against_headers() -> None:
+    schema = TableSchema(
+        "T", (ColumnSpec("A"), ColumnSpec("B"), ColumnSpec("C", formula="1"))
+    )
+    schema.check_column_order(["A", "B", "C"])
+    schema.check_column_order(["A", "B"])
+    schema.check_column_order(["x", "y", "z"])
+    with pytest.raises(InvalidDataError, match="match='name'"):
+        schema.check_column_order(["B", "A"])
+    with pytest.raises(InvalidDataError, match=r"expects columns \['A', 'B', 'C'\]"):
+        schema.check_column_order(["A", "C", "B"])
+
+
+def test_reordered_frame_fails_before_xml_work(template_path: Path) -> None:
+    template_engine = TemplateEngine(template_path)
+    df = pd.DataFrame({"Region": ["b"], "Category": ["a"], "Amount": [1], "Date": [2]})
+
+    with pytest.raises(InvalidDataError, match="in this order"):
+        template_engine.apply_dataframe("DataSource", df)
+    assert template_engine.get_modified_parts() == {}
+
+
+def test_column_encoder_plans_by_kind() -> None:
+    assert column_encoder(np.dtype("int64")) is column_encoder(np.dtype("int32"))
+    assert column_encoder(np.dtype("float32")) is column_encoder(np.dtype("float64"))
+    assert column_encoder(pd.Int64Dtype()) is encode_cell
+    assert column_encoder(pd.CategoricalDtype(["a"])) is encode_cell
+    assert column_encoder(np.dtype("O")) is encode_cell
+
+
+@pytest.mark.parametrize(
+    "series",
+    [
+        pd.Series([1, -2, 3]),
+        pd.Series([1.5, np.nan, 2.0]),
+        pd.Series([1, None, 3], dtype="Int64"),
+        pd.Series([True, False, True]),
+        pd.Series(pd.to_datetime(["2024-01-01", None, "2024-03-01"])),
+        pd.Series(["a<b", None, "c"]),
+    ],
+)
+def test_encode_series_matches_encode_cell(series: pd.Series) -> None:
+    values = series.tolist()
+    assert encode_series(values, series.dtype) == [encode_cell(v) for v in values]
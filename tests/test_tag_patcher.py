@@ -0,0 +1,60 @@
+"""Unit tests for byte-level root start tag edits."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from pivoteer.core import Pivoteer
+from pivoteer.exceptions import XmlStructureError
+from pivoteer.tag_patcher import patch_root_attributes
+from tests.pivot_fixtures import CacheSpec, cache_path, write_pivot_workbook
+
+_PROLOG = b'<?xml version="1.0"?>\n<!-- <note> -->\n'
+
+
+def test_replaces_and_appends_attributes() -> None:
+    xml = _PROLOG + b'<a refreshOnLoad="0" x=\'1>2\'><b refreshOnLoad="0"/></a>'
+    patched = patch_root_attributes(xml, {"refreshOnLoad": "1", "saveData": "0"})
+    assert patched == (
+        _PROLOG + b'<a refreshOnLoad="1" x=\'1>2\' saveData="0">'
+        b'<b refreshOnLoad="0"/></a>'
+    )
+
+
+def test_removes_namespaced_attribute_by_clark_name() -> None:
+    xml = b'<a xmlns:rel="urn:r" rel:id="rId1" keep="y"/>'
+    patched = patch_root_attributes(xml, remove_attributes=["{urn:r}id", "{urn:x}id"])
+    assert patched == b'<a xmlns:rel="urn:r" keep="y"/>'
+
+
+def test_escapes_values_on_self_closing_root() -> None:
+    assert patch_root_attributes(b"<a/>", {"k": 'x"<&'}) == b'<a k="x&quot;&lt;&amp;"/>'
+
+
+def test_missing_root_raises() -> None:
+    with pytest.raises(XmlStructureError):
+        patch_root_attributes(b"<?xml version='1.0'?>", {"k": "v"})
+
+
+def test_refresh_flag_leaves_cache_body_untouched(tmp_path: Path) -> None:
+    template = tmp_path / "pivots.xlsx"
+    write_pivot_workbook(template, [CacheSpec(("table", "DataSource"))])
+    with zipfile.ZipFile(template) as archive:
+        original = archive.read(cache_path(1))
+
+    pivoteer = Pivoteer(template)
+    pivoteer.apply_dataframe(
+        "DataSource", pd.DataFrame({"Category": ["a"], "Region": ["b"], "Amount": [1]})
+    )
+    output = pivoteer.save(tmp_path / "out.xlsx")
+
+    with zipfile.ZipFile(output) as archive:
+        patched = archive.read(cache_path(1))
+    tag_end = original.index(b">") + 1
+    assert (
+        patched == original[: tag_end - 1] + b' refreshOnLoad="1">' + original[tag_end:]
+    )
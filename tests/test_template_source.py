@@ -0,0 +1,184 @@
+"""Unit tests for the memory-mapped template source."""
+
+from __future__ import annotations
+
+import multiprocessing
+import pickle
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from pivoteer.core import Pivoteer
+from pivoteer.exceptions import TemplateNotFoundError
+from pivoteer.template_source import LoadedTemplate, MappedTemplate
+from pivoteer.xml_engine import XmlEngine
+
+
+def _write_archive(path: Path) -> dict[str, bytes]:
+    parts = {
+        "stored.xml": b"<root>stored</root>",
+        "deflated.xml": b"<root>" + b"<row/>" * 50_000 + b"</root>",
+    }
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("stored.xml", parts["stored.xml"], zipfile.ZIP_STORED)
+        archive.writestr("deflated.xml", parts["deflated.xml"], zipfile.ZIP_DEFLATED)
+    return parts
+
+
+def _read_part(source: MappedTemplate, name: str) -> bytes:
+    return source.read(name)
+
+
+def test_read_matches_zipfile(tmp_path: Path) -> None:
+    path = tmp_path / "parts.zip"
+    parts = _write_archive(path)
+    with MappedTemplate(path) as source:
+        assert source.namelist() == list(parts)
+        for name, content in parts.items():
+            assert source.read(name) == content
+            assert source.getinfo(name).file_size == len(content)
+
+
+def test_open_streams_part(tmp_path: Path) -> None:
+    path = tmp_path / "parts.zip"
+    parts = _write_archive(path)
+    with MappedTemplate(path) as source:
+        for name, content in parts.items():
+            with source.open(name) as stream:
+                chunks = iter(lambda stream=stream: stream.read(1000), b"")
+                assert b"".join(chunks) == content
+
+
+def test_missing_part_raises_key_error(tmp_path: Path) -> None:
+    path = tmp_path / "parts.zip"
+    _write_archive(path)
+    with MappedTemplate(path) as source, pytest.raises(KeyError):
+        source.read("missing.xml")
+
+
+def test_missing_template_raises(tmp_path: Path) -> None:
+    with pytest.raises(TemplateNotFoundError):
+        MappedTemplate(tmp_path / "missing.xlsx")
+
+
+def test_pickle_remaps_same_file(tmp_path: Path) -> None:
+    path = tmp_path / "parts.zip"
+    parts = _write_archive(path)
+    with MappedTemplate(path) as source:
+        clone = pickle.loads(pickle.dumps(source))
+    with clone:
+        assert clone.path == path
+        assert clone.read("deflated.xml") == parts["deflated.xml"]
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="fork unavailable"
+)
+def test_forked_workers_share_mapping(tmp_path: Path) -> None:
+    path = tmp_path / "parts.zip"
+    parts = _write_archive(path)
+    with MappedTemplate(path) as source:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(2) as pool:
+            results = pool.starmap(_read_part, [(source, name) for name in parts])
+    assert results == list(parts.values())
+
+
+def test_pivoteer_accepts_mapped_template(template_path: Path, tmp_path: Path) -> None:
+    df = pd.DataFrame(
+        {
+            "Category": ["Hardware"],
+            "Region": ["North"],
+            "Amount": [1.0],
+            "Date": ["2024-01-01"],
+        }
+    )
+    with MappedTemplate(template_path) as source:
+        assert XmlEngine(source).build_workbook_map().tables
+        mapped = Pivoteer(source)
+        mapped.apply_dataframe("DataSource", df)
+        mapped_output = mapped.save(tmp_path / "mapped.xlsx")
+
+    plain = Pivoteer(template_path)
+    plain.apply_dataframe("DataSource", df)
+    plain_output = plain.save(tmp_path / "plain.xlsx")
+
+    with (
+        zipfile.ZipFile(mapped_output) as mapped_zip,
+        zipfile.ZipFile(plain_output) as plain_zip,
+    ):
+        assert mapped_zip.namelist() == plain_zip.namelist()
+        for name in plain_zip.namelist():
+            assert mapped_zip.read(name) == plain_zip.read(name)
+
+
+def _frame(amount: float) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Category": ["Hardware"],
+            "Region": ["North"],
+            "Amount": [amount],
+            "Date": ["2024-01-01"],
+        }
+    )
+
+
+def test_loaded_template_reads_parts(template_path: Path) -> None:
+    loaded = LoadedTemplate(template_path)
+    with zipfile.ZipFile(template_path) as archive:
+        assert loaded.namelist() == archive.namelist()
+        for name in archive.namelist():
+            assert loaded.read(name) == archive.read(name)
+            with loaded.open(name) as stream:
+                assert stream.read() == archive.read(name)
+    assert loaded.workbook_map == XmlEngine(template_path).build_workbook_map()
+
+
+def test_loaded_template_missing_raises(tmp_path: Path) -> None:
+    with pytest.raises(TemplateNotFoundError):
+        LoadedTemplate(tmp_path / "missing.xlsx")
+
+
+def test_sessions_share_loaded_template(template_path: Path, tmp_path: Path) -> None:
+    loaded = LoadedTemplate(template_path)
+    first = Pivoteer(loaded)
+    first.apply_dataframe("DataSource", _frame(1.0))
+    second = first.new_session()
+    second.apply_dataframe("DataSource", _frame(2.0))
+    untouched = first.new_session().save(tmp_path / "untouched.xlsx")
+
+    plain = Pivoteer(template_path)
+    plain.apply_dataframe("DataSource", _frame(1.0))
+    expected = plain.save(tmp_path / "plain.xlsx")
+    actual = first.save(tmp_path / "first.xlsx")
+
+    with (
+        zipfile.ZipFile(expected) as expected_zip,
+        zipfile.ZipFile(actual) as actual_zip,
+        zipfile.ZipFile(untouched) as untouched_zip,
+        zipfile.ZipFile(template_path) as template_zip,
+    ):
+        for name in expected_zip.namelist():
+            assert actual_zip.read(name) == expected_zip.read(name)
+            assert loaded.read(name) == template_zip.read(name)
+        sheet = "xl/worksheets/sheet1.xml"
+        assert untouched_zip.read(sheet) == template_zip.read(sheet)
+
+
+def test_concurrent_sessions(template_path: Path, tmp_path: Path) -> None:
+    loaded = LoadedTemplate(template_path)
+
+    def run(index: int) -> bytes:
+        session = Pivoteer(loaded, engine="splice")
+        session.apply_dataframe("DataSource", _frame(float(index)))
+        output = session.save(tmp_path / f"out{index}.xlsx")
+        with zipfile.ZipFile(output) as archive:
+            return archive.read("xl/worksheets/sheet1.xml")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        sheets = list(pool.map(run, range(8)))
+    for index, sheet in enumerate(sheets):
+        assert f"<v>{float(index)}</v>".encode() in sheet
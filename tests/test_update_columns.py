@@ -0,0 +1,118 @@
+"""Tests for partial column updates of an existing table range."""
+
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from lxml import etree
+
+from pivoteer.core import Pivoteer
+from pivoteer.exceptions import InvalidDataError
+from pivoteer.xml_engine import XmlEngine
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NSMAP = {"main": _NS_MAIN}
+
+_BASE = pd.DataFrame(
+    {
+        "Category": ["Hardware", "Software", "Services"],
+        "Region": ["North", "South", "East"],
+        "Amount": [1.0, 2.0, 3.0],
+        "Date": ["2024-01-01", "2024-01-02", "2024-01-03"],
+    }
+)
+
+
+def _cells(path: Path) -> dict[str, str]:
+    with zipfile.ZipFile(path) as archive:
+        root = etree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+    return {
+        cell.get("r"): "".join(cell.itertext())
+        for cell in root.iterfind(".//main:c", _NSMAP)
+    }
+
+
+@pytest.mark.parametrize("engine", ["dom", "splice"])
+def test_only_named_columns_change(
+    template_path: Path, tmp_path: Path, engine: str
+) -> None:
+    base = Pivoteer(template_path, engine=engine)
+    base.apply_dataframe("DataSource", _BASE)
+    before = _cells(base.save(tmp_path / "base.xlsx"))
+
+    pivoteer = Pivoteer(tmp_path / "base.xlsx", engine=engine)
+    pivoteer.update_columns("DataSource", pd.DataFrame({"Amount": [7, 8, 9]}))
+    after = _cells(pivoteer.save(tmp_path / "updated.xlsx"))
+
+    assert {ref: after[ref] for ref in ("C2", "C3", "C4")} == {
+        "C2": "7",
+        "C3": "8",
+        "C4": "9",
+    }
+    assert {ref: value for ref, value in after.items() if not ref.startswith("C")} == {
+        ref: value for ref, value in before.items() if not ref.startswith("C")
+    }
+
+
+def test_mapping_selects_source_column(template_path: Path, tmp_path: Path) -> None:
+    base = Pivoteer(template_path)
+    base.apply_dataframe("DataSource", _BASE)
+    base.save(tmp_path / "base.xlsx")
+
+    pivoteer = Pivoteer(tmp_path / "base.xlsx")
+    df = pd.DataFrame({"new_region": ["W", "X", "Y"], "ignored": [0, 0, 0]})
+    pivoteer.update_columns("DataSource", df, columns={"Region": "new_region"})
+    after = _cells(pivoteer.save(tmp_path / "updated.xlsx"))
+
+    assert [after[f"B{row}"] for row in (2, 3, 4)] == ["W", "X", "Y"]
+
+
+@pytest.mark.parametrize(
+    ("df", "message"),
+    [
+        (pd.DataFrame({"Amount": [1, 2]}), "has 3 data rows"),
+        (pd.DataFrame({"Unknown": [1, 2, 3]}), "no columns named"),
+    ],
+)
+def test_invalid_updates_raise(
+    template_path: Path, tmp_path: Path, df: pd.DataFrame, message: str
+) -> None:
+    base = Pivoteer(template_path)
+    base.apply_dataframe("DataSource", _BASE)
+    pivoteer = Pivoteer(base.save(tmp_path / "base.xlsx"))
+    with pytest.raises(InvalidDataError, match=message):
+        pivoteer.update_columns("DataSource", df)
+
+
+def test_missing_cells_inserted_in_column_order(template_path: Path) -> None:
+    engine = XmlEngine(template_path)
+    tree = engine.parse_xml(
+        f'<worksheet xmlns="{_NS_MAIN}"><sheetData><row r="2">'
+        '<c r="A2"><v>1</v></c><c r="C2"><v>3</v></c></row></sheetData></worksheet>'.encode()
+    )
+
+    engine.update_column_cells(tree, 2, {2: [5], 4: ["x"]})
+
+    row = tree.find(".//main:row", _NSMAP)
+    assert [cell.get("r") for cell in row] == ["A2", "B2", "C2", "D2"]
+    assert [cell.findtext(".//main:v", namespaces=_NSMAP) for cell in row][:3] == [
+        "1",
+        "5",
+        "3",
+    ]
+
+
+@pytest.mark.parametrize("engine", ["dom", "splice"])
+def test_update_after_apply_in_one_session(
+    template_path: Path, tmp_path: Path, engine: str
+) -> None:
+    pivoteer = Pivoteer(template_path, engine=engine)
+    pivoteer.apply_dataframe("DataSource", _BASE)
+    pivoteer.update_columns("DataSource", pd.DataFrame({"Amount": [7, 8, 9]}))
+    after = _cells(pivoteer.save(tmp_path / "updated.xlsx"))
+
+    assert [after[f"C{row}"] for row in (2, 3, 4)] == ["7", "8", "9"]
+    assert [after[f"A{row}"] for row in (2, 3, 4)] == _BASE["Category"].tolist()
@@ -0,0 +1,97 @@
+"""Unit tests for the pivot cache index built into WorkbookMap."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from pivoteer.models import PivotCacheInfo
+from pivoteer.xml_engine import XmlEngine
+from tests.pivot_fixtures import (
+    CacheSpec,
+    cache_path,
+    records_path,
+    write_pivot_workbook,
+)
+
+
+def test_pivot_cache_index(tmp_path: Path) -> None:
+    fixture = tmp_path / "pivots.xlsx"
+    write_pivot_workbook(
+        fixture,
+        [
+            CacheSpec(("table", "DataSource"), pivot_tables=2),
+            CacheSpec(("range", "Data", "A1:C3")),
+            CacheSpec(("external",), pivot_tables=0),
+            CacheSpec(("table", "Elsewhere")),
+        ],
+    )
+
+    workbook_map = XmlEngine(fixture).build_workbook_map()
+
+    assert workbook_map.table_pivot_caches == {"DataSource": (cache_path(1),)}
+    assert workbook_map.pivot_caches[cache_path(1)] == PivotCacheInfo(
+        path=cache_path(1),
+        rel_id="rId3",
+        source_type="table",
+        source_name="DataSource",
+        pivot_table_paths=(
+            "xl/pivotTables/pivotTable1.xml",
+            "xl/pivotTables/pivotTable2.xml",
+        ),
+        records_path=records_path(1),
+        records_rel_id="rId1",
+    )
+    range_cache = workbook_map.pivot_caches[cache_path(2)]
+    assert range_cache.source_type == "range"
+    assert (range_cache.source_sheet, range_cache.source_ref) == ("Data", "A1:C3")
+    assert range_cache.pivot_table_paths == ("xl/pivotTables/pivotTable3.xml",)
+    assert workbook_map.pivot_caches[cache_path(3)].source_type == "external"
+    assert workbook_map.pivot_caches[cache_path(3)].pivot_table_paths == ()
+    assert workbook_map.pivot_caches[cache_path(4)].source_type == "name"
+
+
+def test_defined_name_sources_are_resolved(tmp_path: Path) -> None:
+    fixture = tmp_path / "pivots.xlsx"
+    write_pivot_workbook(
+        fixture,
+        [
+            CacheSpec(("name", "SalesRange")),
+            CacheSpec(("name", "AllData")),
+            CacheSpec(("name", "Computed")),
+        ],
+        {
+            "SalesRange": "'Data'!$A$1:$C$3",
+            "AllData": "DataSource[#All]",
+            "Computed": "OFFSET(Data!$A$1,0,0,10,3)",
+        },
+    )
+
+    workbook_map = XmlEngine(fixture).build_workbook_map()
+
+    named = workbook_map.pivot_caches[cache_path(1)]
+    assert (named.source_type, named.source_name) == ("name", "SalesRange")
+    assert (named.source_sheet, named.source_ref) == ("Data", "$A$1:$C$3")
+    assert workbook_map.pivot_caches[cache_path(2)].source_type == "table"
+    assert workbook_map.table_pivot_caches == {"DataSource": (cache_path(2),)}
+    computed = workbook_map.pivot_caches[cache_path(3)]
+    assert (computed.source_type, computed.source_ref) == ("name", None)
+
+
+def test_cache_without_records_part(tmp_path: Path) -> None:
+    fixture = tmp_path / "pivots.xlsx"
+    write_pivot_workbook(fixture, [CacheSpec(("table", "DataSource"), records=False)])
+
+    cache = XmlEngine(fixture).build_workbook_map().pivot_caches[cache_path(1)]
+
+    assert cache.records_path is None
+    assert cache.records_rel_id is None
+
+
+def test_workbook_without_pivots_has_empty_index(tmp_path: Path) -> None:
+    fixture = tmp_path / "plain.xlsx"
+    write_pivot_workbook(fixture, [])
+
+    workbook_map = XmlEngine(fixture).build_workbook_map()
+
+    assert workbook_map.pivot_caches == {}
+    assert workbook_map.table_pivot_caches == {}
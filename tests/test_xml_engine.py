@@ -10,7 +10,7 @@ import pytest
 from lxml import etree
 
 from pivoteer.exceptions import InvalidDataError, XmlStructureError
-from pivoteer.xml_engine import XmlEngine, read_xml_part
+from pivoteer.xml_engine import ParserPolicy, XmlEngine, read_xml_part
 
 _NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
 _NSMAP = {"main": _NS_MAIN}
@@ -26,41 +26,42 @@ def _get_cell(tree: etree._ElementTree, cell_ref: str) -> etree._Element | None:
     return tree.find(f".//main:row/main:c[@r='{cell_ref}']", namespaces=_NSMAP)
 
 
-class TestInjectRowsInlineStrings:
-    def _make_engine(self, tmp_path) -> XmlEngine:
-        # Create a minimal xlsx for XmlEngine init
-        import zipfile
+def _make_engine(tmp_path) -> XmlEngine:
+    """Write a minimal one-sheet workbook and open an engine on it."""
+    import zipfile
+
+    path = tmp_path / "minimal.xlsx"
+    workbook_xml = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<workbook xmlns="{_NS_MAIN}" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        "<sheets>"
+        '<sheet name="Data" sheetId="1" r:id="rId1"/>'
+        "</sheets>"
+        "</workbook>"
+    )
+    rels_xml = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        "</Relationships>"
+    )
+    worksheet_xml = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<worksheet xmlns="{_NS_MAIN}"><sheetData/></worksheet>'
+    )
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("xl/workbook.xml", workbook_xml)
+        archive.writestr("xl/_rels/workbook.xml.rels", rels_xml)
+        archive.writestr("xl/worksheets/sheet1.xml", worksheet_xml)
+    return XmlEngine(path)
 
-        path = tmp_path / "minimal.xlsx"
-        workbook_xml = (
-            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-            f'<workbook xmlns="{_NS_MAIN}" '
-            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
-            "<sheets>"
-            '<sheet name="Data" sheetId="1" r:id="rId1"/>'
-            "</sheets>"
-            "</workbook>"
-        )
-        rels_xml = (
-            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
-            '<Relationship Id="rId1" '
-            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
-            'Target="worksheets/sheet1.xml"/>'
-            "</Relationships>"
-        )
-        worksheet_xml = (
-            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-            f'<worksheet xmlns="{_NS_MAIN}"><sheetData/></worksheet>'
-        )
-        with zipfile.ZipFile(path, "w") as archive:
-            archive.writestr("xl/workbook.xml", workbook_xml)
-            archive.writestr("xl/_rels/workbook.xml.rels", rels_xml)
-            archive.writestr("xl/worksheets/sheet1.xml", worksheet_xml)
-        return XmlEngine(path)
 
+class TestInjectRowsInlineStrings:
     def test_integer_value(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         engine.inject_rows_inline_strings(tree, 1, 1, [[42]])
         cell = _get_cell(tree, "A1")
@@ -71,7 +72,7 @@ class TestInjectRowsInlineStrings:
         assert v.text == "42"
 
     def test_float_value(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         engine.inject_rows_inline_strings(tree, 1, 1, [[3.14]])
         cell = _get_cell(tree, "A1")
@@ -81,7 +82,7 @@ class TestInjectRowsInlineStrings:
         assert v.text == "3.14"
 
     def test_string_value(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         engine.inject_rows_inline_strings(tree, 1, 1, [["hello"]])
         cell = _get_cell(tree, "A1")
@@ -92,7 +93,7 @@ class TestInjectRowsInlineStrings:
         assert t.text == "hello"
 
     def test_none_value(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         engine.inject_rows_inline_strings(tree, 1, 1, [[None]])
         cell = _get_cell(tree, "A1")
@@ -101,7 +102,7 @@ class TestInjectRowsInlineStrings:
         assert len(list(cell)) == 0  # no children
 
     def test_nan_value(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         engine.inject_rows_inline_strings(tree, 1, 1, [[nan]])
         cell = _get_cell(tree, "A1")
@@ -110,7 +111,7 @@ class TestInjectRowsInlineStrings:
         assert len(list(cell)) == 0  # treated as missing
 
     def test_pd_nat_value(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         engine.inject_rows_inline_strings(tree, 1, 1, [[pd.NaT]])
         cell = _get_cell(tree, "A1")
@@ -118,7 +119,7 @@ class TestInjectRowsInlineStrings:
         assert len(list(cell)) == 0
 
     def test_date_value(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         engine.inject_rows_inline_strings(tree, 1, 1, [[date(2024, 6, 15)]])
         cell = _get_cell(tree, "A1")
@@ -129,7 +130,7 @@ class TestInjectRowsInlineStrings:
         assert t.text == "2024-06-15"
 
     def test_datetime_value(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         engine.inject_rows_inline_strings(tree, 1, 1, [[datetime(2024, 6, 15, 10, 30)]])
         cell = _get_cell(tree, "A1")
@@ -139,7 +140,7 @@ class TestInjectRowsInlineStrings:
         assert "2024-06-15" in t.text
 
     def test_multiple_columns(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         engine.inject_rows_inline_strings(tree, 1, 1, [[1, "two", 3.0]])
         assert _get_cell(tree, "A1") is not None
@@ -147,7 +148,7 @@ class TestInjectRowsInlineStrings:
         assert _get_cell(tree, "C1") is not None
 
     def test_multiple_rows(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         engine.inject_rows_inline_strings(tree, 2, 1, [["a"], ["b"], ["c"]])
         assert _get_cell(tree, "A2") is not None
@@ -155,20 +156,20 @@ class TestInjectRowsInlineStrings:
         assert _get_cell(tree, "A4") is not None
 
     def test_zero_start_row_raises(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         with pytest.raises(InvalidDataError):
             engine.inject_rows_inline_strings(tree, 0, 1, [["x"]])
 
     def test_empty_rows_no_change(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         engine.inject_rows_inline_strings(tree, 1, 1, [])
         rows = tree.findall(".//main:row", namespaces=_NSMAP)
         assert len(rows) == 0
 
     def test_rows_are_sorted(self, tmp_path) -> None:
-        engine = self._make_engine(tmp_path)
+        engine = _make_engine(tmp_path)
         tree = _make_sheet_tree()
         # Inject at row 5 then row 2 to test sorting
         engine.inject_rows_inline_strings(tree, 5, 1, [["late"]])
@@ -201,3 +202,53 @@ class TestReadXmlPart:
         with zipfile.ZipFile(path, "r") as archive:
             tree = read_xml_part(archive, "test.xml")
             assert tree.getroot().tag == "root"
+
+
+class TestParserPolicy:
+    def _write_part(self, tmp_path, content: bytes):
+        import zipfile
+
+        path = tmp_path / "parts.zip"
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("big.xml", content)
+        return path
+
+    def test_huge_tree_parses_oversized_text(self, tmp_path) -> None:
+        import zipfile
+
+        path = self._write_part(tmp_path, b"<root>" + b"x" * 11_000_000 + b"</root>")
+        with zipfile.ZipFile(path, "r") as archive:
+            with pytest.raises(etree.XMLSyntaxError):
+                read_xml_part(archive, "big.xml")
+            parser = ParserPolicy(huge_tree=True).create_parser()
+            tree = read_xml_part(archive, "big.xml", parser)
+        assert len(tree.getroot().text) == 11_000_000
+
+    def test_incremental_threshold_parses_from_stream(self, tmp_path) -> None:
+        import zipfile
+
+        rows = "".join(f'<row r="{idx}"/>' for idx in range(1, 1001))
+        path = self._write_part(tmp_path, f"<root>{rows}</root>".encode())
+        with zipfile.ZipFile(path, "r") as archive:
+            streamed = read_xml_part(archive, "big.xml", incremental_threshold=100)
+            buffered = read_xml_part(archive, "big.xml")
+        assert etree.tostring(streamed) == etree.tostring(buffered)
+
+    def test_engine_builds_its_parser_once(self, tmp_path, monkeypatch) -> None:
+        create_parser = ParserPolicy.create_parser
+        created = []
+
+        def counting_create_parser(policy: ParserPolicy) -> etree.XMLParser:
+            created.append(policy)
+            return create_parser(policy)
+
+        monkeypatch.setattr(ParserPolicy, "create_parser", counting_create_parser)
+        engine = _make_engine(tmp_path)
+        with engine.open_archive() as archive:
+            for path in ("xl/workbook.xml", "xl/worksheets/sheet1.xml") * 2:
+                engine.read_xml(archive, path)
+        tree = engine.parse_xml(b"<root/>")
+
+        assert created == [ParserPolicy()]
+        assert engine.parser_policy == ParserPolicy()
+        assert tree.getroot().tag == "root"